@@ -29,7 +29,7 @@ setup(
         'dearpygui',
         'colorama'
     ],
-    entry_points={'console_scripts': ['zosedit=zosedit.main:main']},
+    entry_points={'console_scripts': ['zosedit=zosedit.cli:main']},
     keywords=['editor', 'z/OS', 'MVS', 'dataset', 'FTP'],
     classifiers=[
         'Intended Audience :: Developers',
@@ -0,0 +1,103 @@
+'''Benchmarks against the fake server, with a bandwidth limit standing in for the link to the host.
+
+    python -m tests.benchmark_transfers modes [--records N] [--rate MBPS]
+        bytes on the wire and wall clock time of a FB80 download and upload in
+        stream and compressed (MODE C) mode
+
+    python -m tests.benchmark_transfers pools [--datasets N] [--size S] [--rate MBPS]
+        wall clock time of downloading N datasets through the threaded SessionPool
+        and the asyncio AsyncSessionPool, S sessions each
+'''
+import sys
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from time import time
+from zosedit import records
+from zosedit.aio import AsyncSessionPool, AsyncZFTP
+from zosedit.models import Dataset
+from zosedit.zftp import zFTP, SessionPool
+from tests.fakeftp import FakeServer, records as fake_records
+
+
+def timed(server: FakeServer, func) -> tuple[int, float]:
+    '''Bytes on the data connections and seconds taken by func()'''
+    wire, start = server.wire, time()
+    func()
+    return server.wire - wire, time() - start
+
+
+def modes(args):
+    server = FakeServer(rate=args.rate * 1024 * 1024)
+    text = fake_records(args.records)
+    server.add_dataset('USER.DATA', text)
+    dataset = Dataset.parse("VOL001 3390   2024/01/01  1   15  FB       80 27920  PS  'USER.DATA'")
+    data = records.encode(text.rstrip('\n'), dataset, 'cp037')
+    server.compressed(text.replace('\n', '\r\n').encode('latin-1'), b' ')  # Encoded ahead, as by the host
+    print(f'{args.records} FB80 records ({len(text) / 1e6:.1f} MB) at {args.rate} MB/s')
+    with tempfile.TemporaryDirectory() as folder:
+        for compress in (False, True):
+            zftp = zFTP(server.address, 'USER', 'secret', compress=compress)
+            zftp.connect()
+            down = timed(server, lambda: zftp.download(dataset, Path(folder, 'data.txt')))
+            up = timed(server, lambda: zftp.upload(dataset, data))
+            zftp.quit()
+            for label, (wire, seconds) in (('download', down), ('upload', up)):
+                print(f'  {"MODE C" if compress else "stream"} {label:<8} {wire / 1e6:8.2f} MB on the wire'
+                      f' {seconds:7.2f} s')
+    server.stop()
+
+
+def pools(args):
+    server = FakeServer(rate=args.rate * 1024 * 1024)
+    datasets = []
+    for i in range(args.datasets):
+        server.add_dataset(f'USER.DATA{i:04d}', fake_records(args.records))
+        datasets.append(Dataset.parse(f"VOL001 3390   2024/01/01  1   15  FB       80 27920  PS  'USER.DATA{i:04d}'"))
+    print(f'{args.datasets} datasets of {args.records} FB80 records over {args.size} sessions'
+          f' at {args.rate} MB/s each')
+    with tempfile.TemporaryDirectory() as folder:
+        def download(session, dataset: Dataset):
+            return session.download(dataset, Path(folder, f'{dataset.name}.sync'))
+
+        async def download_async(session: AsyncZFTP, dataset: Dataset):
+            return await session.download(dataset, Path(folder, f'{dataset.name}.async'))
+
+        async def run_async():
+            port = server.server_address[1]
+            async with AsyncSessionPool('127.0.0.1', 'USER', 'secret', size=args.size, port=port) as pool:
+                return [error async for _, _, error in pool.map(download_async, datasets) if error]
+
+        zftp = zFTP(server.address, 'USER', 'secret', compress=False)
+        zftp.connect()
+        start = time()
+        with SessionPool(zftp, args.size) as pool:
+            errors = [error for _, _, error in pool.map(download, datasets) if error]
+        print(f'  SessionPool      {time() - start:7.2f} s  {len(errors)} errors')
+        zftp.quit()
+        start = time()
+        errors = asyncio.run(run_async())
+        print(f'  AsyncSessionPool {time() - start:7.2f} s  {len(errors)} errors')
+    server.stop()
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmark_transfers')
+    commands = parser.add_subparsers(dest='command', required=True)
+    cmd = commands.add_parser('modes', help='stream against compressed transfers')
+    cmd.add_argument('--records', type=int, default=100000)
+    cmd.add_argument('--rate', type=float, default=10, help='link speed in MB/s (default: 10)')
+    cmd.set_defaults(func=modes)
+    cmd = commands.add_parser('pools', help='threaded against asyncio session pools')
+    cmd.add_argument('--datasets', type=int, default=200)
+    cmd.add_argument('--records', type=int, default=2000)
+    cmd.add_argument('--size', type=int, default=16, help='sessions per pool (default: 16)')
+    cmd.add_argument('--rate', type=float, default=10, help='link speed in MB/s (default: 10)')
+    cmd.set_defaults(func=pools)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+'''A small fake z/OS FTP server for the tests and benchmarks: catalog, member and
+JES listings, retrievals and stores in stream and compressed mode, and an
+optional bandwidth limit on data connections to stand in for a slow link.'''
+import re
+import socket
+import threading
+import socketserver
+from time import sleep
+from zosedit.compression import Compressor, Decompressor, FILLER
+
+JOB_HEADER = 'JOBNAME  JOBID    OWNER    STATUS CLASS'
+DATASET_HEADER = 'Volume Unit    Referred Ext Used Recfm Lrecl BlkSz Dsorg Dsname'
+MEMBER_HEADER = ' Name     VV.MM   Created       Changed      Size  Init   Mod   Id'
+
+
+def records(count: int, lrecl: int = 80) -> str:
+    '''Text of `count` blank padded records, as the host sends a FB dataset'''
+    return ''.join(f'RECORD {i:07d} SOME DATA'.ljust(lrecl) + '\n' for i in range(count))
+
+
+class FakeServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, rate: float = None, jobs: int = 0, spool_records: int = 100):
+        self.rate = rate  # Bytes per second on each data connection, unlimited when None
+        self.datasets: dict[str, str] = {}  # Name (with member) -> text
+        self.formats: dict[str, tuple[str, int]] = {}  # Name -> (recfm, lrecl)
+        self.stored: dict[str, bytes] = {}  # Name -> data stored, record ends as \n in compressed mode
+        self.jobs = [f'JOB{i:05d}' for i in range(1, jobs + 1)]
+        self.spool = records(spool_records)
+        self.wire = 0  # Bytes on data connections
+        self.commands: list[str] = []
+        self.encoded: dict[tuple[bytes, bytes], bytes] = {}
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), FakeHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def address(self) -> str:
+        return f'127.0.0.1:{self.server_address[1]}'
+
+    def add_dataset(self, name: str, text: str, recfm: str = 'FB', lrecl: int = 80):
+        self.datasets[name] = text
+        self.formats[name.split('(')[0]] = recfm, lrecl
+
+    def compressed(self, data: bytes, filler: bytes) -> bytes:
+        '''Data encoded for compressed mode, kept so a host's native compression isn't timed as Python'''
+        key = data, filler
+        if key not in self.encoded:
+            encoder = Compressor(filler)
+            self.encoded[key] = encoder.feed(data) + encoder.finish()
+        return self.encoded[key]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeHandler(socketserver.StreamRequestHandler):
+    server: FakeServer
+
+    def handle(self):
+        self.site = {'FILETYPE': 'SEQ'}
+        self.type = 'A'
+        self.mode = 'S'
+        self.listener: socket.socket = None
+        self.send('220 fake z/OS FTP server')
+        while line := self.rfile.readline():
+            line = line.decode('latin-1').strip().lstrip('\xff\xf4\xf2')
+            command, _, argument = line.partition(' ')
+            with self.server.lock:
+                self.server.commands.append(line)
+            getattr(self, f'do_{command.upper()}', self.unknown)(argument)
+            if command.upper() == 'QUIT':
+                return
+
+    def send(self, line: str):
+        self.wfile.write(f'{line}\r\n'.encode('latin-1'))
+        self.wfile.flush()
+
+    def unknown(self, argument: str):
+        self.send('502 Command not implemented')
+
+    def do_USER(self, argument):
+        self.send('331 Send password please.')
+
+    def do_PASS(self, argument):
+        self.send('230 User is logged on.')
+
+    def do_NOOP(self, argument):
+        self.send('200 OK')
+
+    def do_QUIT(self, argument):
+        self.send('221 Quit command received. Goodbye.')
+
+    def do_TYPE(self, argument):
+        self.type = argument.upper()[:1]
+        self.send(f'200 Representation type is {self.type}')
+
+    def do_MODE(self, argument):
+        self.mode = argument.upper()
+        self.send(f'200 Data transfer mode is {self.mode}')
+
+    def do_SITE(self, argument):
+        for parameter in argument.split():
+            key, _, value = parameter.partition('=')
+            self.site[key.upper()] = value
+        self.send('200 SITE command was accepted')
+
+    def do_PASV(self, argument):
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        port = self.listener.getsockname()[1]
+        self.send(f'227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 0xff})')
+
+    def do_EPSV(self, argument):
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.send(f'229 Entering Extended Passive Mode (|||{self.listener.getsockname()[1]}|)')
+
+    def data(self) -> socket.socket:
+        conn, _ = self.listener.accept()
+        self.listener.close()
+        return conn
+
+    def send_data(self, data: bytes, reply: str = '250 Transfer completed successfully.'):
+        self.send('125 Sending data set')
+        if self.mode == 'C':
+            data = self.server.compressed(data, FILLER[self.type])
+        with self.data() as conn:
+            for i in range(0, len(data), 16384):
+                block = data[i:i + 16384]
+                conn.sendall(block)
+                with self.server.lock:
+                    self.server.wire += len(block)
+                if self.server.rate:
+                    sleep(len(block) / self.server.rate)
+        self.send(reply)
+
+    def send_lines(self, lines: list[str], reply: str = '250 List completed successfully.'):
+        self.send_data(''.join(f'{line}\r\n' for line in lines).encode('latin-1'), reply)
+
+    def do_LIST(self, argument):
+        argument = argument.strip().strip("'")
+        if self.site['FILETYPE'] == 'JES':
+            return self.list_jobs(argument or '*')
+        if argument.endswith('(*)'):
+            name = argument[:-3]
+            members = [key[len(name) + 1:-1] for key in self.server.datasets if key.startswith(f'{name}(')]
+            if not members:
+                return self.send('550 No members found.')
+            sizes = [len(self.server.datasets[f'{name}({member})'].splitlines()) for member in members]
+            return self.send_lines([MEMBER_HEADER] + [f'{member:<8}  01.00 2024/01/01 2024/02/01 10:00 {size:>5}'
+                                                      f'     0     0 USER' for member, size in zip(members, sizes)])
+        pattern = re.compile(re.escape(argument).replace(r'\*', '.*') + '$')
+        names = sorted({key.split('(')[0] for key in self.server.datasets if pattern.match(key.split('(')[0])})
+        if not names:
+            return self.send('550 No data sets found.')
+        lines = [DATASET_HEADER]
+        for name in names:
+            recfm, lrecl = self.server.formats[name]
+            dsorg = 'PO' if f'{name}(' in ''.join(self.server.datasets) else 'PS'
+            lines.append(f"VOL001 3390   2024/01/01  1   15  {recfm:<5} {lrecl:>5} 27920  {dsorg}  '{name}'")
+        self.send_lines(lines)
+
+    def list_jobs(self, pattern: str):
+        if '*' not in pattern and pattern in self.server.jobs:
+            return self.send_lines([
+                JOB_HEADER, f'BUILD    {pattern} USER     OUTPUT A        RC=0000 2 spool files', '--------',
+                'ID  STEPNAME PROCSTEP C DDNAME   BYTE-COUNT',
+                '001 JES2              A JESMSGLG       1200',
+                f'002 STEP1             A SYSPRINT {len(self.server.spool):>10}',
+                '2 spool files'])
+        regex = re.compile(re.escape(pattern).replace(r'\*', '.*') + '$')
+        jobs = [job for job in self.server.jobs if regex.match(job)]
+        if not jobs:
+            return self.send('550 No jobs found for JESJOBNAME=*, JESSTATUS=ALL and JESOWNER=*')
+        limit = int(self.site.get('JESENTRYLIMIT', 200))
+        lines = [JOB_HEADER] + [f'BUILD    {job} USER     OUTPUT A        RC=0000 2 spool files'
+                                for job in jobs[:limit]]
+        if len(jobs) > limit:
+            return self.send_lines(lines, f'250-JESENTRYLIMIT of {limit} reached.  Additional entries not displayed\r\n'
+                                          '250 List completed successfully.')
+        self.send_lines(lines)
+
+    def do_RETR(self, argument):
+        name = argument.strip().strip("'")
+        if self.site['FILETYPE'] == 'JES':
+            return self.send_data(self.server.spool.replace('\n', '\r\n').encode('latin-1'))
+        text = self.server.datasets.get(name)
+        if text is None:
+            return self.send(f'550 Data set {name} not found')
+        self.send_data(text.replace('\n', '\r\n').encode('latin-1'))
+
+    def do_STOR(self, argument):
+        name = argument.strip().strip("'")
+        self.send('125 Storing data set')
+        decoder = Decompressor(FILLER[self.type], b'\n') if self.mode == 'C' else None
+        data = bytearray()
+        with self.data() as conn:
+            while block := conn.recv(65536):
+                with self.server.lock:
+                    self.server.wire += len(block)
+                data += decoder.feed(block) if decoder else block
+                if self.server.rate:
+                    sleep(len(block) / self.server.rate)
+        if decoder and not decoder.eof:
+            return self.send('451 Transfer aborted, no end of file marker')
+        if self.site['FILETYPE'] == 'JES':
+            return self.send('250-It is known to JES as JOB01234\r\n250 Transfer completed successfully.')
+        self.server.stored[name] = bytes(data)
+        self.send('250 Transfer completed successfully.')
+
+    def do_DELE(self, argument):
+        self.send('250 Deleted')
@@ -0,0 +1,80 @@
+'''AsyncZFTP and AsyncSessionPool against the fake server'''
+import asyncio
+import pytest
+from contextlib import aclosing
+from zosedit.aio import AsyncZFTP, AsyncSessionPool
+from zosedit.models import Dataset
+from tests.fakeftp import FakeServer, records
+
+
+@pytest.fixture
+def server():
+    server = FakeServer(jobs=2500)
+    server.add_dataset('USER.DATA', records(2000))
+    server.add_dataset('USER.PDS(ALPHA)', records(3))
+    server.add_dataset('USER.PDS(BETA)', records(5))
+    yield server
+    server.stop()
+
+
+def session(server: FakeServer) -> AsyncZFTP:
+    return AsyncZFTP('127.0.0.1', 'USER', 'secret', port=server.server_address[1])
+
+
+def dataset(name: str) -> Dataset:
+    return Dataset.parse(f"VOL001 3390   2024/01/01  1   15  FB       80 27920  PS  '{name}'")
+
+
+def test_concurrent_operations_share_a_session(server):
+    async def main():
+        async with session(server) as ftp:
+            job, = await ftp.list_jobs(id='JOB00001')
+            return await asyncio.gather(ftp.list_datasets("'USER.*'"), ftp.get_members(dataset('USER.PDS')),
+                                        ftp.retrieve(dataset('USER.DATA')), ftp.list_spools(job))
+    datasets, members, buffer, spools = asyncio.run(main())
+    assert [d.name for d in datasets] == ['USER.DATA', 'USER.PDS']
+    assert members == ['ALPHA', 'BETA']
+    assert buffer.getvalue() == records(2000)
+    assert [s.ddname for s in spools] == ['JESMSGLG', 'SYSPRINT']
+    # Every SITE command is followed by the transfer it was sent for
+    sites = [i for i, command in enumerate(server.commands) if command.startswith('SITE')]
+    for i in sites:
+        assert server.commands[i + 1:i + 3] == ['TYPE A', 'PASV'] or server.commands[i + 1] == 'QUIT'
+
+
+def test_stopping_a_stream_early_releases_the_session(server):
+    async def main():
+        async with session(server) as ftp:
+            async with aclosing(ftp.lines("RETR 'USER.DATA'")) as lines:
+                async for line in lines:
+                    break
+            assert not ftp.lock.locked()
+            return line, await asyncio.wait_for(ftp.list_datasets("'USER.*'"), 5)
+    line, datasets = asyncio.run(main())
+    assert line == records(1).rstrip('\n')
+    assert len(datasets) == 2
+
+
+def test_job_listing_pages_past_the_entry_limit(server):
+    async def main():
+        async with session(server) as ftp:
+            return await ftp.list_jobs()
+    jobs = asyncio.run(main())
+    assert sorted(job.id for job in jobs) == server.jobs
+    assert any('JESENTRYLIMIT' in command for command in server.commands)
+
+
+def test_pool_drops_broken_sessions(server):
+    async def break_connection(ftp: AsyncZFTP):
+        ftp.writer.transport.abort()
+        raise ConnectionResetError('Connection reset by peer')
+
+    async def main():
+        async with AsyncSessionPool('127.0.0.1', 'USER', 'secret', size=1, port=server.server_address[1]) as pool:
+            with pytest.raises(ConnectionResetError):
+                await pool.run(break_connection)
+            assert pool.sessions == []
+            datasets = await pool.run(AsyncZFTP.list_datasets, "'USER.*'")
+            assert len(pool.sessions) == 1
+            return datasets
+    assert len(asyncio.run(main())) == 2
@@ -0,0 +1,67 @@
+'''Compressed transfer mode (MODE C) encoding and decoding'''
+from zosedit.compression import Compressor, Decompressor, compress, EOF, EOR, RESTART
+
+RECORDS = b''.join(f'RECORD {i:05d}'.encode().ljust(80) for i in range(1000))
+
+
+def decode(data: bytes, feed: int = None, **kwargs) -> tuple[bytes, Decompressor]:
+    decoder = Decompressor(**kwargs)
+    step = feed or len(data) or 1
+    out = b''.join(decoder.feed(data[i:i + step]) for i in range(0, len(data), step))
+    return out, decoder
+
+
+def encode(data: bytes, record_length: int = None, block: int = 4096) -> bytes:
+    encoder = Compressor(record_length=record_length)
+    return b''.join(encoder.feed(data[i:i + block]) for i in range(0, len(data), block)) + encoder.finish()
+
+
+def test_round_trip_without_records():
+    data = RECORDS + b'\x00' * 300 + b'abc' * 100 + bytes(range(256))
+    out, decoder = decode(encode(data), record_end=b'')
+    assert out == data and decoder.eof
+
+
+def test_records_end_with_markers():
+    # Records split across blocks still end every 80 bytes, and a short last record is ended too
+    data = RECORDS + b'SHORT'
+    wire = encode(data, record_length=80, block=1000)
+    out, decoder = decode(wire, record_end=b'|')
+    assert out.split(b'|') == [RECORDS[i:i + 80] for i in range(0, len(RECORDS), 80)] + [b'SHORT', b'']
+    assert decoder.eof
+
+
+def test_compresses_blank_padding():
+    assert len(encode(RECORDS, record_length=80)) < len(RECORDS) / 3
+
+
+def test_segments_split_across_feeds():
+    wire = encode(RECORDS, record_length=80)
+    for feed in (1, 2, 3, 127, 1000):
+        out, decoder = decode(wire, feed, record_end=b'\n')
+        assert out == b'\n'.join(RECORDS[i:i + 80] for i in range(0, len(RECORDS), 80)) + b'\n'
+        assert decoder.eof
+
+
+def test_restart_markers_and_offsets():
+    wire = compress(b'first') + bytes((0, EOR | RESTART)) + bytes((2,)) + b'42' + compress(b'second')
+    wire += bytes((0, RESTART, 3)) + b'100' + bytes((0, EOF))
+    decoder = Decompressor(record_end=b'\r\n')
+    out = decoder.feed(wire)
+    assert out == b'first\r\nsecond'
+    assert decoder.markers == [b'42', b'100']
+    assert decoder.restarts == [(7, b'42'), (13, b'100')]
+    assert decoder.eof
+
+
+def test_nothing_is_decoded_past_eof():
+    decoder = Decompressor()
+    assert decoder.feed(compress(b'data') + bytes((0, EOF)) + compress(b'trailing')) == b'data'
+    assert decoder.eof
+    assert decoder.feed(compress(b'more')) == b''
+
+
+def test_truncated_stream_has_no_eof():
+    wire = encode(RECORDS)
+    out, decoder = decode(wire[:len(wire) // 2])
+    assert not decoder.eof and RECORDS.startswith(out)
@@ -0,0 +1,54 @@
+'''Generated JCL has to fit the statement columns: JCL statements end by column 71.'''
+import pytest
+from zosedit.hostcopy import copy_dataset_name, copy_jcl, copy_name
+from zosedit.models import Dataset
+from zosedit.superc import search_jcl
+
+LONG = 'ABCDEFGH.IJKLMNOP.QRSTUVWX.YZABCDEF.GHIJKLMN'  # 44 characters, the longest dataset name
+
+
+def dataset(name: str, dsorg: str = 'PO', member: str = None) -> Dataset:
+    return Dataset.parse(f"VOL001 3390   2024/01/01  1   15  FB      80 27920  {dsorg}  '{name}'", member)
+
+
+def assert_fits(jcl: str):
+    for line in jcl.splitlines():
+        if line.startswith('//'):
+            assert len(line) <= 71, f'{len(line)} characters: {line}'
+
+
+def test_search_jcl_fits():
+    assert_fits(search_jcl([(dataset(LONG), 'MEMBER*'), (dataset(LONG, 'PS'), None)], ['needle']))
+
+
+def test_copy_jcl_fits():
+    source = dataset(LONG)
+    target = LONG.replace('ABCDEFGH', 'TARGETDS')
+    for allocate in (False, True):
+        assert_fits(copy_jcl(source, target, allocate=allocate))
+        assert_fits(copy_jcl(source, target, ['MEMBER01'], move=True, replace=True, allocate=allocate))
+        assert_fits(copy_jcl(source, f'{target}(NEWNAME)', ['MEMBER01'], allocate=allocate))
+        assert_fits(copy_jcl(dataset(LONG, member='MEMBER01'), f'{LONG}(NEWNAME)', allocate=allocate))
+        assert_fits(copy_jcl(dataset(LONG, 'PS'), f'{target}(NEWNAME)', allocate=allocate))
+    assert_fits(copy_jcl(dataset('USER.SRC.COBOL'), 'USER.SRC.BACKUP', allocate=True))
+
+
+def test_copy_name_differs():
+    for member in ('A', 'MEMBER01', 'MEMBER0@', 'ABC@'):
+        assert copy_name(member) != member and len(copy_name(member)) <= 8
+        copy_jcl(dataset(LONG, member=member), f'{LONG}({copy_name(member)})')
+
+
+def test_copy_dataset_name_fits():
+    assert copy_dataset_name('USER.SRC.COBOL') == 'USER.SRC.COBOL.COPY'
+    assert copy_dataset_name(LONG) == 'ABCDEFGH.IJKLMNOP.QRSTUVWX.YZABCDEF.COPY'
+    for name in (LONG[:40], LONG[:41], LONG[:42] + '.C', 'ABCDEFGH.IJKLMNOP.QRSTUVWX.YZABCDEF.GHI.COPY',
+                 LONG[:42] + '.@', 'ABCDEFGH.IJKLMNOP.QRSTUVWX.YZABCDEF.GHIJ.@'):
+        copy = copy_dataset_name(name)
+        assert copy != name and len(copy) <= 44 and all(copy.split('.')), copy
+        copy_jcl(dataset(name), copy)
+
+
+def test_copy_jcl_rejects_long_names():
+    with pytest.raises(ValueError):
+        copy_jcl(dataset(LONG), f'{LONG}.COPY')
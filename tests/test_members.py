@@ -0,0 +1,73 @@
+'''Members: parsing member listings, sort orders and change fingerprints'''
+from zosedit.models import Members
+
+HEADER = ' Name     VV.MM   Created       Changed      Size  Init   Mod   Id'
+LISTING = [
+    HEADER,
+    'ALPHA     01.02 2024/01/01 2024/03/05 09:30    40    40     0 USER1',
+    'BETA      01.00 2023/06/01 2024/01/10 14:00   120   100     5 USER2',
+    'GAMMA',  # Saved without ISPF statistics
+    'LOADMOD   00C8F0  00C8F0  00 RMODE ANY',  # Load module attributes aren't statistics
+    'ZETA      02.11 2022/12/24 2024/03/05 09:30     7     7     0 USER1',
+    '',
+]
+
+
+def test_parse_keeps_listing_order_and_statistics():
+    members = Members.parse(LISTING)
+    assert members == ['ALPHA', 'BETA', 'GAMMA', 'LOADMOD', 'ZETA']
+    assert members.stats(1) == {'name': 'BETA', 'version': '01.00', 'created': '2023/06/01',
+                                'changed': '2024/01/10 14:00', 'size': 120, 'user': 'USER2'}
+
+
+def test_parse_lines_without_statistics():
+    members = Members.parse(LISTING)
+    for i in (2, 3):
+        assert members.stats(i) == {'name': members[i], 'version': '', 'created': '',
+                                    'changed': '', 'size': -1, 'user': ''}
+
+
+def test_parse_header_only():
+    members = Members.parse([HEADER])
+    assert members == []
+    assert members.order('size') == []
+    assert members.fingerprints() == {}
+
+
+def test_order_by_column():
+    members = Members.parse(LISTING)
+    assert members.order() == [0, 1, 2, 3, 4]
+    assert members.order('name', True) == [4, 3, 2, 1, 0]
+    assert members.order('size') == [2, 3, 4, 0, 1]  # No statistics sort as -1
+    assert members.order('size', True) == [1, 0, 4, 2, 3]
+    # Ties keep name order either way
+    assert members.order('changed') == [2, 3, 1, 0, 4]
+    assert members.order('changed', True) == [0, 4, 1, 2, 3]
+    assert members.order('user') == [2, 3, 0, 4, 1]
+
+
+def test_order_is_cached():
+    members = Members.parse(LISTING)
+    assert members.order('size') is members.order('size')
+    assert members.order('size') is not members.order('size', True)
+
+
+def test_fingerprints():
+    members = Members.parse(LISTING)
+    assert members.fingerprints() == {
+        'ALPHA': '01.02 2024/03/05 09:30 40',
+        'BETA': '01.00 2024/01/10 14:00 120',
+        'GAMMA': None,
+        'LOADMOD': None,
+        'ZETA': '02.11 2024/03/05 09:30 7',
+    }
+    assert [members.fingerprint(i) for i in range(len(members))] == list(members.fingerprints().values())
+
+
+def test_fingerprints_change_with_a_save():
+    before = Members.parse(LISTING)
+    after = Members.parse([line.replace('01.02 2024/01/01 2024/03/05 09:30    40',
+                                        '01.03 2024/01/01 2024/03/06 11:00    41') for line in LISTING])
+    changed = [name for name, fingerprint in after.fingerprints().items()
+               if before.fingerprints()[name] != fingerprint]
+    assert changed == ['ALPHA']
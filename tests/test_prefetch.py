@@ -0,0 +1,54 @@
+'''Prefetcher: handing over results of work run on spare sessions'''
+import threading
+import pytest
+from zosedit.prefetch import Prefetcher
+from zosedit.zftp import zFTP
+from tests.fakeftp import FakeServer
+
+
+@pytest.fixture
+def prefetcher():
+    server = FakeServer()
+    zftp = zFTP(server.address, 'USER', 'secret')
+    zftp.connect()
+    prefetcher = Prefetcher(zftp)
+    yield prefetcher
+    prefetcher.close()
+    zftp.quit()
+    server.stop()
+
+
+def test_take_waits_for_work_in_flight(prefetcher):
+    started, release = threading.Event(), threading.Event()
+
+    def fetch(session):
+        started.set()
+        release.wait(5)
+        return ['result']
+
+    prefetcher.schedule('key', fetch)
+    started.wait(5)
+    threading.Timer(0.1, release.set).start()
+    assert prefetcher.take('key') == ['result']
+    assert prefetcher.take('key') is None
+
+
+def test_take_without_waiting_skips_work_in_flight(prefetcher):
+    started, release = threading.Event(), threading.Event()
+
+    def fetch(session):
+        started.set()
+        release.wait(5)
+        return ['slow']
+
+    prefetcher.schedule('slow', fetch)
+    started.wait(5)
+    assert prefetcher.take('slow', wait=False) is None
+    release.set()
+    assert prefetcher.take('slow') is None  # Dropped, not left behind
+
+    finished = threading.Event()
+    prefetcher.schedule('fast', lambda session: ['fast'])
+    prefetcher.futures['fast'].add_done_callback(lambda future: finished.set())
+    finished.wait(5)
+    assert prefetcher.take('fast', wait=False) == ['fast']
@@ -0,0 +1,98 @@
+'''zFTP transfers against the fake server, in stream and compressed mode'''
+import io
+import pytest
+from zosedit import records
+from zosedit.cli import parser
+from zosedit.models import Dataset
+from zosedit.zftp import zFTP
+from tests.fakeftp import FakeServer, records as fake_records
+
+
+@pytest.fixture
+def server():
+    server = FakeServer()
+    yield server
+    server.stop()
+
+
+def session(server: FakeServer, compress: bool = True) -> zFTP:
+    zftp = zFTP(server.address, 'USER', 'secret', compress=compress)
+    zftp.connect()
+    return zftp
+
+
+def dataset(name: str = 'USER.DATA', recfm: str = 'FB', lrecl: int = 80) -> Dataset:
+    return Dataset.parse(f"VOL001 3390   2024/01/01  1   15  {recfm:<5} {lrecl:>5} 27920  PS  '{name}'")
+
+
+def modes(server: FakeServer) -> list[str]:
+    return [command for command in server.commands if command.startswith('MODE')]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_download_in_either_mode(server, tmp_path, compress):
+    text = fake_records(5000)
+    server.add_dataset('USER.DATA', text)
+    path = session(server, compress).download(dataset(), tmp_path / 'data.txt')
+    assert path.read_text() == text
+    assert modes(server) == (['MODE C', 'MODE S'] if compress else [])
+
+
+@pytest.mark.parametrize('recfm, lrecl, length', [('FB', 80, 80), ('VB', 255, 251)])
+def test_compressed_store_keeps_records(server, recfm, lrecl, length):
+    # Records reach the host as records: each one is ended with a marker, not cut from a byte stream
+    target = dataset(recfm=recfm, lrecl=lrecl)
+    text = '\n'.join(f'LINE {i}' for i in range(2000))
+    session(server).upload(target, records.encode(text, target, 'cp037'))  # cp1047 needs the ebcdic package
+    assert modes(server) == ['MODE C', 'MODE S']
+    stored = [record.decode('cp037') for record in server.stored['USER.DATA'].split(b'\n')]
+    assert stored[:-1] == [f'LINE {i}'.ljust(length) for i in range(2000)] and stored[-1] == ''
+
+
+def test_small_and_text_stores_use_stream_mode(server):
+    zftp = session(server)
+    zftp.upload(dataset(), b'X' * 800)
+    zftp.upload(Dataset(name='/u/user/big.txt'), 'line\n' * 20000)
+    assert modes(server) == []
+    assert server.stored['/u/user/big.txt'] == b'line\n' * 20000
+
+
+def test_upload_closes_only_the_files_it_opens(server, tmp_path, monkeypatch):
+    zftp = session(server)
+    target = dataset()
+    target.local_path = tmp_path / 'data.bin'
+    target.local_path.write_bytes(b'X' * 800)
+    opened = []
+    path_open = type(target.local_path).open
+
+    def open_file(*args):
+        opened.append(path_open(*args))
+        return opened[-1]
+
+    monkeypatch.setattr(type(target.local_path), 'open', open_file)
+    zftp.upload(target)
+    own = io.BytesIO(b'Y' * 800)
+    zftp.upload(dataset(), own)
+    assert len(opened) == 1 and opened[0].closed
+    assert not own.closed
+
+
+def test_store_progress_counts_source_bytes(server):
+    zftp = session(server)
+    seen = []
+
+    class Source(io.BytesIO):
+        def read(self, size=-1):
+            if zftp.progress:
+                seen.append((zftp.progress.transferred, zftp.progress.wire))
+            return super().read(size)
+
+    data = records.encode(fake_records(3000).rstrip('\n'), dataset(), 'cp037')
+    zftp.upload(dataset(), Source(data))
+    transferred, wire = seen[-1]
+    assert transferred == len(data) and wire < transferred
+
+
+def test_cli_leaves_compression_to_the_environment():
+    assert parser().parse_args(['ls', 'USER.*']).compress is None
+    assert parser().parse_args(['ls', 'USER.*', '--no-compress']).compress is False
@@ -0,0 +1,412 @@
+'''asyncio implementation of the zFTP API.
+
+Every AsyncZFTP owns one control connection; data connections are streamed with
+asyncio readers/writers, so hundreds of sessions can be multiplexed on a single
+event loop without a thread per transfer:
+
+    async with AsyncSessionPool(host, user, password, size=64) as pool:
+        async for spool, path, error in pool.map(download, spools):
+            ...
+
+A session runs one operation at a time: concurrent tasks sharing an AsyncZFTP
+take turns, each holding the control connection from its SITE command to the
+final reply of its transfer.
+'''
+import io
+import re
+import sys
+import asyncio
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Iterable, Literal, Union
+from zosedit import constants
+from zosedit.constants import tempdir
+from zosedit.models import Dataset, Job, Members, Spool, Submission
+from zosedit.zftp import (zFTP, zFTPError, narrow_job_id, parse_datasets, parse_members, parse_jobs,
+                          parse_spools)
+
+
+AsyncSource = Union[bytes, str, Iterable[Union[bytes, str]], AsyncIterable[Union[bytes, str]]]
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AsyncZFTP:
+
+    def __init__(self, host: str = None, user: str = None, password: str = None,
+                 port: int = 21, encoding: str = 'utf-8'):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.encoding = encoding
+        self.reader: asyncio.StreamReader = None
+        self.writer: asyncio.StreamWriter = None
+        self.lock = asyncio.Lock()
+        self.owner: asyncio.Task = None  # Task holding the lock
+        self.last_response = ''  # Final reply of the last transfer
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.quit()
+
+    @asynccontextmanager
+    async def operation(self):
+        '''Hold the control connection for one operation. Reentrant within a task,
+        so operations can be made of other operations.'''
+        task = asyncio.current_task()
+        if self.owner is task:
+            yield
+            return
+        async with self.lock:
+            self.owner = task
+            try:
+                yield
+            finally:
+                self.owner = None
+
+    # === Control connection ===
+    async def connect(self, host=None, user=None, password=None):
+        self.host = host or self.host
+        self.user = user or self.user
+        self.password = password or self.password
+        async with self.operation():
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            await self._response('2')
+            response = await self._command(f'USER {self.user}', '23')
+            if response.startswith('331'):
+                await self._command(f'PASS {self.password}', '2')
+        return True
+
+    async def quit(self):
+        if not self.writer:
+            return
+        async with self.operation():
+            try:
+                await self._command('QUIT')
+            except (OSError, zFTPError, asyncio.IncompleteReadError):
+                pass
+            self.close()
+
+    def close(self):
+        '''Drop the control connection without saying goodbye, e.g. when it is already broken'''
+        if self.writer:
+            self.writer.close()
+        self.writer = self.reader = None
+
+    def is_connected(self) -> bool:
+        return bool(self.reader) and not self.reader.at_eof() and not self.writer.is_closing()
+
+    async def _response(self, expect: str = None) -> str:
+        lines = [(await self.reader.readline()).decode(self.encoding, 'replace').rstrip('\r\n')]
+        if not lines[0]:
+            raise zFTPError('Connection closed by server')
+        if lines[0][3:4] == '-':
+            code = lines[0][:3]
+            while True:
+                line = (await self.reader.readline()).decode(self.encoding, 'replace').rstrip('\r\n')
+                lines.append(line)
+                if line.startswith(code + ' ') or not line:
+                    break
+        response = '\n'.join(lines)
+        if expect and response[:1] not in expect:
+            raise zFTPError(response, response[:3])
+        return response
+
+    async def _command(self, command: str, expect: str = '2') -> str:
+        async with self.operation():
+            self.writer.write(command.encode(self.encoding) + b'\r\n')
+            await self.writer.drain()
+            return await self._response(expect)
+
+    async def set_ftp_vars(self, mode=Literal['SEQ', 'JES', 'SQL'], **kwargs):
+        args = ' '.join(f"{key}={value}" for key, value in kwargs.items() if value is not None)
+        await self._command(f'SITE FILETYPE={mode} {args}')
+
+    # === Data connections ===
+    async def _transfer(self, command: str, type_: str = 'A'):
+        '''Open a passive data connection and issue `command`, returns the data streams'''
+        await self._command(f'TYPE {type_}')
+        response = await self._command('PASV')
+        numbers = re.search(r'(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)', response).groups()
+        port = int(numbers[4]) << 8 | int(numbers[5])
+        reader, writer = await asyncio.open_connection(self.host, port)
+        try:
+            await self._command(command, '1')
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def stream(self, command: str, type_: str = 'A') -> AsyncIterator[bytes]:
+        '''Issue a retrieval command and yield the raw data connection chunks. The
+        session is held until the generator finishes, so consumers that may stop
+        early should close it with contextlib.aclosing.'''
+        async with self.operation():
+            self.last_response = ''
+            reader, writer = await self._transfer(command, type_)
+            complete = False
+            try:
+                while chunk := await reader.read(CHUNK_SIZE):
+                    yield chunk
+                complete = True
+            finally:
+                writer.close()
+                # A transfer cut short ends with an abort reply rather than a 2xx one
+                self.last_response = await self._response('2' if complete else None)
+
+    async def lines(self, command: str) -> AsyncIterator[str]:
+        '''Issue a retrieval command and yield the text lines as they arrive'''
+        pending = b''
+        async with aclosing(self.stream(command)) as chunks:
+            async for chunk in chunks:
+                pending += chunk
+                *complete, pending = pending.split(b'\n')
+                for line in complete:
+                    yield line.rstrip(b'\r').decode(self.encoding, 'replace')
+        if pending:
+            yield pending.rstrip(b'\r').decode(self.encoding, 'replace')
+
+    async def store(self, command: str, data: AsyncSource, type_: str = 'I') -> str:
+        async with self.operation():
+            reader, writer = await self._transfer(command, type_)
+            try:
+                if isinstance(data, str):
+                    data = data.encode(self.encoding)
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    data = [data]
+                if hasattr(data, '__aiter__'):
+                    async for chunk in data:
+                        writer.write(chunk.encode(self.encoding) if isinstance(chunk, str) else chunk)
+                        await writer.drain()
+                else:
+                    for chunk in data:
+                        writer.write(chunk.encode(self.encoding) if isinstance(chunk, str) else chunk)
+                        await writer.drain()
+            finally:
+                writer.close()
+                await writer.wait_closed()
+            self.last_response = await self._response('2')
+            return self.last_response
+
+    async def _listing(self, command: str, message: str) -> list[str]:
+        try:
+            async with aclosing(self.lines(command)) as lines:
+                return [line async for line in lines]
+        except zFTPError as e:
+            if e.code == '550':
+                return []
+            raise zFTPError(f'{message}:\n{e}', e.code)
+
+    # === Datasets ===
+    async def list_datasets(self, search_string: str) -> list[Dataset]:
+        async with self.operation():
+            await self.set_ftp_vars('SEQ')
+            return parse_datasets(await self._listing(f'LIST {search_string}', 'Error listing datasets'))
+
+    async def get_members(self, dataset: Dataset) -> Members:
+        async with self.operation():
+            await self.set_ftp_vars('SEQ', VOLUME=dataset.volume)
+            lines = await self._listing(f"LIST '{dataset.name}(*)'", f'Error getting members for {dataset.name}')
+        return parse_members(lines)
+
+    async def retrieve(self, dataset: Dataset) -> io.StringIO:
+        buffer = io.StringIO()
+        try:
+            async with self.operation():
+                await self.set_ftp_vars('SEQ', VOLUME=dataset.volume)
+                async with aclosing(self.lines(f"RETR '{dataset.name}'")) as lines:
+                    async for line in lines:
+                        buffer.write(line)
+                        buffer.write('\n')
+        except zFTPError as e:
+            raise zFTPError(f'Error downloading dataset {dataset.name}:\n{e}', e.code)
+        buffer.seek(0)
+        return buffer
+
+    async def download(self, dataset: Dataset, path: Path = None) -> Path:
+        path = path or tempdir / dataset.name
+        try:
+            async with self.operation():
+                await self.set_ftp_vars('SEQ', VOLUME=dataset.volume)
+                await self._save(f"RETR '{dataset.name}'", path)
+        except zFTPError as e:
+            raise zFTPError(f'Error downloading dataset {dataset.name}:\n{e}', e.code)
+        dataset.local_path = path
+        return path
+
+    async def upload(self, dataset: Dataset, data: AsyncSource = None):
+        try:
+            async with self.operation():
+                if dataset.member:
+                    await self.set_ftp_vars('SEQ')
+                else:
+                    await self.set_ftp_vars('SEQ', RECFM=dataset.recformat, LRECL=dataset.reclength,
+                                            BLKSIZE=dataset.block_size)
+                await self.store(f"STOR '{dataset.name}'",
+                                 dataset.local_path.read_bytes() if data is None else data)
+        except zFTPError as e:
+            raise zFTPError(f'Error uploading dataset {dataset.name}:\n{e}', e.code)
+
+    async def delete(self, dataset: Dataset):
+        try:
+            async with self.operation():
+                await self.set_ftp_vars('SEQ', VOLUME=dataset.volume)
+                await self._command(f"DELE '{dataset.name}'")
+        except zFTPError as e:
+            raise zFTPError(f'Error deleting dataset {dataset.name}:\n{e}', e.code)
+
+    # === Jobs ===
+    async def submit_jcl(self, jcl: AsyncSource, name: str = 'ZEDITJOB') -> Submission:
+        if isinstance(jcl, str):
+            jcl = jcl.replace('\r\n', '\n').replace('\n', '\r\n')
+        try:
+            async with self.operation():
+                await self.set_ftp_vars('JES')
+                return Submission(await self.store(f"STOR '{name}'", jcl, type_='A'))
+        except zFTPError as e:
+            raise zFTPError(f'Error submitting job:\n{e}', e.code)
+
+    async def submit_job(self, dataset: Dataset, data: AsyncSource = None) -> Submission:
+        if data is None:
+            data = (await self.retrieve(dataset)).getvalue()
+        return await self.submit_jcl(data, dataset.name)
+
+    async def list_jobs(self, name=None, id=None, owner=None) -> list[Job]:
+        jobs = []
+        async for page, truncated in self.iter_jobs(name, id, owner):
+            jobs.extend(page)
+            if truncated:
+                print('Job listing truncated', file=sys.stderr)
+        jobs.sort(key=lambda job: (job.rc == 'Active'), reverse=True)
+        return jobs
+
+    async def iter_jobs(self, name=None, id=None, owner=None,
+                        limit: int = None) -> AsyncIterator[tuple[list[Job], bool]]:
+        '''Yield (jobs, truncated) a page at a time, narrowing job ID patterns past
+        JESENTRYLIMIT the same way as zFTP.iter_jobs'''
+        name = name or '*'
+        owner = owner or '*'
+        limit = limit or constants.JOB_LIST_LIMIT
+        pending = [id or '*']
+        seen: dict[str, Job] = {}
+        while pending:
+            pattern = pending.pop(0)
+            lines, complete = await self._list_jobs_page(name, pattern, owner)
+            page = [job for job in parse_jobs(lines) if job.id not in seen][:limit - len(seen)]
+            for job in page:
+                job.host = self.host
+            seen.update((job.id, job) for job in page)
+            narrower = [] if complete else narrow_job_id(pattern)
+            pending[:0] = narrower
+            full = len(seen) >= limit
+            truncated = (not complete and not narrower) or (full and bool(pending))
+            if page or truncated:
+                yield page, truncated
+            if full:
+                return
+
+    async def _list_jobs_page(self, name: str, id: str, owner: str) -> tuple[list[str], bool]:
+        '''One JES listing; returns its lines and whether it was complete'''
+        async with self.operation():
+            await self.set_ftp_vars('JES', JESJOBNAME=name, JESOWNER=owner, JESENTRYLIMIT=zFTP.JES_ENTRY_LIMIT)
+            lines = await self._listing(f'LIST {id}', 'Error listing jobs')
+            return lines, 'JESENTRYLIMIT' not in self.last_response
+
+    async def list_spools(self, job: Job) -> list[Spool]:
+        async with self.operation():
+            await self.set_ftp_vars('JES')
+            lines = await self._listing(f'LIST {job.id}', 'Error listing spool outputs')
+        return parse_spools(lines, job)
+
+    async def download_spool(self, spool: Spool, path: Path = None) -> Path:
+        path = path or tempdir / f'{spool.id}.txt'
+        try:
+            async with self.operation():
+                await self.set_ftp_vars('JES')
+                await self._save(f'RETR {spool.job.id}.{spool.id}', path)
+        except zFTPError as e:
+            raise zFTPError(f'Error downloading spool {spool.job.id}.{spool.ddname}:\n{e}', e.code)
+        spool.local_path = path
+        return path
+
+    async def _save(self, command: str, path: Path):
+        '''Stream a retrieval to disk without holding the whole file in memory'''
+        with path.open('wb') as f:
+            carry = b''
+            async with aclosing(self.stream(command)) as chunks:
+                async for chunk in chunks:
+                    chunk = carry + chunk
+                    carry = b'\r' if chunk.endswith(b'\r') else b''
+                    f.write(chunk[:len(chunk) - len(carry)].replace(b'\r\n', b'\n'))
+            f.write(carry)
+
+
+class AsyncSessionPool:
+    '''Up to `size` AsyncZFTP sessions sharing one set of credentials, opened lazily'''
+
+    def __init__(self, host: str, user: str, password: str, size: int = 16, port: int = 21):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.size = size
+        self.sessions: list[AsyncZFTP] = []
+        self.idle: asyncio.LifoQueue = None
+        self.slots: asyncio.Semaphore = None
+
+    async def __aenter__(self):
+        self.idle = asyncio.LifoQueue()
+        self.slots = asyncio.Semaphore(self.size)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _acquire(self) -> AsyncZFTP:
+        if self.idle.empty() and len(self.sessions) < self.size:
+            session = AsyncZFTP(self.host, self.user, self.password, self.port)
+            self.sessions.append(session)
+            try:
+                await session.connect()
+            except BaseException:
+                self.sessions.remove(session)
+                raise
+            return session
+        return await self.idle.get()
+
+    async def run(self, func, *args):
+        '''Await func(session, *args) on a pooled session. Sessions whose connection
+        broke are dropped, and a new one is opened in their place when needed.'''
+        async with self.slots:
+            session = await self._acquire()
+            broken = False
+            try:
+                return await func(session, *args)
+            except (OSError, asyncio.IncompleteReadError):
+                broken = True  # The control connection may be mid reply, so it can't be reused
+                raise
+            finally:
+                if not broken and session.is_connected():
+                    self.idle.put_nowait(session)
+                else:
+                    self.sessions.remove(session)
+                    session.close()
+
+    async def map(self, func, items: Iterable) -> AsyncIterator[tuple]:
+        '''Run func(session, item) for every item, yielding (item, result, error) as each finishes'''
+        async def run(item):
+            try:
+                return item, await self.run(func, item), None
+            except Exception as e:
+                return item, None, e
+
+        for task in asyncio.as_completed([run(item) for item in items]):
+            yield await task
+
+    async def close(self):
+        await asyncio.gather(*(session.quit() for session in self.sessions), return_exceptions=True)
+        self.sessions = []
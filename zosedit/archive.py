@@ -0,0 +1,150 @@
+import json
+import threading
+import zipfile
+from concurrent.futures import as_completed
+from pathlib import Path
+from time import time
+from zosedit.constants import tempdir
+from zosedit.models import Job, Spool
+from zosedit.zftp import zFTP, zFTPError, TransferCancelled
+
+
+class ArchiveReport:
+    '''Outcome of archiving a batch of jobs, failures included'''
+
+    def __init__(self, path: Path, total: int):
+        self.path = path
+        self.total = total
+        self.archived: list[Job] = []  # Jobs with every spool in the archive
+        self.purged: list[Job] = []
+        self.bytes = 0
+        self.errors: list[str] = []
+        self.failed: set[str] = set()  # Jobs with errors, as labelled in them
+        self.start = time()
+        self.lock = threading.Lock()
+
+    @property
+    def done(self) -> int:
+        return len(self.archived) + len(self.failed)
+
+    def error(self, job: Job, message: str):
+        with self.lock:
+            self.errors.append(f'{job_label(job)}: {message}')
+            self.failed.add(job_label(job))
+
+    def __str__(self):
+        text = f'Archived {len(self.archived)} of {self.total} job(s), {self.bytes} bytes, to {self.path}'
+        if self.purged:
+            text += f', purged {len(self.purged)}'
+        if self.errors:
+            text += f', {len(self.failed)} failed'
+        return text + f' in {time() - self.start:.1f}s'
+
+
+class ArchiveWriter:
+    '''A zip archive that many download threads add spools to. Each spool is
+    downloaded to its own temporary file and then streamed into the archive, so
+    memory use doesn't grow with the size of the output; only the compression
+    into the archive is serialised. An index of the jobs and their spool entries
+    is written last, as index.json.'''
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # Level 1: spool text still shrinks well, and compression is the serialised part
+        self.zip = zipfile.ZipFile(self.path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.index: list[dict] = []
+        self.lock = threading.Lock()
+
+    def add(self, file: Path, name: str):
+        with self.lock:
+            self.zip.write(file, name)
+
+    def add_job(self, job: Job, spools: list[tuple[Spool, str]]):
+        entry = {'host': job.host, 'id': job.id, 'name': job.name, 'owner': job.owner, 'status': job.status,
+                 'rc': job.rc, 'spools': [{'id': spool.id, 'stepname': spool.stepname, 'procstep': spool.procstep,
+                                           'ddname': spool.ddname, 'bytes': spool.byte_count, 'entry': name}
+                                          for spool, name in spools]}
+        with self.lock:
+            self.index.append(entry)
+
+    def close(self, errors: list[str] = ()):
+        with self.lock:
+            self.zip.writestr('index.json', json.dumps({'jobs': self.index, 'errors': list(errors)}, indent=2))
+            self.zip.close()
+
+
+def archive_jobs(jobs: list[Job], path: Path, pool_for, purge: bool = False,
+                 progress=None, cancelled: threading.Event = None) -> ArchiveReport:
+    '''Download the spools of `jobs` into one zip archive at `path`, in parallel on
+    the SessionPool pool_for(job) returns for each job. With `purge`, jobs whose
+    output was archived completely are then purged, also in parallel; jobs with
+    any failure are kept. progress(report) is called from worker threads as jobs
+    finish. Failures don't stop the batch, they are collected in the report.'''
+    report = ArchiveReport(Path(path), len(jobs))
+    writer = ArchiveWriter(path)
+    try:
+        futures = {pool_for(job).submit(archive_job, job, writer, report, cancelled): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                if future.result():
+                    with report.lock:
+                        report.archived.append(job)
+            except Exception as e:
+                report.error(job, str(e))
+            if progress:
+                progress(report)
+    finally:
+        writer.close(report.errors)
+
+    if purge and report.archived and not (cancelled and cancelled.is_set()):
+        futures = {pool_for(job).submit(zFTP.purge_job, job): job for job in report.archived}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                future.result()
+                report.purged.append(job)
+            except Exception as e:
+                report.error(job, str(e))
+            if progress:
+                progress(report)
+    return report
+
+
+def archive_job(session: zFTP, job: Job, writer: ArchiveWriter, report: ArchiveReport,
+                cancelled: threading.Event = None) -> bool:
+    '''Add every spool of a job to the archive; returns whether all of them made it'''
+    if cancelled and cancelled.is_set():
+        report.error(job, 'cancelled')
+        return False
+    folder = f"{job.host.replace(':', '_')}/" if job.host else ''
+    folder += f'{job.id}-{job.name}'
+    spools = session.list_spools(job)
+    added = []
+    complete = True
+    for spool in spools:
+        if cancelled and cancelled.is_set():
+            report.error(job, 'cancelled')
+            complete = False
+            break
+        name = f'{folder}/{spool.id.zfill(3)}-{spool.stepname}-{spool.ddname}.txt'
+        file = tempdir / f'archive-{threading.get_ident()}.txt'
+        try:
+            session.download_spool(spool, file)
+            writer.add(file, name)
+            with report.lock:
+                report.bytes += file.stat().st_size
+            added.append((spool, name))
+        except TransferCancelled:
+            raise
+        except (zFTPError, OSError) as e:
+            report.error(job, f'{spool.ddname}: {e}')
+            complete = False
+        finally:
+            file.unlink(missing_ok=True)
+    writer.add_job(job, added)
+    return complete
+
+
+def job_label(job: Job) -> str:
+    return f'{job.host} {job.id}' if job.host else job.id
@@ -0,0 +1,109 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from time import time
+from zosedit import constants
+from zosedit.models import Dataset, Job, Members, Spool, UnixFile
+from zosedit.zftp import parse_datasets, parse_members, parse_jobs, parse_spools, parse_unix_files
+
+
+class MetadataCache:
+    '''Persistent cache of raw catalog, member, job, spool and directory listings, keyed by
+    host and user. Listings are stored exactly as the server returned them and
+    parsed on the way out, so the cache stays valid across parser changes.'''
+
+    KINDS = 'datasets', 'members', 'jobs', 'spools', 'dirs'
+
+    def __init__(self, path: Path = None, max_bytes: int = None):
+        self.path = path or constants.tempdir / 'metadata.db'
+        self.max_bytes = max_bytes or constants.CACHE_MAX_BYTES
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS listings (
+                host TEXT, user TEXT, kind TEXT, query TEXT,
+                lines TEXT, size INTEGER, fetched REAL,
+                PRIMARY KEY (host, user, kind, query)
+            )''')
+        self.db.commit()
+
+    def get(self, host: str, user: str, kind: str, query) -> tuple[list[str], float]:
+        '''Returns (lines, fetched timestamp), or None when nothing is cached'''
+        query = key(query)
+        with self.lock:
+            row = self.db.execute(
+                'SELECT lines, fetched FROM listings WHERE host=? AND user=? AND kind=? AND query=?',
+                (host, user, kind, query)).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, host: str, user: str, kind: str, query, lines: list[str]):
+        query = key(query)
+        data = json.dumps(lines)
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (host, user, kind, query, data, len(data), time()))
+            self._trim()
+            self.db.commit()
+
+    def _trim(self):
+        '''Evict the oldest listings until the cache fits in max_bytes'''
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM listings').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute('SELECT rowid, size FROM listings ORDER BY fetched').fetchall()
+        evict = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            evict.append((rowid,))
+            total -= size
+        self.db.executemany('DELETE FROM listings WHERE rowid=?', evict)
+
+    def purge(self, host: str = None):
+        '''Remove everything cached for `host`, or the whole cache'''
+        with self.lock:
+            if host:
+                self.db.execute('DELETE FROM listings WHERE host=?', (host,))
+            else:
+                self.db.execute('DELETE FROM listings')
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # === Parsed views ===
+    def datasets(self, host, user, search: str) -> tuple[list[Dataset], float]:
+        return self._parsed(host, user, 'datasets', search, parse_datasets)
+
+    def members(self, host, user, dataset: Dataset) -> tuple[Members, float]:
+        return self._parsed(host, user, 'members', dataset.name, parse_members)
+
+    def jobs(self, host, user, name=None, id=None, owner=None) -> tuple[list[Job], float]:
+        return self._parsed(host, user, 'jobs', (name or '*', id or '*', owner or '*'), parse_jobs)
+
+    def spools(self, host, user, job: Job) -> tuple[list[Spool], float]:
+        return self._parsed(host, user, 'spools', job.id, lambda lines: parse_spools(lines, job))
+
+    def directory(self, host, user, path: str, mtime: str = None) -> tuple[list[UnixFile], float]:
+        '''A directory listing cached under the given mtime, so it misses once the directory changes'''
+        return self._parsed(host, user, 'dirs', (path, mtime or ''), lambda lines: parse_unix_files(lines, path))
+
+    def _parsed(self, host, user, kind, query, parse):
+        cached = self.get(host, user, kind, query)
+        if cached is None:
+            return None
+        lines, fetched = cached
+        items = parse(lines)
+        for item in items:
+            if hasattr(item, 'host'):
+                item.host = host
+        return items, fetched
+
+
+def key(query) -> str:
+    '''Cache key for a listing query; multi-part queries (job searches) are passed as tuples'''
+    return ' '.join(query) if isinstance(query, tuple) else query
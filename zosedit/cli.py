@@ -0,0 +1,358 @@
+'''Command line interface for scripted transfers. Runs without dearpygui.
+
+    zosedit                          start the GUI
+    zosedit ls 'USER.*' 'USER.SRC(*)'
+    zosedit get 'USER.SRC(ABC*)' -o src/
+    zosedit put src/*.cbl USER.SRC
+    zosedit submit USER.JCL(BUILD) build.jcl --wait
+    zosedit jobs --owner USER
+    zosedit spool JOB01234 -o out/
+    zosedit archive out.zip --owner USER --purge
+    zosedit grep 'CALL PAYCALC' 'USER.*.COBOL(PAY*)'
+    zosedit cp 'USER.SRC(PAY*)' USER.BACKUP --replace
+
+Connection details come from --host/--user or the ZOSEDIT_HOST, ZOSEDIT_USER
+and ZOSEDIT_PASSWORD environment variables.
+'''
+import os
+import re
+import sys
+import json
+import argparse
+from fnmatch import fnmatchcase
+from getpass import getpass
+from pathlib import Path
+from zosedit.models import Dataset, Job
+from zosedit.zftp import zFTP, zFTPError, SessionPool
+from zosedit import records
+from zosedit.archive import archive_jobs
+from zosedit.superc import search_targets, search_on_host
+from zosedit.hostcopy import copy_on_host, select_members
+from zosedit.trace import TraceRecorder
+
+
+def split_name(name: str) -> tuple[str, str]:
+    '''Split "DSN(MEMBER)" into ("DSN", "MEMBER"), stripping quotes'''
+    name = name.strip("'").upper()
+    if match := re.fullmatch(r'(.+)\((.*)\)', name):
+        return match.group(1), match.group(2)
+    return name, None
+
+
+def emit(args, rows: list[dict]):
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2, default=str)
+        print()
+        return
+    if not rows:
+        return
+    cols = list(dict.fromkeys(col for row in rows for col in row))
+    cells = [[str(row.get(col) if row.get(col) is not None else '') for col in cols] for row in rows]
+    widths = [max(len(col), *(len(row[i]) for row in cells)) for i, col in enumerate(cols)]
+    print('  '.join(col.upper().ljust(width) for col, width in zip(cols, widths)).rstrip())
+    for row in cells:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def fail(errors: list[str]) -> int:
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+def lookup(zftp: zFTP, name: str) -> Dataset:
+    '''Fetch the catalog entry for a dataset, or None if it does not exist'''
+    matches = [d for d in zftp.list_datasets(f"'{name}'") if d.name == name]
+    return matches[0] if matches else None
+
+
+def expand(zftp: zFTP, names: list[str]) -> list[Dataset]:
+    '''Resolve dataset names, expanding member patterns such as USER.SRC(ABC*)'''
+    datasets = []
+    for name in names:
+        dsn, member = split_name(name)
+        dataset = lookup(zftp, dsn) or Dataset(name=dsn)
+        if member and any(c in member for c in '*?'):
+            members = zftp.get_members(dataset)
+            datasets.extend(dataset(m) for m in members if fnmatchcase(m, member))
+        else:
+            datasets.append(dataset(member))
+    return datasets
+
+
+# === Commands ===
+def ls(args, zftp: zFTP, pool: SessionPool) -> int:
+    def search(session: zFTP, pattern: str):
+        dsn, member = split_name(pattern)
+        if member is None:
+            return [{col: getattr(d, col) for col in ('volume', 'recformat', 'reclength', 'type', 'name')}
+                    for d in session.list_datasets(f"'{dsn}'")]
+        members = session.get_members(Dataset(name=dsn))
+        return [{'name': f'{dsn}({m})', 'changed': members.changed[i], 'size': members.size[i] if members.changed[i] else '',
+                 'user': members.user[i]}
+                for i, m in enumerate(members) if fnmatchcase(m, member or '*')]
+
+    rows, errors = [], []
+    for pattern, result, error in pool.map(search, args.patterns):
+        if error:
+            errors.append(f'{pattern}: {error}')
+        else:
+            rows.extend(result)
+    emit(args, rows)
+    return fail(errors)
+
+
+def get(args, zftp: zFTP, pool: SessionPool) -> int:
+    out = Path(args.output)
+    out.mkdir(parents=True, exist_ok=True)
+
+    def fetch(session: zFTP, dataset: Dataset):
+        path = out / (dataset.member or dataset.name)
+        return session.download(dataset, path)
+
+    errors = []
+    for dataset, path, error in pool.map(fetch, expand(zftp, args.datasets)):
+        if error:
+            errors.append(f'{dataset.name}: {error}')
+        else:
+            print(f'{dataset.name} -> {path}')
+    return fail(errors)
+
+
+def put(args, zftp: zFTP, pool: SessionPool) -> int:
+    dsn, member = split_name(args.dest)
+    target = lookup(zftp, dsn)
+    if target is None:
+        return fail([f'{dsn}: dataset not found'])
+    if len(args.files) > 1 and not target.is_partitioned():
+        return fail([f'{dsn}: multiple files can only be stored into a partitioned dataset'])
+
+    def store(session: zFTP, file: str):
+        name = member or (Path(file).stem.upper()[:8] if target.is_partitioned() else None)
+        dataset = target(name)
+        text = Path(file).read_text()
+        session.upload(dataset, records.encode(text.rstrip('\n'), dataset))
+        return dataset
+
+    errors = []
+    for file, dataset, error in pool.map(store, args.files):
+        if error:
+            errors.append(f'{file}: {error}')
+        else:
+            print(f'{file} -> {dataset.name}')
+    return fail(errors)
+
+
+def submit(args, zftp: zFTP, pool: SessionPool) -> int:
+    def run(session: zFTP, source: str):
+        if Path(source).is_file():
+            submission = session.submit_jcl(Path(source).read_text())
+        else:
+            dsn, member = split_name(source)
+            submission = session.submit_job(Dataset(name=dsn, member=member))
+        if not args.wait or not submission.job_id:
+            return submission, None
+        return submission, session.wait_for_job(submission.job_id, args.interval)
+
+    rows, errors = [], []
+    for source, result, error in pool.map(run, args.sources):
+        if error:
+            errors.append(f'{source}: {error}')
+            continue
+        submission, job = result
+        rows.append({'source': source, 'id': submission.job_id, 'rc': job.rc if job else None})
+        if args.wait and job and job.theme() == 'error':
+            errors.append(f'{source}: {job.id} ended with RC {job.rc}')
+    emit(args, rows)
+    return fail(errors)
+
+
+def jobs(args, zftp: zFTP, pool: SessionPool) -> int:
+    result = zftp.list_jobs(args.name, args.id, args.owner)
+    emit(args, [{col: getattr(job, col) for col in Job.cols} for job in result])
+    return 0
+
+
+def spool(args, zftp: zFTP, pool: SessionPool) -> int:
+    out = Path(args.output)
+    jobs = []
+    for id in args.job_ids:
+        jobs.extend(zftp.list_jobs(id=id))
+
+    spools, errors = [], []
+    for job, result, error in pool.map(lambda session, job: session.list_spools(job), jobs):
+        if error:
+            errors.append(f'{job.id}: {error}')
+        else:
+            spools.extend(s for s in result if not args.dd or s.ddname in args.dd)
+
+    def fetch(session: zFTP, spool):
+        path = out / spool.job.id / f'{spool.id.zfill(3)}-{spool.stepname}-{spool.ddname}.txt'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return session.download_spool(spool, path)
+
+    for s, path, error in pool.map(fetch, spools):
+        if error:
+            errors.append(f'{s.job.id}.{s.ddname}: {error}')
+        else:
+            print(f'{s.job.id}.{s.ddname} -> {path}')
+    return fail(errors)
+
+
+def archive(args, zftp: zFTP, pool: SessionPool) -> int:
+    result = zftp.list_jobs(args.name, args.id, args.owner)
+    result = [job for job in result if job.status == 'OUTPUT']
+    if not result:
+        print('No jobs with output found', file=sys.stderr)
+        return 1
+
+    def progress(report):
+        purged = f', {len(report.purged)} purged' if args.purge else ''
+        print(f'\r{report.done}/{report.total} jobs, {report.bytes} bytes{purged}', end='', file=sys.stderr, flush=True)
+
+    report = archive_jobs(result, args.output, lambda job: pool, purge=args.purge, progress=progress)
+    print(file=sys.stderr)
+    print(report)
+    return fail(report.errors)
+
+
+def grep(args, zftp: zFTP, pool: SessionPool) -> int:
+    targets, errors = search_targets(zftp, args.datasets)
+    if targets:
+        print(f'Searching {len(targets)} dataset(s) on the host...', file=sys.stderr)
+        hits, search_errors = search_on_host(zftp, targets, [args.string] + (args.also or []),
+                                             any_case=not args.match_case, interval=args.interval)
+        errors.extend(search_errors)
+        emit(args, [{'name': hit.name, 'line': hit.line, 'text': hit.text} for hit in hits])
+    return fail(errors)
+
+
+def cp(args, zftp: zFTP, pool: SessionPool) -> int:
+    dsn, member = split_name(args.source)
+    dataset = lookup(zftp, dsn)
+    if dataset is None:
+        return fail([f'{dsn}: not found'])
+    members = None
+    if member and any(c in member for c in '*%'):
+        members = select_members(zftp, dataset, [member])
+        if not members:
+            return fail([f'{args.source}: no members match'])
+    elif member:
+        dataset = dataset(member)
+    job = copy_on_host(zftp, dataset, args.target, members, args.move, args.replace, args.interval)
+    count = f'{len(members)} member(s) of {dsn}' if members else dataset.name
+    print(f'{count} {"moved" if args.move else "copied"} to {args.target.upper()} by {job.id}')
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--host', default=os.environ.get('ZOSEDIT_HOST'), help='z/OS FTP host, or host:port')
+    common.add_argument('--user', default=os.environ.get('ZOSEDIT_USER'), help='TSO user ID')
+    common.add_argument('-j', '--jobs', type=int, default=4, dest='sessions',
+                        help='number of concurrent FTP sessions (default: 4)')
+    common.add_argument('--json', action='store_true', help='write results as JSON')
+    common.add_argument('--no-compress', action='store_false', dest='compress', default=None,
+                        help='never use compressed transfer mode (MODE C)')
+    common.add_argument('--record', metavar='TRACE', help='record the FTP sessions to a trace file')
+    common.add_argument('-v', '--verbose', action='count', default=0, help='print the FTP dialogue')
+
+    parser = argparse.ArgumentParser(prog='zosedit', description='FTP-based MVS Dataset Editor')
+    commands = parser.add_subparsers(dest='command')
+
+    cmd = commands.add_parser('ls', parents=[common], help='list datasets or members')
+    cmd.add_argument('patterns', nargs='+', help="dataset patterns, or DSN(pattern) for members")
+    cmd.set_defaults(func=ls)
+
+    cmd = commands.add_parser('get', parents=[common], help='download datasets or members')
+    cmd.add_argument('datasets', nargs='+', help='datasets to download, DSN(pattern) expands members')
+    cmd.add_argument('-o', '--output', default='.', help='output directory')
+    cmd.set_defaults(func=get)
+
+    cmd = commands.add_parser('put', parents=[common], help='upload files to a dataset or PDS')
+    cmd.add_argument('files', nargs='+', help='local files')
+    cmd.add_argument('dest', help='target dataset, member or PDS')
+    cmd.set_defaults(func=put)
+
+    cmd = commands.add_parser('submit', parents=[common], help='submit JCL from datasets or local files')
+    cmd.add_argument('sources', nargs='+', help='datasets or local JCL files')
+    cmd.add_argument('--wait', action='store_true', help='wait for the jobs to finish')
+    cmd.add_argument('--interval', type=float, default=2, help='polling interval for --wait in seconds')
+    cmd.set_defaults(func=submit)
+
+    cmd = commands.add_parser('jobs', parents=[common], help='list jobs')
+    cmd.add_argument('--name', help='job name pattern')
+    cmd.add_argument('--id', help='job ID pattern')
+    cmd.add_argument('--owner', help='job owner pattern')
+    cmd.set_defaults(func=jobs)
+
+    cmd = commands.add_parser('spool', parents=[common], help='download job output')
+    cmd.add_argument('job_ids', nargs='+', help='job IDs')
+    cmd.add_argument('--dd', nargs='+', help='only download these DD names')
+    cmd.add_argument('-o', '--output', default='.', help='output directory')
+    cmd.set_defaults(func=spool)
+
+    cmd = commands.add_parser('archive', parents=[common], help='archive job output to a zip file')
+    cmd.add_argument('output', help='zip file to write')
+    cmd.add_argument('--name', help='job name pattern')
+    cmd.add_argument('--id', help='job ID pattern')
+    cmd.add_argument('--owner', help='job owner pattern')
+    cmd.add_argument('--purge', action='store_true', help='purge the jobs whose output was archived completely')
+    cmd.set_defaults(func=archive)
+
+    cmd = commands.add_parser('grep', parents=[common], help='search datasets with a SuperC job on the host')
+    cmd.add_argument('string', help='string to search for')
+    cmd.add_argument('datasets', nargs='+', help='dataset patterns, DSN(pattern) selects members')
+    cmd.add_argument('-e', dest='also', action='append', metavar='STRING', help='another string to search for')
+    cmd.add_argument('--match-case', action='store_true', help='match the case of the strings')
+    cmd.add_argument('--interval', type=float, default=2, help='polling interval for the job in seconds')
+    cmd.set_defaults(func=grep)
+
+    cmd = commands.add_parser('cp', parents=[common], help='copy or move datasets and members with a job on the host')
+    cmd.add_argument('source', help='dataset, member, or DSN(pattern) for several members')
+    cmd.add_argument('target', help='target dataset, or DSN(NAME) to rename a single member')
+    cmd.add_argument('--move', action='store_true', help='delete the sources once copied')
+    cmd.add_argument('--replace', action='store_true', help='replace members that already exist in the target')
+    cmd.add_argument('--interval', type=float, default=2, help='polling interval for the job in seconds')
+    cmd.set_defaults(func=cp)
+
+    commands.add_parser('gui', help='start the GUI (default)')
+    return parser
+
+
+def main(argv: list[str] = None):
+    args = parser().parse_args(argv)
+    if args.command in (None, 'gui'):
+        from zosedit.main import main as gui
+        return gui()
+
+    if not args.host or not args.user:
+        print('zosedit: a host and user are required (--host/--user or ZOSEDIT_HOST/ZOSEDIT_USER)', file=sys.stderr)
+        return 2
+    password = os.environ.get('ZOSEDIT_PASSWORD') or getpass(f'Password for {args.user}@{args.host}: ')
+
+    recorder = TraceRecorder(args.record) if args.record else None
+    zftp = zFTP(args.host, args.user.upper(), password, debuglevel=args.verbose, compress=args.compress,
+                recorder=recorder)
+    try:
+        zftp.connect()
+    except Exception as e:
+        print(f'zosedit: could not connect to {args.host}: {e}', file=sys.stderr)
+        if recorder:
+            recorder.close()
+        return 1
+
+    try:
+        with SessionPool(zftp, max(1, args.sessions)) as pool:
+            return args.func(args, zftp, pool)
+    except zFTPError as e:
+        print(f'zosedit: {e}', file=sys.stderr)
+        return 1
+    finally:
+        zftp.quit()
+        if recorder:
+            recorder.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import re
+
+# Compressed transfer mode (MODE C, RFC 959 section 3.4.3). Data is sent as segments,
+# each introduced by a header byte:
+#   0nnnnnnn          n bytes of data follow
+#   10nnnnnn b        byte b repeated n times
+#   11nnnnnn          n filler bytes (space for TYPE A, zero for TYPE I)
+#   00000000 d        escape; descriptor d marks end of record/file or a restart marker
+
+EOR = 0x80
+EOF = 0x40
+ERRORS = 0x20
+RESTART = 0x10
+
+END_OF_RECORD = bytes((0, EOR))
+
+MAX_DATA = 0x7f
+MAX_RUN = 0x3f
+
+FILLER = {'A': b' ', 'E': b'\x40', 'I': b'\x00'}
+
+_runs = re.compile(rb'(.)\1{2,}', re.S)
+
+
+class Decompressor:
+    '''Incrementally decodes a compressed data stream. Blocks are fed as they arrive
+    and the decoded bytes available so far are returned; a segment split across two
+    blocks is held until the rest of it arrives. End of record markers are turned
+    into `record_end` and restart markers are collected in `markers`; `restarts`
+    has the markers of the last block fed, each with its offset in the bytes that
+    feed returned.'''
+
+    def __init__(self, filler: bytes = b' ', record_end: bytes = b'\r\n'):
+        self.filler = filler
+        self.record_end = record_end
+        self.markers: list[bytes] = []
+        self.restarts: list[tuple[int, bytes]] = []
+        self.eof = False
+        self._pending = b''
+        self._marker = False  # The next data segment is a restart marker
+
+    def feed(self, block: bytes) -> bytes:
+        data = self._pending + block if self._pending else block
+        out = bytearray()
+        self.restarts = []
+        i, size = 0, len(data)
+        while i < size and not self.eof:
+            header = data[i]
+            if header == 0:
+                if i + 2 > size:
+                    break
+                self._descriptor(data[i + 1], out)
+                i += 2
+            elif header < 0x80:
+                end = i + 1 + header
+                if end > size:
+                    break
+                if self._marker:
+                    self.markers.append(bytes(data[i + 1:end]))
+                    self.restarts.append((len(out), self.markers[-1]))
+                    self._marker = False
+                else:
+                    out += data[i + 1:end]
+                i = end
+            elif header < 0xc0:
+                if i + 2 > size:
+                    break
+                out += data[i + 1:i + 2] * (header & MAX_RUN)
+                i += 2
+            else:
+                out += self.filler * (header & MAX_RUN)
+                i += 1
+        self._pending = data[i:] if not self.eof else b''
+        return bytes(out)
+
+    def _descriptor(self, descriptor: int, out: bytearray):
+        if descriptor & EOR:
+            out += self.record_end
+        if descriptor & RESTART:
+            self._marker = True
+        if descriptor & EOF:
+            self.eof = True
+
+
+def compress(data: bytes, filler: bytes = b' ') -> bytes:
+    '''Encode a block of data as compressed mode segments, without an EOF marker'''
+    out = bytearray()
+    pos = 0
+    for run in _runs.finditer(data):
+        _literal(out, data[pos:run.start()])
+        byte, count = run.group(1), run.end() - run.start()
+        while count:
+            n = min(count, MAX_RUN)
+            if byte == filler:
+                out.append(0xc0 | n)
+            else:
+                out.append(0x80 | n)
+                out += byte
+            count -= n
+        pos = run.end()
+    _literal(out, data[pos:])
+    return bytes(out)
+
+
+def _literal(out: bytearray, data: bytes):
+    for i in range(0, len(data), MAX_DATA):
+        chunk = data[i:i + MAX_DATA]
+        out.append(len(chunk))
+        out += chunk
+
+
+class Compressor:
+    '''Incrementally encodes data to send in compressed mode. With a `record_length`
+    the data is cut into records of that length, each followed by an end of record
+    marker, as the host only learns where records end from the markers; a shorter
+    last record is ended the same way. finish() returns the rest and the EOF marker.'''
+
+    def __init__(self, filler: bytes = b' ', record_length: int = None):
+        self.filler = filler
+        self.record_length = record_length
+        self._pending = b''  # Start of a record continued in the next block
+
+    def feed(self, block: bytes) -> bytes:
+        if not self.record_length:
+            return compress(block, self.filler)
+        data = self._pending + block if self._pending else block
+        length = self.record_length
+        end = len(data) - len(data) % length
+        self._pending = data[end:]
+        return b''.join([compress(data[i:i + length], self.filler) + END_OF_RECORD for i in range(0, end, length)])
+
+    def finish(self) -> bytes:
+        out = compress(self._pending, self.filler) + END_OF_RECORD if self._pending else b''
+        self._pending = b''
+        return out + bytes((0, EOF))
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from tempfile import gettempdir
 
@@ -5,8 +6,105 @@ from tempfile import gettempdir
 tempdir = Path(gettempdir()) / 'zosedit'
 tempdir.mkdir(exist_ok=True)
 
+swapdir = tempdir / 'swap'
+swapdir.mkdir(exist_ok=True)
+
+# Text held by open editor tabs before the least recently used ones are hibernated to swapdir
+TAB_MEMORY_BUDGET = int(os.environ.get('ZOSEDIT_TAB_MEMORY_MB', 256)) * 1024 * 1024
+
+# Speculatively fetch member lists of the first PREFETCH_PDS_COUNT partitioned datasets of a search,
+# and spool listings (plus spools under PREFETCH_SPOOL_BYTES) of the top PREFETCH_JOB_COUNT jobs
+PREFETCH_MEMBERS = os.environ.get('ZOSEDIT_PREFETCH', '0') == '1'
+PREFETCH_SPOOLS = os.environ.get('ZOSEDIT_PREFETCH', '0') == '1'
+PREFETCH_PDS_COUNT = 10
+PREFETCH_JOB_COUNT = 5
+PREFETCH_SPOOL_BYTES = 64 * 1024
+PREFETCH_MAX_ENTRIES = 50000  # Listing entries held by the prefetcher at once
+
+# Use compressed transfer mode (MODE C) for large transfers when the host supports it
+COMPRESS_TRANSFERS = os.environ.get('ZOSEDIT_COMPRESS', '1') == '1'
+
+# Times a download or upload interrupted by a dropped connection is resumed or retried,
+# and the records between the restart markers the host sends in compressed mode (SITE CHKPTINT)
+TRANSFER_RETRIES = int(os.environ.get('ZOSEDIT_TRANSFER_RETRIES', 3))
+CHECKPOINT_RECORDS = int(os.environ.get('ZOSEDIT_CHECKPOINT_RECORDS', 10000))
+
+# Spare sessions per host for running the patterns of a multi-pattern search concurrently
+SEARCH_SESSIONS = int(os.environ.get('ZOSEDIT_SEARCH_SESSIONS', 4))
+
+# Named search sets saved from the explorer
+SAVED_SEARCHES = tempdir / 'searches.json'
+
+# Limits of a z/OS UNIX directory walk in the explorer's Files tab
+USS_MAX_DEPTH = int(os.environ.get('ZOSEDIT_USS_DEPTH', 8))
+USS_MAX_DIRS = int(os.environ.get('ZOSEDIT_USS_DIRS', 2000))
+
+# Most jobs a single search lists, across all of its pages
+JOB_LIST_LIMIT = 20000
+
+# Time callbacks and frames on the render thread and show them in a profiler window
+PROFILE = os.environ.get('ZOSEDIT_PROFILE', '0') == '1'
+
+# Record every FTP session of the GUI to this trace file (see zosedit.trace)
+RECORD = os.environ.get('ZOSEDIT_RECORD')
+
+# Size limit of the persistent listing cache (tempdir/metadata.db)
+CACHE_MAX_BYTES = int(os.environ.get('ZOSEDIT_CACHE_MB', 64)) * 1024 * 1024
+
 OPERCMD_JCL = '''
 //{name} JOB {params}
 //CMD       EXEC PGM=IKJEFT01
 //  COMMAND  '{command}'
 '''.strip()
+
+# Host side string search with SuperC: one step per dataset, each listing its hits to OUTDD
+SUPERC_JCL = '''
+//{name} JOB {params}
+{steps}
+'''.strip()
+
+SUPERC_STEP = '''
+//{step}     EXEC PGM=ISRSUPC,PARM=(SRCHCMP{options})
+//NEWDD     DD DISP=SHR,
+//          DSN={dataset}
+//OUTDD     DD SYSOUT=*
+//SYSIN     DD *
+{statements}
+/*
+'''.strip()
+
+# Host side copies: IEBCOPY for partitioned datasets and their members, IEBGENER for sequential data.
+# JCL statements end by column 71, so dataset names go on continuation lines of their own.
+IEBCOPY_JCL = '''
+//{name} JOB {params}
+//COPY      EXEC PGM=IEBCOPY
+//SYSPRINT  DD SYSOUT=*
+//IN        DD DISP=SHR,
+//          DSN={source}
+//OUT       DD {disp},
+//          DSN={target}
+//SYSIN     DD *
+  COPY OUTDD=OUT,INDD={indd}
+{select}
+/*
+'''.strip()
+
+IEBGENER_JCL = '''
+//{name} JOB {params}
+//COPY      EXEC PGM=IEBGENER
+//SYSPRINT  DD SYSOUT=*
+//SYSIN     DD DUMMY
+//SYSUT1    DD DISP=SHR,
+//          DSN={source}
+//SYSUT2    DD {disp},
+//          DSN={target}
+'''.strip()
+
+# Deletes the sources of a move, skipped unless the copy ended with RC 0
+MOVE_DELETE_STEP = '''
+//DELETE    EXEC PGM=IDCAMS,COND=(0,NE)
+//SYSPRINT  DD SYSOUT=*
+//SYSIN     DD *
+{deletes}
+/*
+'''.strip()
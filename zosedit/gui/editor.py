@@ -3,24 +3,39 @@ import ebcdic
 import colorama
 from dearpygui import dearpygui as dpg
 from zosedit.models import Dataset, Job, Spool
-from zosedit.constants import tempdir
+from zosedit import constants
+from zosedit.constants import swapdir
 from zosedit.zftp import zFTP
+from zosedit import records
 from zosedit.gui.dialog import dialog
+from zosedit.gui.spool_viewer import SpoolViewer
 from pathlib import Path
-from datetime import datetime
+from time import time
 
 colorama.init()
 
 
 class Tab:
 
-    def __init__(self, *, ftp: zFTP = None, dataset: Dataset = None, job: Job = None):
+    def __init__(self, *, ftp: zFTP = None, dataset: Dataset = None, job: Job = None, spools: list[Spool] = None,
+                 tagged: bool = False):
         self.ftp = ftp
+        self.tagged = tagged  # Whether the label names the host
         self.dataset = dataset
         self.job = job
         self.dirty = False
         self.uuid = None
         self.label = None
+        self.editor = None
+        self.spools: list[Spool] = []
+        self.spool_headers = []
+        self.spool_viewers: dict[str, SpoolViewer] = {}
+        self.size = 0
+        self.last_active = time()
+        self.hibernated = False
+        self.swap_path: Path = None
+        self._open_spools = []
+        self._prefetched = spools
         self._line_height = dpg.get_text_size('')[1] + 18
 
         if dataset:
@@ -30,27 +45,26 @@ class Tab:
         else:
             self.uuid = dpg.add_tab(label='   ', closable=False, parent='editor_tab_bar')
 
-    def build_dataset_tab(self):
-        dataset: Dataset = self.dataset
-
+    def _reset_tab(self, label: str, theme: str):
         # Clear existing tab / create new tab
+        self._close_spools()
         if self.uuid:
             for child in dpg.get_item_children(self.uuid)[1]:
                 dpg.delete_item(child)
         else:
-            self.uuid = dpg.add_tab(label=dataset.name, closable=True, parent='editor_tab_bar')
-            self.label = dataset.name
+            self.uuid = dpg.add_tab(label=label, closable=True, parent='editor_tab_bar')
+            self.label = label
 
         # Setup tab
-        dpg.bind_item_theme(self.uuid, 'dataset_tab_theme')
+        dpg.bind_item_theme(self.uuid, theme)
         dpg.set_value('editor_tab_bar', self.uuid)
+        self.hibernated = False
+        self.size = 0
 
-        with dpg.group(horizontal=True, parent=self.uuid):
-            dpg.add_button(label='Refresh', callback=self.build_dataset_tab)
-            dpg.add_button(label='Submit', callback=self._submit_job)
-
-        with dpg.child_window(parent=self.uuid, height=self._line_height, border=False, horizontal_scrollbar=True):
-            dpg.add_text(str(dataset))
+    def build_dataset_tab(self):
+        dataset: Dataset = self.dataset
+        self._reset_tab(self.title(), 'dataset_tab_theme')
+        self._build_dataset_header()
 
         # Get file content
         if dataset.new:
@@ -58,13 +72,26 @@ class Tab:
             text = ''
         else:
             status = dpg.add_text('Downloading...', parent=self.uuid)
-            self.ftp.download(dataset)
+            buffer = self.ftp.retrieve(dataset)
+            if buffer is None:
+                dpg.set_value(status, 'Download failed')
+                dpg.configure_item(status, color=(255, 255, 0))
+                return
             dpg.delete_item(status)
-            content = dataset.local_path.read_text(errors='replace')
-            lines = [line.rstrip() for line in content.split('\n')]
-            text = '\n'.join(lines)
+            # UNIX files are plain text; dataset records come padded with blanks
+            text = buffer.getvalue() if dataset.is_unix() else records.strip_blanks(buffer.getvalue())
+
+        self._build_editor(text)
+
+    def _build_dataset_header(self):
+        with dpg.group(horizontal=True, parent=self.uuid):
+            dpg.add_button(label='Refresh', callback=self.build_dataset_tab)
+            dpg.add_button(label='Submit', callback=self._submit_job)
 
-        # Create editor
+        with dpg.child_window(parent=self.uuid, height=self._line_height, border=False, horizontal_scrollbar=True):
+            dpg.add_text(str(self.dataset))
+
+    def _build_editor(self, text: str):
         self.editor = dpg.add_input_text(
             parent=self.uuid,
             default_value=text,
@@ -74,34 +101,35 @@ class Tab:
             callback=self.mark_dirty,
             tab_input=True,
             user_data=self)
+        self.size = len(text)
 
     def build_job_tab(self):
-        label = f'{self.job.id} ({self.job.name})'
-
-        # Clear existing tab / create new tab
-        if self.uuid:
-            for child in dpg.get_item_children(self.uuid)[1]:
-                dpg.delete_item(child)
-        else:
-            self.uuid = dpg.add_tab(label=label, closable=True, parent='editor_tab_bar')
-            self.label = label
-
-        # Setup tab
-        dpg.bind_item_theme(self.uuid, 'job_tab_theme')
-        dpg.set_value('editor_tab_bar', self.uuid)
-
+        self._reset_tab(self.title(), 'job_tab_theme')
+        status = self._build_job_header()
+
+        # The spool listing of a finished job doesn't change, so a prefetched or cached one can be used
+        spools, self._prefetched = self._prefetched, None
+        if spools is None and self.ftp.cache is not None and self.job.status == 'OUTPUT':
+            cached = self.ftp.cache.spools(self.ftp.host, self.ftp.user, self.job)
+            spools = cached[0] if cached else None
+        if spools is None:
+            spools = self.ftp.list_spools(self.job)
+        self._build_spool_headers(spools, status)
+
+    def _build_job_header(self) -> int:
         with dpg.group(horizontal=True, parent=self.uuid):
             dpg.add_button(label='Refresh', callback=self.build_job_tab)
 
         # Info/status
         with dpg.child_window(parent=self.uuid, height=self._line_height, border=False, horizontal_scrollbar=True):
             dpg.add_text(str(self.job))
-        status = dpg.add_text('Downloading spool...', parent=self.uuid)
-
+        return dpg.add_text('Downloading spool...', parent=self.uuid)
 
+    def _build_spool_headers(self, spools: list[Spool], status: int):
         # Create spool dropdowns
+        self.spools = spools
         self.spool_headers = []
-        for spool in self.ftp.list_spools(self.job):
+        for spool in spools:
             header = dpg.add_collapsing_header(before=status, label=spool.ddname, parent=self.uuid)
             self.spool_headers.append(header)
             with dpg.item_handler_registry() as reg:
@@ -109,8 +137,68 @@ class Tab:
             dpg.bind_item_handler_registry(header, reg)
         dpg.delete_item(status)
 
+    # Hibernation
+    def hibernate(self) -> bool:
+        '''Drop the tab's widgets and text, keeping only its label. Dataset text (including
+        unsaved edits) goes to a swap file and downloaded spools stay on disk. Returns
+        whether the tab was hibernated.'''
+        if self.hibernated or not (self.dataset or self.job):
+            return False
+        if self.dataset:
+            if not self.editor:
+                return False
+            name = re.sub(r'[^\w.()-]', '_', self.dataset.name)
+            self.swap_path = swapdir / f'{self.uuid}-{name}.txt'
+            self.swap_path.write_text(dpg.get_value(self.editor), errors='replace')
+            self.editor = None
+        else:
+            self._open_spools = [
+                (spool, self.spool_viewers[spool.id].scroll() if spool.id in self.spool_viewers else 0)
+                for header, spool in zip(self.spool_headers, self.spools) if dpg.get_value(header)
+            ]
+            self.spool_headers = []
+            self._close_spools()
+
+        for child in dpg.get_item_children(self.uuid)[1]:
+            dpg.delete_item(child)
+        self.hibernated = True
+        self.size = 0
+        return True
+
+    def restore(self):
+        '''Rebuild a hibernated tab from its local copy without going to the host'''
+        if not self.hibernated:
+            return
+        if self.dataset:
+            self._reset_tab(self.label, 'dataset_tab_theme')
+            self._build_dataset_header()
+            self._build_editor(self.swap_path.read_text(errors='replace'))
+            self.swap_path.unlink(missing_ok=True)
+            self.swap_path = None
+        else:
+            self._reset_tab(self.label, 'job_tab_theme')
+            self._build_spool_headers(self.spools, self._build_job_header())
+            for spool, scroll in self._open_spools:
+                header = self.spool_headers[self.spools.index(spool)]
+                dpg.set_value(header, True)
+                self._populate_spool(None, None, (header, spool))
+                if spool.id in self.spool_viewers:
+                    self.spool_viewers[spool.id].scroll_to(scroll)
+            self._open_spools = []
+
+    def discard(self):
+        self._close_spools()
+        if self.swap_path:
+            self.swap_path.unlink(missing_ok=True)
+
+    def _close_spools(self):
+        for viewer in self.spool_viewers.values():
+            viewer.close()
+        self.spool_viewers = {}
+
     def _submit_job(self, sender, data):
-        self.ftp.submit_job(self.dataset, False)
+        if self.editor:
+            self.ftp.submit_job(self.dataset, dpg.get_value(self.editor))
 
     def _populate_spool(self, sender, data, user_data):
         header, spool = user_data
@@ -124,48 +212,45 @@ class Tab:
         with dpg.child_window(parent=header, height=self._line_height, border=False, horizontal_scrollbar=True):
             dpg.add_text(str(spool), indent=10)
         status = dpg.add_text('Downloading spool output...', parent=header, indent=10)
-        if not self.ftp.download_spool(spool):
+        downloaded = getattr(spool, 'local_path', None) and spool.local_path.exists()
+        if not downloaded and not self.ftp.download_spool(spool):
             dpg.set_value(status, 'Download failed')
             dpg.configure_item(status, color=(255, 255, 0))
             return
         dpg.delete_item(status)
 
         # Display spool
-        text = spool.local_path.read_text()
-        tw, th = dpg.get_text_size(text)
-
-        with dpg.child_window(parent=header,
-                              horizontal_scrollbar=True, border=False) as window:
-            input_field = dpg.add_input_text(multiline=True,
-                                             width=tw + 20,
-                                             height=th + 20,
-                                             default_value=text,
-                                             readonly=True,)
-            dpg.bind_item_theme(input_field, 'spool_input_theme')
-        self.resize_spool_window(None, None, (header, window, input_field))
+        viewer = SpoolViewer(spool.local_path, parent=header)
+        self.spool_viewers[spool.id] = viewer
+        self.size += viewer.text.offsets.itemsize * len(viewer.text.offsets)  # The text itself stays mapped
+        viewer.resize(dpg.get_item_rect_size(header)[0])
 
         # Resize window handler
         with dpg.item_handler_registry() as reg:
-            dpg.add_item_toggled_open_handler(callback=self.resize_spool_window, user_data=(header, window, input_field))
+            dpg.add_item_toggled_open_handler(callback=self.resize_spool_window, user_data=(header, viewer))
         dpg.bind_item_handler_registry(header, reg)
 
     def resize_spool_window(self, sender, data, user_data):
-        print(f'resize_spool_window {datetime.now()}')
-        header, window, input_field = user_data
-        width = dpg.get_item_rect_size(header)[0]
-        text = dpg.get_value(input_field)
-        tw, th = dpg.get_text_size(text)
-        w = min(tw + 34, width - 15)
-        h = min(th + 34, dpg.get_viewport_height() - 220)
-        dpg.configure_item(window, width=w, height=h)
+        header, viewer = user_data
+        viewer.resize(dpg.get_item_rect_size(header)[0])
+
+    def title(self) -> str:
+        name = self.dataset.name if self.dataset else f'{self.job.id} ({self.job.name})'
+        if self.tagged and self.ftp and self.ftp.host:
+            name += f' [{self.ftp.host}]'
+        return name
+
+    def relabel(self):
+        self.label = self.title()
+        dpg.configure_item(self.uuid, label=self.label + ('*' if self.dirty else ''))
 
     def mark_dirty(self):
-        dpg.configure_item(self.uuid, label=self.dataset.name + '*')
         self.dirty = True
+        self.relabel()
 
     def mark_clean(self):
-        dpg.configure_item(self.uuid, label=self.dataset.name)
         self.dirty = False
+        self.relabel()
         self.dataset.new = False
 
     def __repr__(self):
@@ -193,6 +278,10 @@ class Editor:
                 dpg.add_theme_color(dpg.mvThemeCol_TabActive, (50, 60, 150, 255), category=dpg.mvThemeCat_Core)
                 dpg.add_theme_color(dpg.mvThemeCol_TabHovered, (30, 70, 130, 255), category=dpg.mvThemeCat_Core)
 
+        with dpg.theme(tag='spool_viewer_theme'):
+            with dpg.theme_component(dpg.mvAll):
+                dpg.add_theme_style(dpg.mvStyleVar_ItemSpacing, 0, 0, category=dpg.mvThemeCat_Core)
+
         with dpg.theme(tag='spool_input_theme'):
             with dpg.theme_component(dpg.mvInputText):
                 dpg.add_theme_style(dpg.mvStyleVar_CellPadding, 0, 0, category=dpg.mvThemeCat_Core)
@@ -213,24 +302,57 @@ class Editor:
             self.delete_tab(tab)
         self.tabs = []
 
-    def on_tab_changed(self):
+    def on_tab_changed(self, sender=None, tab=None):
         self.update_internal_state()
+        tab = self.get_tab_by_id(tab) or self.get_current_tab()
+        if tab:
+            self.touch(tab)
+
+    def touch(self, tab: Tab):
+        '''Mark a tab as most recently used, restoring it if it was hibernated'''
+        tab.last_active = time()
+        if tab.hibernated:
+            tab.restore()
+        self.enforce_memory_budget(keep=tab)
+
+    def tag_tabs(self, tagged: bool):
+        '''Name the host in tab labels, done while more than one host is connected'''
+        for tab in self.tabs:
+            if (tab.dataset or tab.job) and tab.tagged != tagged:
+                tab.tagged = tagged
+                tab.relabel()
+
+    def enforce_memory_budget(self, keep: Tab = None):
+        '''Hibernate least recently used tabs until the open tabs fit in TAB_MEMORY_BUDGET'''
+        total = sum(tab.size for tab in self.tabs)
+        candidates = sorted((tab for tab in self.tabs if not tab.hibernated and tab is not keep),
+                            key=lambda tab: tab.last_active)
+        for tab in candidates:
+            if total <= constants.TAB_MEMORY_BUDGET:
+                break
+            size = tab.size
+            if tab.hibernate():
+                total -= size
 
     # Jobs
     def open_job(self, job: Job):
         tab = self.get_tab_by_job(job)
+        session = self.root.session_for(job)
+        # Prefetches also download the spools, so one still running could take longer than listing them
+        spools = session.prefetcher.take(('spools', job.id), wait=False)
         if not tab:
-            tab = Tab(ftp=self.root.zftp, job=job)
+            tab = Tab(ftp=session, job=job, spools=spools, tagged=self.root.multi_host)
             self.tabs.append(tab)
         elif tab.dirty:
             self.switch_to_tab(tab)
         else:
+            tab._prefetched = spools
             tab.build_job_tab()
         self.switch_to_tab(tab)
 
     # Files
     def open_file(self, dataset: Dataset):
-        tab = self.get_tab_by_dataset(dataset.name)
+        tab = self.get_tab_by_dataset(dataset.name, dataset.host)
         if not tab:
             tab = self.new_dataset_tab(dataset)
         elif tab.dirty:
@@ -245,7 +367,7 @@ class Editor:
         if not dataset:
             dataset = Dataset(name='Untitled')
             dataset.new = True
-        tab = Tab(ftp=self.root.zftp, dataset=dataset)
+        tab = Tab(ftp=self.root.session_for(dataset), dataset=dataset, tagged=self.root.multi_host)
         self.tabs.append(tab)
         return tab
 
@@ -274,17 +396,16 @@ class Editor:
                 recformat=format_,
                 type=type_
             )
-            dummy.local_path = Path(tempdir, dummy.name)
-            dummy.local_path.write_text('')
+            dummy.host = tab.ftp.host
             tab.dataset = dummy
 
             if type_ == 'PO':
-                self.root.zftp.mkdir(dummy)
+                tab.ftp.mkdir(dummy)
             else:
                 self.save_open_file()
-                properties = self.root.zftp.list_datasets(f"'{dummy.parent or dummy.name}'").pop().properties()
+                properties = tab.ftp.list_datasets(f"'{dummy.parent or dummy.name}'").pop().properties()
                 properties.update(name=name, member=member)
-                tab.dataset = Dataset(**properties)
+                tab.dataset = Dataset(host=tab.ftp.host, **properties)
                 tab.mark_clean()
                 tab.build_dataset_tab()
 
@@ -333,7 +454,7 @@ class Editor:
 
     def save_open_file(self):
         tab = self.get_current_tab()
-        if not tab or not tab.dataset:
+        if not tab or not tab.dataset or not tab.editor:
             return
 
         if not tab.dirty:
@@ -346,15 +467,12 @@ class Editor:
         print(f'{colorama.Fore.YELLOW}Uploading{colorama.Fore.RESET}')
 
         text: str = dpg.get_value(tab.editor)
-        result = []
-        pad_to = tab.dataset.reclength if tab.dataset.recformat == 'FB' else tab.dataset.reclength - 4
-        for line in text.split('\n'):
-            result.append(line.ljust(pad_to))
-        text = ''.join(result)
-
-        tab.dataset.local_path.write_bytes(text.encode('cp1047'))
-
-        if not self.root.zftp.upload(tab.dataset):
+        try:
+            data = text if tab.dataset.is_unix() else records.encode(text, tab.dataset)
+        except (records.RecordLengthError, UnicodeEncodeError) as e:
+            tab.ftp.show_error(f'Not saved: {e}')
+            return
+        if not tab.ftp.upload(tab.dataset, data):
             return
         tab.mark_clean()
 
@@ -365,6 +483,7 @@ class Editor:
     # Tabs
     def switch_to_tab(self, tab: Tab):
         dpg.set_value('editor_tab_bar', tab.uuid)
+        self.touch(tab)
 
     def cycle_tabs(self, direction: int):
         self.update_internal_state()
@@ -372,21 +491,21 @@ class Editor:
         tab = dpg.get_value('editor_tab_bar')
         index = tabs.index(tab) + direction
         index = index % len(tabs)
-        tab = tabs[index]
-        dpg.set_value('editor_tab_bar', tab)
+        self.switch_to_tab(self.get_tab_by_id(tabs[index]))
 
     def get_current_tab(self) -> Tab:
         tab = dpg.get_value('editor_tab_bar')
         return self.get_tab_by_id(tab)
 
     def get_tab_by_job(self, job: Job) -> Tab:
-        matching_tabs = [tab for tab in self.tabs if tab.job and tab.job.id == job.id]
+        matching_tabs = [tab for tab in self.tabs if tab.job and tab.job.id == job.id and tab.job.host == job.host]
         if len(matching_tabs) == 0:
             return None
         return matching_tabs.pop()
 
-    def get_tab_by_dataset(self, dataset: str) -> Tab:
-        matching_tabs = [tab for tab in self.tabs if tab.dataset and tab.dataset.name == dataset]
+    def get_tab_by_dataset(self, dataset: str, host: str = None) -> Tab:
+        matching_tabs = [tab for tab in self.tabs if tab.dataset and tab.dataset.name == dataset
+                         and (host is None or tab.ftp.host == host)]
         if len(matching_tabs) == 0:
             return None
         return matching_tabs.pop()
@@ -417,10 +536,11 @@ class Editor:
 
     def delete_tab(self, tab: Tab):
         dpg.delete_item(tab.uuid)
+        tab.discard()
         self.tabs.remove(tab)
 
     def close_tab_by_dataset(self, dataset: Dataset):
-        tab = self.get_tab_by_dataset(dataset.name)
+        tab = self.get_tab_by_dataset(dataset.name, dataset.host)
         if tab:
             self.delete_tab(tab)
 
@@ -1,16 +1,57 @@
 import re
+import json
+import threading
 import contextlib
+from bisect import bisect
+from functools import partial
+from itertools import product
 from dearpygui import dearpygui as dpg
 from zosedit.gui.dialog import dialog
-from zosedit.models import Dataset
+from zosedit import constants
+from zosedit.models import Dataset, Job, Members, UnixFile
+from zosedit.zftp import zFTP, zFTPError, dataset_order
+from zosedit.prefetch import fetch_spools
+from zosedit.index import ResultIndex, dataset_terms, member_terms, job_terms, name_prefix, covers
+from zosedit.uss import walk
+from zosedit.archive import archive_jobs
+from zosedit.superc import SearchHit, search_targets, search_on_host
+from zosedit.hostcopy import copy_dataset_name, copy_name, copy_on_host, select_members
 from traceback import format_exc
 from textwrap import indent
+from time import time, strftime
 
 
 class Explorer:
 
     def __init__(self, root):
         self.root = root
+        self.prefetch_members = constants.PREFETCH_MEMBERS
+        self.prefetch_spools = constants.PREFETCH_SPOOLS
+        self.job_listing: object = None  # Identifies the newest job search, so stale pages are dropped
+        self.jobs: list[Job] = []
+        self.jobs_fetched: float = None
+        self.jobs_truncated = False
+        self.dataset_listing: object = None
+        self.datasets: list[Dataset] = []
+        self.dataset_keys: list[tuple] = []
+        self.dataset_rows: list[int] = []
+        self.datasets_fetched: float = None
+        self.dataset_hosts = False  # Whether the results tables have a host column
+        self.jobs_hosts = False
+        self.dataset_searches: list[str] = []  # Patterns the dataset results were listed with
+        self.dataset_index = ResultIndex()  # Dataset and member rows, for the filter box
+        self.job_index = ResultIndex()
+        self.dataset_hidden: set[int] = set()  # Rows hidden by the filter
+        self.job_hidden: set[int] = set()
+        self.job_checks: dict[int, tuple[int, Job]] = {}  # Job row -> its selection checkbox and job
+        self.archive_cancel: threading.Event = None
+        self.member_parents: dict[int, int] = {}  # Member row -> row of its PDS
+        self.member_rows: dict[int, tuple[Members, list[int]]] = {}  # PDS row -> its members and their rows
+        self.member_sort = 'name', False  # Members column and whether descending
+        self.sort_columns: dict[int, str] = {}  # Table column -> Members column it sorts by
+        self.file_listing: object = None
+        self.directory_nodes: dict[str, int] = {}  # Directory path -> its tree node in the Files tab
+        self.saved_searches: dict[str, dict] = load_searches()
 
     def build(self):
 
@@ -26,6 +67,11 @@ class Explorer:
                                            width=input_width,
                                            **input_options)
                         dpg.add_button(label=' O ', callback=self.refresh_datasets)
+                    dpg.add_input_text(hint='Filter', tag='explorer_dataset_filter', width=-1, uppercase=True,
+                                       callback=self.filter_datasets)
+                    with dpg.group(horizontal=True, tag='explorer_dataset_filter_group', show=False):
+                        dpg.add_text(tag='explorer_dataset_filter_status', color=(170, 170, 170))
+                        dpg.add_button(label='Search', tag='explorer_dataset_widen', callback=self.widen_dataset_search)
                     dpg.add_child_window(label='Results', tag='dataset_results')
 
                 # Jobs tab
@@ -36,12 +82,32 @@ class Explorer:
                         dpg.add_input_text(hint='ID', tag='explorer_jobid_input', **input_options)
                         dpg.add_input_text(hint='Owner', tag='explorer_jobowner_input', **input_options)
                         dpg.add_button(label='Search', callback=self.refresh_jobs)
+                        dpg.add_input_text(hint='Filter', tag='explorer_job_filter', uppercase=True,
+                                           callback=self.filter_jobs)
+                    dpg.add_text(tag='explorer_job_filter_status', color=(170, 170, 170), show=False)
+                    with dpg.group(horizontal=True):
+                        dpg.add_button(label='Select shown', callback=lambda: self.select_jobs(True))
+                        dpg.add_button(label='Clear', callback=lambda: self.select_jobs(False))
+                        dpg.add_button(label='Archive...', callback=self.archive_prompt)
                     dpg.add_child_window(label='Results', tag='job_results')
 
+                # z/OS UNIX files tab
+                with dpg.tab(label='Files', tag='explorer_files_tab'):
+                    with dpg.group(horizontal=True):
+                        dpg.add_input_text(hint='Directory', tag='explorer_uss_input', width=input_width,
+                                           on_enter=True, callback=self.refresh_files)
+                        dpg.add_button(label=' O ', callback=self.refresh_files)
+                    dpg.add_text(tag='explorer_uss_status', color=(170, 170, 170), show=False)
+                    dpg.add_child_window(label='Results', tag='uss_results')
+
         with dpg.theme(tag='explorer_theme_volume'):
             with dpg.theme_component(dpg.mvSelectable):
                 dpg.add_theme_color(dpg.mvThemeCol_Text, (170, 170, 170, 255))
 
+        with dpg.theme(tag='explorer_theme_stale'):
+            with dpg.theme_component(dpg.mvSelectable):
+                dpg.add_theme_color(dpg.mvThemeCol_Text, (120, 120, 120, 255))
+
         with dpg.theme(tag='rc_theme_error'):
             with dpg.theme_component(dpg.mvSelectable):
                 dpg.add_theme_color(dpg.mvThemeCol_Text, (140, 120, 80, 255))
@@ -58,14 +124,23 @@ class Explorer:
         pass
 
     def reset(self):
-        with self.empty_results('dataset_results'):
-            with self.empty_results('job_results'):
+        self.job_listing = None
+        self.dataset_listing = None
+        self.file_listing = None
+        for results in ('dataset_results', 'job_results', 'uss_results'):
+            with self.empty_results(results):
                 pass
+        dpg.configure_item('explorer_uss_status', show=False)
         dpg.set_value('explorer_tab_bar', 'explorer_datasets_tab')
         dpg.set_value('explorer_jobname_input', '')
         dpg.set_value('explorer_jobid_input', '')
         dpg.set_value('explorer_jobowner_input', '')
         dpg.set_value('explorer_dataset_input', '')
+        dpg.set_value('explorer_uss_input', '')
+        dpg.set_value('explorer_dataset_filter', '')
+        dpg.set_value('explorer_job_filter', '')
+        self.dataset_index.clear()
+        self.job_index.clear()
 
     def search_for_job_id(self, id):
         dpg.set_value('explorer_tab_bar', 'explorer_jobs_tab')
@@ -75,66 +150,617 @@ class Explorer:
         self.refresh_jobs()
 
     def refresh_jobs(self):
-        name = dpg.get_value('explorer_jobname_input')
-        id = dpg.get_value('explorer_jobid_input')
-        owner = dpg.get_value('explorer_jobowner_input')
-        if not name and not id and not owner:
+        searches = self.job_search()
+        if not searches:
             return
 
-        # Clear existing results
-        with self.empty_results('job_results'):
-            # Search for jobs
-            status = dpg.add_text('Searching...')
+        # Show cached results straight away; the live listing replaces them page by page
+        cached = self.cached_results(searches, lambda session, search: self.root.cache.jobs(session.host, session.user, *search),
+                                     key=job_key)
+        if cached:
+            self.show_jobs(*cached)
+        else:
+            with self.empty_results('job_results'):
+                dpg.add_text('Searching...')
+
+        listing = self.job_listing = object()
+        live = []
+        seen = set()
+
+        def fetch(session, search):
+            for page, truncated in session.iter_jobs(*search):
+                if listing is not self.job_listing:
+                    break
+                self.root.scheduler.call_soon(received, page, truncated)
+
+        def received(page, truncated):
+            if listing is not self.job_listing:
+                return
+            if not live:
+                self.show_jobs([], loading=True)
+            page = [job for job in page if job_key(job) not in seen]
+            seen.update(map(job_key, page))
+            live.extend(page)
+            self.add_jobs(page)
+            self.jobs_truncated |= truncated
+            self.update_job_status(loading=True)
+
+        def finished(errors):
+            if listing is not self.job_listing:
+                return
+            if errors and not live:
+                with self.empty_results('job_results'):
+                    for error in errors:
+                        dpg.add_text(error, color=(255, 0, 0))
+                return
+            if not live:
+                self.show_jobs([])
+            self.update_job_status()
+            for error in errors:
+                dpg.add_text(error, color=(255, 0, 0), parent='job_results', before='job_results_table')
+            if self.prefetch_spools:
+                self.prefetch_jobs(live)
+        self.search_hosts(searches, fetch, finished)
+
+    def search_hosts(self, searches: list, fetch, finished):
+        '''Run fetch(session, search) in the background for every search on every searched
+        host, then call finished(errors) on the render thread once all of them are done.
+        Several searches on one host run at the same time on its spare sessions.'''
+        sessions = self.root.search_sessions()
+        remaining = len(sessions) * len(searches)
+        errors = []
+
+        def done(session, search, future):
+            nonlocal remaining
+            remaining -= 1
             try:
-                jobs = self.root.zftp.list_jobs(name, id, owner)
+                future.result()
             except Exception as e:
-                dpg.set_value(status, f'Error: {e}')
-                print('Error listing jobs')
+                print(f'Error searching {session.host} for {search_text(search)}')
                 print(indent(format_exc(), '    '))
-                dpg.configure_item(status, color=(255, 0, 0))
+                where = [session.host] if self.root.multi_host else []
+                if len(searches) > 1:
+                    where.append(search_text(search))
+                errors.append(f'{", ".join(where)}: {e}' if where else f'Error: {e}')
+            if not remaining:
+                finished(errors)
+
+        for session in sessions:
+            for search in searches:
+                then = partial(done, session, search)
+                if len(searches) == 1:
+                    self.root.scheduler.submit(fetch, session, search, then=then)
+                    continue
+                future = session.search_pool().submit(fetch, search)
+                future.add_done_callback(lambda future, then=then: self.root.scheduler.call_soon(then, future))
+
+    def cached_results(self, searches: list, lookup, key) -> tuple[list, float]:
+        '''Merge lookup(session, search) over the searched hosts and searches, dropping
+        duplicates by key(item); None if nothing is cached'''
+        results, seen, fetched = [], set(), None
+        for session in self.root.search_sessions():
+            for search in searches:
+                cached = lookup(session, search)
+                if cached:
+                    for item in cached[0]:
+                        if key(item) not in seen:
+                            seen.add(key(item))
+                            results.append(item)
+                    fetched = min(fetched or cached[1], cached[1])
+        return (results, fetched) if fetched else None
+
+    # === Saved searches ===
+    SEARCH_INPUTS = {
+        'explorer_datasets_tab': ('explorer_dataset_input',),
+        'explorer_jobs_tab': ('explorer_jobname_input', 'explorer_jobid_input', 'explorer_jobowner_input'),
+        'explorer_files_tab': ('explorer_uss_input',),
+    }
+
+    def build_searches_menu(self):
+        for child in dpg.get_item_children('searches_menu')[1]:
+            dpg.delete_item(child)
+        dpg.add_menu_item(label='Save Current Search...', callback=self.save_search_prompt, parent='searches_menu')
+        if not self.saved_searches:
+            return
+        dpg.add_separator(parent='searches_menu')
+        for name in self.saved_searches:
+            dpg.add_menu_item(label=name, callback=lambda s, d, name: self.run_saved_search(name),
+                              user_data=name, parent='searches_menu')
+        with dpg.menu(label='Delete', parent='searches_menu'):
+            for name in self.saved_searches:
+                dpg.add_menu_item(label=name, callback=lambda s, d, name: self.delete_saved_search(name), user_data=name)
+
+    def save_search_prompt(self):
+        def _save():
+            name = dpg.get_value('save_search_name').strip()
+            if not name:
                 return
-            dpg.set_value(status, f'Found {len(jobs)} job(s)')
+            tab = dpg.get_value('explorer_tab_bar')
+            tab = dpg.get_item_alias(tab) or tab
+            self.saved_searches[name] = {
+                'tab': tab,
+                'inputs': {tag: dpg.get_value(tag) for tag in self.SEARCH_INPUTS[tab]},
+            }
+            save_searches(self.saved_searches)
+            self.build_searches_menu()
+            dpg.delete_item('save_search_dialog')
+
+        with dialog(tag='save_search_dialog', label='Save Search', width=300, height=100):
+            dpg.add_input_text(hint='Name', tag='save_search_name', width=-1, on_enter=True, callback=_save)
+            dpg.add_button(label='Save', width=-1, callback=_save)
+            dpg.focus_item('save_search_name')
+
+    def run_saved_search(self, name: str):
+        saved = self.saved_searches[name]
+        dpg.set_value('explorer_tab_bar', saved['tab'])
+        for tag, value in saved['inputs'].items():
+            dpg.set_value(tag, value)
+        if saved['tab'] == 'explorer_jobs_tab':
+            self.refresh_jobs()
+        elif saved['tab'] == 'explorer_files_tab':
+            self.refresh_files()
+        else:
+            self.refresh_datasets()
+
+    def delete_saved_search(self, name: str):
+        self.saved_searches.pop(name, None)
+        save_searches(self.saved_searches)
+        self.build_searches_menu()
+
+    def job_search(self) -> list[tuple[str, str, str]]:
+        '''(name, id, owner) searches; comma separated values in any field are combined with the others'''
+        fields = [split_patterns(dpg.get_value(tag)) or ['']
+                  for tag in ('explorer_jobname_input', 'explorer_jobid_input', 'explorer_jobowner_input')]
+        return [search for search in product(*fields) if any(search)]
+
+    def show_jobs(self, jobs: list, fetched: float = None, loading: bool = False):
+        '''List jobs in the results table. `fetched` marks the results as cached at that time.'''
+        self.jobs = []
+        self.jobs_fetched = fetched
+        self.jobs_truncated = False
+        self.jobs_hosts = self.root.multi_host
+        self.job_index.clear()
+        self.job_hidden = set()
+        self.job_checks = {}
+        with self.empty_results('job_results'):
+            dpg.add_text(tag='job_results_status')
 
             # List results
-            with dpg.table(header_row=True, policy=dpg.mvTable_SizingStretchProp):
+            with dpg.table(header_row=True, policy=dpg.mvTable_SizingStretchProp, tag='job_results_table') as table:
+                dpg.add_table_column(width_fixed=True)
+                if self.jobs_hosts:
+                    dpg.add_table_column(label='Host')
                 dpg.add_table_column(label='ID')
                 dpg.add_table_column(label='Name')
                 dpg.add_table_column(label='Owner')
                 dpg.add_table_column(label='RC')
-                for job in jobs:
-                    with dpg.table_row():
-                        dpg.add_selectable(span_columns=True, label=job.id, callback=self.open_job, user_data=job)
-                        dpg.add_selectable(span_columns=True, label=job.name, callback=self.open_job, user_data=job)
-                        dpg.add_selectable(span_columns=True, label=job.owner, callback=self.open_job, user_data=job)
-                        rc = dpg.add_selectable(span_columns=True, label=job.rc, callback=self.open_job, user_data=job)
-                        dpg.bind_item_theme(rc, f'rc_theme_{job.theme()}')
+            if fetched:
+                dpg.bind_item_theme(table, 'explorer_theme_stale')
+        self.add_jobs(jobs)
+        self.update_job_status(loading)
+
+    def add_jobs(self, jobs: list[Job]):
+        '''Append rows to the results table'''
+        self.jobs.extend(jobs)
+        for job in jobs:
+            with dpg.table_row(parent='job_results_table') as row:
+                self.job_checks[row] = dpg.add_checkbox(), job
+                if self.jobs_hosts:
+                    host = dpg.add_selectable(span_columns=True, label=job.host, callback=self.open_job, user_data=job)
+                    dpg.bind_item_theme(host, 'explorer_theme_volume')
+                dpg.add_selectable(span_columns=True, label=job.id, callback=self.open_job, user_data=job)
+                dpg.add_selectable(span_columns=True, label=job.name, callback=self.open_job, user_data=job)
+                dpg.add_selectable(span_columns=True, label=job.owner, callback=self.open_job, user_data=job)
+                rc = dpg.add_selectable(span_columns=True, label=job.rc, callback=self.open_job, user_data=job)
+                dpg.bind_item_theme(rc, f'rc_theme_{job.theme()}')
+            self.job_index.add(row, *job_terms(job))
+        self.filter_jobs()
+
+    def filter_jobs(self, *args):
+        '''Show only the job rows matching the filter box'''
+        text = dpg.get_value('explorer_job_filter')
+        matched = self.job_index.filter(text)
+        self.job_hidden = show_only(self.job_index.rows, matched, self.job_hidden)
+        dpg.configure_item('explorer_job_filter_status', show=matched is not None)
+        if matched is not None:
+            dpg.set_value('explorer_job_filter_status', f'{len(matched)} of {len(self.job_index)} job(s) match')
+
+    def select_jobs(self, selected: bool):
+        '''Tick or clear the jobs shown by the filter'''
+        for row, (check, _) in self.job_checks.items():
+            if row not in self.job_hidden:
+                dpg.set_value(check, selected)
+
+    def selected_jobs(self) -> list[Job]:
+        return [job for check, job in self.job_checks.values() if dpg.get_value(check)]
+
+    def archive_prompt(self):
+        jobs = [job for job in self.selected_jobs() if job.status == 'OUTPUT']
+        with dialog(label='Archive Jobs', tag='archive_dialog', width=500, height=150):
+            if not jobs:
+                dpg.add_text('Select jobs with output to archive first')
+                return
+            dpg.add_text(f'Archive the output of {len(jobs)} job(s) to')
+            path = constants.tempdir / f'jobs-{strftime("%Y%m%d-%H%M%S")}.zip'
+            dpg.add_input_text(tag='archive_path', default_value=str(path), width=-1)
+            dpg.add_checkbox(label='Purge the jobs once archived', tag='archive_purge')
+            dpg.add_button(label='Archive', width=-1, callback=lambda: self.archive(
+                jobs, dpg.get_value('archive_path'), dpg.get_value('archive_purge')))
+
+    def archive(self, jobs: list[Job], path: str, purge: bool):
+        '''Archive job output in the background over each host's spare sessions, showing progress'''
+        cancelled = self.archive_cancel = threading.Event()
+        with dialog(label='Archive Jobs', tag='archive_dialog', width=500, height=120, modal=False):
+            dpg.add_text(f'Archiving {len(jobs)} job(s)...', tag='archive_status')
+            dpg.add_button(label='Cancel', tag='archive_cancel', width=-1, callback=cancelled.set)
+
+        def progress(report):
+            self.root.scheduler.call_soon(dpg.set_value, 'archive_status', str(report))
+
+        def finished(future):
+            try:
+                report = future.result()
+            except Exception as e:
+                print('Error archiving jobs')
+                print(indent(format_exc(), '    '))
+                self.root.zftp.show_error(f'Archive failed: {e}')
+                return
+            with dialog(label='Archive Jobs', tag='archive_dialog', width=600, height=300 if report.errors else 100):
+                dpg.add_text(str(report))
+                if report.errors:
+                    dpg.add_input_text(default_value='\n'.join(report.errors), multiline=True, readonly=True,
+                                       width=-1, height=-1)
+            if report.purged:
+                self.refresh_jobs()
+
+        def pool_for(job: Job):
+            return self.root.session_for(job).search_pool()
+        self.root.scheduler.submit(archive_jobs, jobs, path, pool_for, purge, progress, cancelled, then=finished)
+
+    def update_job_status(self, loading: bool = False):
+        text = f'Found {len(self.jobs)} job(s)' + self.staleness(self.jobs_fetched)
+        if loading:
+            text += ', searching...'
+        if self.jobs_truncated:
+            text += '\nSome jobs were not listed, narrow the search to see them'
+        dpg.set_value('job_results_status', text)
+        if self.jobs_truncated:
+            dpg.configure_item('job_results_status', color=(255, 255, 0))
+
+    def prefetch_jobs(self, jobs: list[Job]):
+        '''Fetch spool listings and small spools of finished jobs in the background,
+        failed jobs first, then the most recent'''
+        for session in self.root.search_sessions():
+            session.prefetcher.clear('spools')
+        finished = [job for job in jobs if job.status == 'OUTPUT']
+        finished.sort(key=lambda job: int(re.sub(r'\D', '', job.id or '') or 0), reverse=True)
+        finished.sort(key=lambda job: job.theme() != 'error')
+        for job in finished[:constants.PREFETCH_JOB_COUNT]:
+            prefetcher = self.root.session_for(job).prefetcher
+            if not prefetcher.schedule(('spools', job.id), fetch_spools, job, constants.PREFETCH_SPOOL_BYTES):
+                break
+
+    def dataset_search(self) -> list[str]:
+        '''Catalog search patterns; several can be given separated by commas'''
+        searches = []
+        for search in split_patterns(dpg.get_value('explorer_dataset_input')):
+            if not re.match(r"'[^']+'", search):
+                if '*' not in search and len(search.split('.')[-1]) < 8:
+                    search = f"'{search}*'"
+                else:
+                    search = f"'{search}'"
+            if search not in searches:
+                searches.append(search)
+        return searches
 
     def refresh_datasets(self):
         # Get datasets
-        search = dpg.get_value('explorer_dataset_input')
-        if not search:
+        searches = self.dataset_search()
+        if not searches:
             return
-        if not re.match(r"'[^']+'", search):
-            if '*' not in search and len(search.split('.')[-1]) < 8:
-                search = f"'{search}*'"
-            else:
-                search = f"'{search}'"
+        self.dataset_searches = searches
 
+        # Show cached results straight away; the live listing replaces them as it streams in
+        cached = self.cached_results(searches, lambda session, search: self.root.cache.datasets(session.host, session.user, search),
+                                     key=dataset_key)
+        if cached:
+            self.show_datasets(*cached)
+        else:
+            with self.empty_results('dataset_results'):  # Clears existing results
+                dpg.add_text('Searching...')
+
+        listing = self.dataset_listing = object()
+        live = []
+        seen = set()
+
+        def fetch(session, search):
+            for batch in session.iter_datasets(search):
+                if listing is not self.dataset_listing:
+                    break
+                self.root.scheduler.call_soon(received, batch)
+
+        def received(batch):
+            if listing is not self.dataset_listing:
+                return
+            if not live:
+                self.show_datasets([], loading=True)
+            batch = [dataset for dataset in batch if dataset_key(dataset) not in seen]
+            seen.update(map(dataset_key, batch))
+            live.extend(batch)
+            self.insert_datasets(batch)
+            self.update_dataset_status(loading=True)
+
+        def finished(errors):
+            if listing is not self.dataset_listing:
+                return
+            if errors and not live:
+                with self.empty_results('dataset_results'):
+                    for error in errors:
+                        dpg.add_text(error, color=(255, 0, 0))
+                return
+
+            # Reconcile: rebuild if the incremental inserts don't match a full sort
+            datasets = sorted((d for d in live if d.type is not None), key=dataset_key)
+            if not live or self.dataset_keys != [dataset_key(d) for d in datasets]:
+                self.show_datasets(datasets)
+            self.update_dataset_status()
+            for error in errors:
+                dpg.add_text(error, color=(255, 0, 0), parent='dataset_results', before='dataset_results_table')
+            if self.prefetch_members:
+                self.prefetch(datasets)
+        self.search_hosts(searches, fetch, finished)
+
+    def show_datasets(self, datasets: list[Dataset], fetched: float = None, loading: bool = False):
+        '''List datasets in the results table. `fetched` marks the results as cached at that time.'''
+        self.datasets = []
+        self.dataset_keys = []
+        self.dataset_rows = []
+        self.datasets_fetched = fetched
+        self.dataset_hosts = self.root.multi_host
+        self.dataset_index.clear()
+        self.dataset_hidden = set()
+        self.member_parents = {}
+        self.member_rows = {}
         with self.empty_results('dataset_results'):  # Clears existing results
-            # Search for datasets
-            status = dpg.add_text('Searching...')
-            datasets = [d for d in self.root.zftp.list_datasets(search) if d.type is not None]
-            dpg.set_value(status, f'Found {len(datasets)} dataset(s)')
+            dpg.add_text(tag='dataset_results_status')
 
-            # List results
-            with dpg.table(header_row=True, policy=dpg.mvTable_SizingStretchProp, tag='dataset_results_table'):
-                dpg.add_table_column(label='Volume')
-                dpg.add_table_column(label='Name')
-                for dataset in datasets:
-                    self.entry(dataset, leaf=not dataset.is_partitioned())
+            # List results; the statistics columns appear once a PDS with ISPF statistics is expanded
+            with dpg.table(header_row=True, policy=dpg.mvTable_SizingStretchProp, tag='dataset_results_table',
+                           sortable=True, sort_tristate=True, callback=self.sort_members):
+                if self.dataset_hosts:
+                    dpg.add_table_column(label='Host', no_sort=True)
+                dpg.add_table_column(label='Volume', no_sort=True)
+                self.sort_columns = {dpg.add_table_column(label='Name'): 'name'}
+                for label, column in (('Changed', 'changed'), ('Size', 'size'), ('User', 'user')):
+                    self.sort_columns[dpg.add_table_column(label=label, show=False)] = column
+            if fetched:
+                dpg.bind_item_theme('dataset_results_table', 'explorer_theme_stale')
+        self.insert_datasets(datasets)
+        self.update_dataset_status(loading)
+
+    def insert_datasets(self, datasets: list[Dataset]):
+        '''Add rows to the results table, each in its sorted position'''
+        for dataset in datasets:
+            if dataset.type is None:
+                continue
+            key = dataset_key(dataset)
+            index = bisect(self.dataset_keys, key)
+            before = self.dataset_rows[index] if index < len(self.dataset_rows) else 0
+            row = self.entry(dataset, leaf=not dataset.is_partitioned(), before=before)
+            self.datasets.insert(index, dataset)
+            self.dataset_keys.insert(index, key)
+            self.dataset_rows.insert(index, row)
+            self.dataset_index.add(row, *dataset_terms(dataset))
+        self.filter_datasets()
 
-    def entry(self, dataset: Dataset, leaf: bool, **kwargs):
+    def filter_datasets(self, *args):
+        '''Show only the rows matching the filter box, along with the PDSs of matching
+        members and the expanded members of matching PDSs'''
+        text = dpg.get_value('explorer_dataset_filter')
+        matched = self.dataset_index.filter(text)
+        if matched is not None:
+            parents = self.member_parents
+            members = {row for row, parent in parents.items() if parent in matched}
+            matched |= members | {parents[row] for row in matched if row in parents}
+        self.dataset_hidden = show_only(self.dataset_index.rows, matched, self.dataset_hidden)
+
+        # Offer a new search when the filter reaches past what was listed
+        prefix = name_prefix(text)
+        outside = prefix and self.dataset_searches and not any(covers(search, prefix) for search in self.dataset_searches)
+        dpg.configure_item('explorer_dataset_filter_group', show=matched is not None)
+        dpg.configure_item('explorer_dataset_widen', show=bool(outside))
+        if matched is None:
+            return
+        status = f'{len(matched)} of {len(self.dataset_index)} row(s) match'
+        if outside:
+            status += f', {prefix}* was not listed'
+        dpg.set_value('explorer_dataset_filter_status', status)
+
+    def widen_dataset_search(self):
+        dpg.set_value('explorer_dataset_input', name_prefix(dpg.get_value('explorer_dataset_filter')))
+        self.refresh_datasets()
+
+    def update_dataset_status(self, loading: bool = False):
+        text = f'Found {len(self.datasets)} dataset(s)' + self.staleness(self.datasets_fetched)
+        if loading:
+            text += ', searching...'
+        dpg.set_value('dataset_results_status', text)
+
+    def prefetch(self, datasets: list[Dataset]):
+        '''Fetch member lists of the first few PDSs in the background so expanding them is instant'''
+        for session in self.root.search_sessions():
+            session.prefetcher.clear('members')
+        partitioned = [d for d in datasets if d.is_partitioned()]
+        for dataset in partitioned[:constants.PREFETCH_PDS_COUNT]:
+            prefetcher = self.root.session_for(dataset).prefetcher
+            if not prefetcher.schedule(('members', dataset.name), zFTP.get_members, dataset):
+                break
+
+    # === Search on host ===
+    def host_search_prompt(self):
+        with dialog(label='Search on Host', tag='host_search_dialog', width=520, height=240, modal=False):
+            dpg.add_input_text(label='Datasets', tag='host_search_datasets', uppercase=True, width=-80,
+                               hint='USER.SRC, USER.*.COBOL(PAY*)', default_value=dpg.get_value('explorer_dataset_input'))
+            dpg.add_input_text(label='Strings', tag='host_search_strings', multiline=True, height=70, width=-80,
+                               hint='One per line')
+            dpg.add_checkbox(label='Ignore case', tag='host_search_any_case', default_value=True)
+            dpg.add_button(label='Search', tag='host_search_button', width=-1, callback=self.host_search)
+            dpg.add_text(tag='host_search_status', color=(170, 170, 170))
+
+    def host_search(self):
+        '''Search datasets for strings with a SuperC job on the first searched host, on
+        one of its spare sessions; only the hit listings are downloaded'''
+        patterns = split_patterns(dpg.get_value('host_search_datasets'))
+        strings = [string for string in dpg.get_value('host_search_strings').splitlines() if string.strip()]
+        any_case = dpg.get_value('host_search_any_case')
+        if not patterns or not strings:
+            return
+        session = self.root.search_sessions()[0]
+        dpg.configure_item('host_search_button', enabled=False)
+
+        def status(message: str):
+            self.root.scheduler.call_soon(dpg.set_value, 'host_search_status', message)
+
+        def run(pooled: zFTP):
+            status('Finding datasets...')
+            targets, errors = search_targets(pooled, patterns)
+            if not targets:
+                return [], errors
+            status(f'Submitting a search of {len(targets)} dataset(s)...')
+            hits, search_errors = search_on_host(pooled, targets, strings, any_case, progress=status)
+            return hits, errors + search_errors
+
+        def finished(future):
+            if dpg.does_item_exist('host_search_button'):
+                dpg.configure_item('host_search_button', enabled=True)
+                dpg.set_value('host_search_status', '')
+            try:
+                hits, errors = future.result()
+            except Exception as e:
+                print('Error searching on host')
+                print(indent(format_exc(), '    '))
+                session.show_error(f'Search failed: {e}')
+                return
+            self.show_host_hits(session, hits, errors)
+        future = session.search_pool().submit(run)
+        future.add_done_callback(lambda future: self.root.scheduler.call_soon(finished, future))
+
+    def show_host_hits(self, session: zFTP, hits: list[SearchHit], errors: list[str]):
+        '''List hits by dataset or member, each opening it when clicked'''
+        with dialog(label='Search Results', tag='host_search_results', width=700, height=450, modal=False):
+            names = {hit.name for hit in hits}
+            dpg.add_text(f'{len(hits)} line(s) found in {len(names)} dataset(s) or member(s)')
+            for error in errors:
+                dpg.add_text(error, color=(255, 0, 0))
+            node = None
+            for i, hit in enumerate(hits):
+                if i == 0 or hit.name != hits[i - 1].name:
+                    node = dpg.add_tree_node(label=hit.name, default_open=len(names) <= 20)
+                dpg.add_selectable(label=f'{hit.line:>6}  {hit.text}', parent=node,
+                                   callback=self.open_hit, user_data=(session, hit))
+
+    def open_hit(self, sender, data, user_data):
+        dpg.set_value(sender, False)
+        session, hit = user_data
+        target = hit.target()
+        target.host = session.host
+        self.root.editor.open_file(target)
+
+    # === z/OS UNIX files ===
+    def refresh_files(self):
+        '''Walk the directory tree under the path in the Files tab, over the spare
+        sessions of the first searched host, adding directories as they are listed'''
+        root = dpg.get_value('explorer_uss_input').strip()
+        if not root.startswith('/'):
+            return
+        session = self.root.search_sessions()[0]
+        listing = self.file_listing = object()
+        self.directory_nodes = {}
+        counts = {'dirs': 0, 'files': 0, 'cached': 0, 'errors': 0}
+        start = time()
+        with self.empty_results('uss_results'):
+            pass
+        dpg.configure_item('explorer_uss_status', show=True)
+        dpg.set_value('explorer_uss_status', 'Listing...')
+
+        def run():
+            for result in walk(session, session.search_pool(), root,
+                               constants.USS_MAX_DEPTH, constants.USS_MAX_DIRS):
+                if listing is not self.file_listing:
+                    break
+                self.root.scheduler.call_soon(received, *result)
+
+        def received(path: str, files: list[UnixFile], cached: bool, error: Exception):
+            if listing is not self.file_listing:
+                return
+            counts['dirs'] += 1
+            counts['files'] += sum(not file.is_dir() for file in files)
+            counts['cached'] += cached
+            counts['errors'] += error is not None
+            self.add_directory(session, path, files, error)
+            update(loading=True)
+
+        def update(loading: bool = False):
+            text = (f"{counts['dirs']} directories, {counts['files']} files "
+                    f"({counts['cached']} listings cached) in {time() - start:.1f}s")
+            if counts['errors']:
+                text += f", {counts['errors']} not listed"
+            if counts['dirs'] >= constants.USS_MAX_DIRS:
+                text += f', stopped at {constants.USS_MAX_DIRS} directories'
+            dpg.set_value('explorer_uss_status', text + (', listing...' if loading else ''))
+
+        def finished(future):
+            if listing is not self.file_listing:
+                return
+            try:
+                future.result()
+            except Exception as e:
+                print(f'Error walking {root}')
+                print(indent(format_exc(), '    '))
+                dpg.add_text(f'Error: {e}', color=(255, 0, 0), parent='uss_results')
+            update()
+        self.root.scheduler.submit(run, then=finished)
+
+    def add_directory(self, session: zFTP, path: str, files: list[UnixFile], error: Exception = None):
+        '''Fill a directory's tree node, or the results root for the walked directory'''
+        parent = self.directory_nodes.get(path, 'uss_results')
+        if error is not None:
+            dpg.add_text(str(error), color=(255, 0, 0), parent=parent)
+            return
+        if not files:
+            dpg.add_text('<empty>', parent=parent)
+        for file in sorted(files, key=lambda file: (not file.is_dir(), file.name)):
+            if file.is_dir():
+                self.directory_nodes[file.path] = dpg.add_tree_node(label=file.name + '/', parent=parent)
+                continue
+            label = f'{file.name} -> {file.target}' if file.target else file.name
+            selectable = dpg.add_selectable(label=label, parent=parent, user_data=(session, file),
+                                            callback=self.open_unix_file)
+            with dpg.tooltip(selectable):
+                dpg.add_text(f'{file.permissions}  {file.owner}  {file.size} bytes  {file.mtime}')
+
+    def open_unix_file(self, sender, data, user_data):
+        dpg.set_value(sender, False)
+        session, file = user_data
+        dataset = Dataset(name=file.path, type='HFS', recformat=None, reclength=None,
+                          used=None, host=session.host)
+        self.root.editor.open_file(dataset)
+
+    def staleness(self, fetched: float = None) -> str:
+        if not fetched:
+            return ''
+        age = time() - fetched
+        for unit, seconds in (('d', 86400), ('h', 3600), ('m', 60)):
+            if age >= seconds:
+                return f' (cached {int(age // seconds)}{unit} ago, refreshing...)'
+        return ' (cached, refreshing...)'
+
+    def entry(self, dataset: Dataset, leaf: bool, stats: dict = None, **kwargs):
         with dpg.table_row(parent='dataset_results_table', **kwargs) as row:
+            if self.dataset_hosts:
+                with dpg.table_cell():
+                    host = dpg.add_selectable(label='' if dataset.member else dataset.host, span_columns=True)
+                    dpg.bind_item_theme(host, 'explorer_theme_volume')
             with dpg.table_cell():
                 volume = '' if dataset.member else dataset.volume
                 selectable = dpg.add_selectable(label=volume, span_columns=True)
@@ -145,6 +771,11 @@ class Explorer:
                 name = dataset.name + '/' if dataset.is_partitioned() else dataset.name
                 dpg.add_selectable(label=dataset.member or name, span_columns=True)
 
+            if stats and stats['changed']:
+                dpg.add_text(stats['changed'])
+                dpg.add_text(str(stats['size']))
+                dpg.add_text(stats['user'])
+
         # Create context menu
         dpg.popup
         with dpg.window(show=False, autosize=True, popup=True) as context_menu:
@@ -153,6 +784,8 @@ class Explorer:
                 dpg.add_menu_item(label='Submit', callback=self._submit_file(dataset))
             else:
                 dpg.add_menu_item(label='Create member', callback=self._new_member(dataset))
+            dpg.add_menu_item(label='Copy...', callback=self.copy_prompt, user_data=(dataset, False))
+            dpg.add_menu_item(label='Move...', callback=self.copy_prompt, user_data=(dataset, True))
             dpg.add_menu_item(label='Delete', callback=self.try_delete_file, user_data=dataset)
             dpg.add_menu_item(label='Properties', callback=self.properties_popup, user_data=dataset)
 
@@ -164,21 +797,56 @@ class Explorer:
             dpg.add_item_clicked_handler(dpg.mvMouseButton_Right,
                                          callback=lambda: dpg.configure_item(context_menu, show=True))
         dpg.bind_item_handler_registry(selectable, reg)
+        return row
 
     def populate_pds(self, dataset: Dataset, parent_row: int):
         if dataset._populated:
             dataset._populated = False
-            for child in dpg.get_item_children('dataset_results_table')[1]:
-                if dpg.get_item_user_data(child) == dataset:
-                    dpg.delete_item(child)
+            self.remove_members(dataset)
             return
 
-        # Load members
-        # status = dpg.add_text('Loading members...', parent=id, indent=10)
-        members = self.root.zftp.get_members(dataset)
-        # dpg.delete_item(status)
+        # Load members, from the prefetcher or cache first if possible
+        zftp = self.root.session_for(dataset)
+        prefetched = zftp.prefetcher.take(('members', dataset.name))
+        cached = None if prefetched is not None else self.root.cache.members(zftp.host, zftp.user, dataset)
+        if prefetched is not None:
+            members = prefetched
+            dataset._populated = True
+        elif cached:
+            members, _ = cached
+            dataset._populated = True
+
+            def refreshed(future):
+                try:
+                    fresh = future.result()
+                except zFTPError as e:
+                    print(f'Error refreshing members of {dataset.name}, keeping the cached list: {e}')
+                    return
+                if dataset._populated and fresh.fingerprints() != members.fingerprints():
+                    self.remove_members(dataset)
+                    self.add_members(dataset, parent_row, fresh)
+            # Unwrapped, so a failed refresh raises instead of coming back as an empty member list
+            self.root.scheduler.submit(zFTP.get_members, zftp, dataset, then=refreshed)
+        else:
+            # status = dpg.add_text('Loading members...', parent=id, indent=10)
+            members = zftp.get_members(dataset)
+            dataset._populated = True
+            # dpg.delete_item(status)
+        self.add_members(dataset, parent_row, members)
+
+    def remove_members(self, dataset: Dataset):
+        rows = [child for child in dpg.get_item_children('dataset_results_table')[1]
+                if dpg.get_item_user_data(child) == dataset]
+        for row in rows:
+            dpg.delete_item(row)
+            self.member_rows.pop(self.member_parents.pop(row, None), None)
+        self.dataset_index.remove(rows)
+        self.dataset_hidden.difference_update(rows)
 
+    def add_members(self, dataset: Dataset, parent_row: int, members: Members):
         children = dpg.get_item_children('dataset_results_table')[1]
+        if parent_row not in children:
+            return
         index = children.index(parent_row) + 1
         if index < len(children):
             before = children[index]
@@ -186,14 +854,50 @@ class Explorer:
             before = 0
 
         if not members:
-            with dpg.table_row(parent='dataset_results_table', before=before, user_data=dataset):
+            with dpg.table_row(parent='dataset_results_table', before=before, user_data=dataset) as row:
+                if self.dataset_hosts:
+                    dpg.add_table_cell()
                 dpg.add_table_cell()
                 with dpg.table_cell():
                     dpg.add_text('<empty>')
-            return
-        # List members
-        for member in members:
-            self.entry(dataset=dataset(member), leaf=True, before=before, user_data=dataset)
+            self.member_parents[row] = parent_row
+            self.dataset_index.add(row, [])
+        # List members in the current sort order, keeping their rows in listing order for resorting
+        rows = [0] * len(members)
+        for i in members.order(*self.member_sort):
+            member = dataset(members[i])
+            row = self.entry(dataset=member, leaf=True, stats=members.stats(i), before=before, user_data=dataset)
+            rows[i] = row
+            self.member_parents[row] = parent_row
+            self.dataset_index.add(row, *member_terms(member, members, i))
+        if members:  # An empty PDS keeps its <empty> row as a follower when sorting
+            self.member_rows[parent_row] = members, rows
+        if any(members.changed):
+            for column in self.sort_columns:
+                dpg.configure_item(column, show=True)
+        self.filter_datasets()
+
+    def sort_members(self, sender, sort_specs):
+        '''Sort the members of every expanded PDS by the clicked column. Datasets keep
+        their catalog order; clearing the sort goes back to member name order.'''
+        column, direction = sort_specs[0] if sort_specs else (None, 1)
+        self.member_sort = self.sort_columns.get(column, 'name'), direction < 0
+        children = dpg.get_item_children('dataset_results_table')[1]
+        followers: dict[int, list[int]] = {}  # Rows behind each PDS that aren't sorted, like <empty>
+        for row in children:
+            if row in self.member_parents:
+                followers.setdefault(self.member_parents[row], []).append(row)
+        order = []
+        for row in children:
+            if row in self.member_parents:
+                continue
+            order.append(row)
+            if row in self.member_rows:
+                members, rows = self.member_rows[row]
+                order.extend(rows[i] for i in members.order(*self.member_sort))
+            else:
+                order.extend(followers.get(row, ()))
+        dpg.reorder_items('dataset_results_table', 1, order)
 
     def _populate_pds(self, dataset: Dataset, parent: int):
         return lambda: self.populate_pds(dataset, parent)
@@ -211,7 +915,7 @@ class Explorer:
 
     def _submit_file(self, dataset: Dataset):
         def callback():
-            self.root.zftp.submit_job(dataset)
+            self.root.session_for(dataset).submit_job(dataset)
         return callback
 
     def open_job(self, sender, data, job):
@@ -229,10 +933,61 @@ class Explorer:
 
     def delete_file(self, sender, data, dataset):
         dpg.delete_item('delete_file_dialog')
-        self.root.zftp.delete(dataset)
+        self.root.session_for(dataset).delete(dataset)
         self.root.editor.close_tab_by_dataset(dataset)
         self.refresh_datasets()
 
+    def copy_prompt(self, sender, data, user_data):
+        dataset, move = user_data
+        action = 'Move' if move else 'Copy'
+        if dataset.member:
+            default = f'{dataset.parent}({copy_name(dataset.member)})'
+        else:
+            default = copy_dataset_name(dataset.name)
+        library = dataset.is_partitioned() and not dataset.member  # Only whole libraries pick members
+        with dialog(label=f'{action} {dataset.name}', tag='copy_dialog', width=450, height=180):
+            dpg.add_input_text(label='To', tag='copy_target', default_value=default, uppercase=True, width=-80)
+            if library:
+                dpg.add_input_text(label='Members', tag='copy_members', uppercase=True, width=-80,
+                                   hint='All, or patterns: PAY*, CALC%')
+            dpg.add_checkbox(label='Replace existing members', tag='copy_replace',
+                             show=bool(dataset.member) or dataset.is_partitioned())
+            dpg.add_button(label=action, width=-1, callback=lambda: self.copy_on_host(
+                dataset, dpg.get_value('copy_target'), move,
+                split_patterns(dpg.get_value('copy_members')) if library else None,
+                dpg.get_value('copy_replace')))
+
+    def copy_on_host(self, dataset: Dataset, target: str, move: bool, patterns: list[str], replace: bool):
+        '''Copy or move with one job on the host, run on a spare session of the dataset's host'''
+        session = self.root.session_for(dataset)
+        action = 'Move' if move else 'Copy'
+        with dialog(label=action, tag='copy_dialog', width=400, height=80, modal=False):
+            dpg.add_text(f'{action} of {dataset.name} to {target} running on the host...', tag='copy_status')
+
+        def run(pooled: zFTP):
+            members = select_members(pooled, dataset, patterns) if patterns else None
+            return copy_on_host(pooled, dataset, target, members, move, replace), members
+
+        def finished(future):
+            if dpg.does_item_exist('copy_dialog'):
+                dpg.delete_item('copy_dialog')
+            try:
+                job, members = future.result()
+            except Exception as e:
+                print(f'Error in {action.lower()} of {dataset.name}')
+                print(indent(format_exc(), '    '))
+                session.show_error(f'{action} failed: {e}')
+                return
+            copied = f'{len(members)} member(s) of {dataset.name}' if members else dataset.name
+            with dialog(label=action, tag='copy_dialog', width=400, height=80):
+                dpg.add_text(f'{copied} {"moved" if move else "copied"} to {target} by {job.id}')
+            if move:
+                for moved in [dataset(member) for member in members] if members else [dataset]:
+                    self.root.editor.close_tab_by_dataset(moved)
+            self.refresh_datasets()
+        future = session.search_pool().submit(run)
+        future.add_done_callback(lambda future: self.root.scheduler.call_soon(finished, future))
+
     def properties_popup(self, sender, data, dataset):
         with dialog(label=dataset.name, tag='properties_dialog', width=500, height=300):
             properties = dataset.properties()
@@ -255,3 +1010,45 @@ class Explorer:
         dpg.push_container_stack(item)
         yield
         dpg.pop_container_stack()
+
+
+def dataset_key(dataset: Dataset) -> tuple:
+    '''Order of the dataset results; the same dataset from several hosts is listed by host'''
+    return (*dataset_order(dataset), dataset.host or '')
+
+
+def job_key(job: Job) -> tuple:
+    return job.host, job.id
+
+
+def split_patterns(text: str) -> list[str]:
+    '''Comma separated search patterns'''
+    return [pattern.strip() for pattern in text.split(',') if pattern.strip()]
+
+
+def search_text(search) -> str:
+    '''A dataset pattern or (name, id, owner) job search as shown in messages'''
+    return search if isinstance(search, str) else ' '.join(part or '*' for part in search)
+
+
+def load_searches() -> dict[str, dict]:
+    try:
+        return json.loads(constants.SAVED_SEARCHES.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_searches(searches: dict[str, dict]):
+    constants.SAVED_SEARCHES.write_text(json.dumps(searches, indent=2))
+
+
+def show_only(rows: set[int], shown: set[int], hidden: set[int]) -> set[int]:
+    '''Hide the table rows not in `shown` (none when it is None), only touching rows
+    whose visibility changes. Takes and returns the set of hidden rows.'''
+    hide = set() if shown is None else rows - shown
+    for row in hide - hidden:
+        dpg.configure_item(row, show=False)
+    for row in hidden - hide:
+        if dpg.does_item_exist(row):
+            dpg.configure_item(row, show=True)
+    return hide
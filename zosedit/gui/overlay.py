@@ -0,0 +1,85 @@
+from time import time
+from dearpygui import dearpygui as dpg
+from zosedit.zftp import zFTP
+
+
+class ProgressOverlay:
+    '''Progress bar in the top right corner of the viewport.
+
+    While a transfer is running the bar shows the completed fraction (when the
+    size is known) with bytes and throughput next to it, and a cancel button
+    that aborts the transfer; Escape does the same. Otherwise it is an
+    indeterminate bar for any other wait.
+
+    The draw items are created once and moved in place every frame, so a long
+    wait does not accumulate draw commands.'''
+
+    WIDTH = 100
+    MARGIN = 30
+    Y = 10
+    SPEED = 60  # pixels per second
+    TEXT_SIZE = 13
+
+    def __init__(self):
+        self.track = None
+        self.bar = None
+        self.text = None
+        self.cancel = None
+        self.cancel_rect = None
+        self.visible = False
+
+    def build(self):
+        dpg.add_viewport_drawlist(tag='overlay', show=False)
+        self.track = dpg.draw_line((0, 0), (0, 0), color=(37, 37, 38), parent='overlay')
+        self.bar = dpg.draw_line((0, 0), (0, 0), parent='overlay')
+        self.text = dpg.draw_text((0, 0), '', size=self.TEXT_SIZE, color=(170, 170, 170), parent='overlay')
+        self.cancel = dpg.draw_text((0, 0), 'x', size=self.TEXT_SIZE, color=(255, 80, 80), parent='overlay')
+
+    def update(self, zftp: zFTP):
+        if not zftp.waiting:
+            if self.visible:
+                dpg.configure_item('overlay', show=False)
+                self.visible = False
+            return
+
+        xmax = dpg.get_viewport_width() - self.MARGIN
+        xmin = xmax - self.WIDTH
+        progress = zftp.progress
+        if progress and progress.fraction is not None:
+            x1, x2 = 0, int(progress.fraction * self.WIDTH)
+        else:
+            elapsed = int((time() - zftp.wait_start) * self.SPEED)
+            x1 = elapsed % self.WIDTH
+            x2 = (elapsed + 10) % self.WIDTH
+            if x2 < x1:
+                x2 = self.WIDTH
+
+        dpg.configure_item(self.track, p1=(xmin, self.Y), p2=(xmax, self.Y))
+        dpg.configure_item(self.bar, p1=(xmin + x1, self.Y), p2=(xmin + x2, self.Y))
+
+        if progress:
+            text = str(progress)
+            tw = (dpg.get_text_size(text) or (0, 0))[0]
+            ty = self.Y - self.TEXT_SIZE / 2
+            dpg.configure_item(self.text, text=text, pos=(xmin - tw - 10, ty), show=True)
+            dpg.configure_item(self.cancel, pos=(xmax + 8, ty), show=True)
+            self.cancel_rect = (xmax + 4, ty - 2, xmax + 20, ty + self.TEXT_SIZE + 2)
+            if self.cancel_requested():
+                zftp.cancel()
+        elif self.cancel_rect:
+            dpg.configure_item(self.text, show=False)
+            dpg.configure_item(self.cancel, show=False)
+            self.cancel_rect = None
+
+        if not self.visible:
+            dpg.configure_item('overlay', show=True)
+            self.visible = True
+
+    def cancel_requested(self) -> bool:
+        if dpg.is_key_pressed(dpg.mvKey_Escape):
+            return True
+        if not dpg.is_mouse_button_released(dpg.mvMouseButton_Left):
+            return False
+        x, y = dpg.get_mouse_pos(local=False)
+        x1, y1, x2, y2 = self.cancel_rect
+        return x1 <= x <= x2 and y1 <= y <= y2
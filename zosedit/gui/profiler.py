@@ -0,0 +1,168 @@
+import json
+import heapq
+import inspect
+from time import time, strftime
+from traceback import format_exc
+from textwrap import indent
+from dearpygui import dearpygui as dpg
+from zosedit import constants
+
+
+class FrameProfiler:
+    '''Opt-in profiler for work done on the render thread (ZOSEDIT_PROFILE=1).
+
+    dearpygui is switched to manual callback management, so every callback of
+    every item and handler is queued to the main loop and run here, timed, instead
+    of on dearpygui's callback thread; render thread callbacks of the scheduler are
+    timed the same way. Per frame it records the total time and the callbacks run
+    in it. It keeps per-callback totals, a frame time histogram and the slowest
+    frames, shows them in a window that updates twice a second, and dumps them as
+    JSON to tempdir on exit or on demand.'''
+
+    BUCKETS = 4, 8, 16, 33, 50, 100, 250, 1000  # Histogram upper bounds in ms
+    SLOWEST = 20  # Slowest frames kept
+    REFRESH = 0.5
+
+    def __init__(self):
+        self.stats: dict[str, list] = {}  # name -> [calls, total, max]
+        self.histogram = [0] * (len(self.BUCKETS) + 1)
+        self.slowest: list[tuple] = []  # Heap of (duration, frame, callbacks)
+        self.frames = 0
+        self.frame_calls: list[tuple[str, float]] = []
+        self.signatures: dict = {}
+        self.refreshed = 0
+
+    def build(self):
+        dpg.configure_app(manual_callback_management=True)
+        with dpg.window(label='Profiler', tag='profiler_window', width=520, height=420, show=True):
+            with dpg.group(horizontal=True):
+                dpg.add_button(label='Dump', callback=self.dump)
+                dpg.add_button(label='Reset', callback=self.reset)
+                dpg.add_text(tag='profiler_summary')
+            dpg.add_text('Frame times', color=(170, 170, 170))
+            dpg.add_text(tag='profiler_histogram')
+            dpg.add_text('Callbacks by total time', color=(170, 170, 170))
+            with dpg.table(header_row=True, tag='profiler_callbacks', policy=dpg.mvTable_SizingStretchProp):
+                dpg.add_table_column(label='Callback')
+                dpg.add_table_column(label='Calls')
+                dpg.add_table_column(label='Total ms')
+                dpg.add_table_column(label='Max ms')
+            dpg.add_text('Slowest frames', color=(170, 170, 170))
+            dpg.add_text(tag='profiler_slowest')
+
+    def reset(self):
+        self.__init__()
+
+    # === Measuring ===
+    def run_callbacks(self):
+        '''Run the callbacks dearpygui queued since the last frame'''
+        for job in dpg.get_callback_queue() or ():
+            callback = job[0]
+            if callback is None:
+                continue
+            # Pass only as many of (sender, app_data, user_data) as the callback takes, like dpg.run_callbacks
+            count = self.signatures.get(callback)
+            if count is None:
+                try:
+                    count = self.signatures[callback] = len(inspect.signature(callback).parameters)
+                except (TypeError, ValueError):
+                    count = 0
+            try:
+                self.call(callback, *job[1:count + 1])
+            except Exception:
+                print(f'Error in callback {callback_name(callback)}')
+                print(indent(format_exc(), '    '))
+
+    def call(self, func, *args):
+        '''Run func(*args), recording its time against the current frame'''
+        start = time()
+        try:
+            func(*args)
+        finally:
+            self.record(callback_name(func), time() - start)
+
+    def record(self, name: str, duration: float):
+        self.frame_calls.append((name, duration))
+        stats = self.stats.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += duration
+        stats[2] = max(stats[2], duration)
+
+    def end_frame(self, frame_start: float, render_start: float):
+        '''Close the frame begun at frame_start; the render call began at render_start'''
+        end = time()
+        self.record('render_dearpygui_frame', end - render_start)
+        duration = end - frame_start
+        self.frames += 1
+        ms = duration * 1000
+        self.histogram[next((i for i, bound in enumerate(self.BUCKETS) if ms < bound), len(self.BUCKETS))] += 1
+        frame = (duration, self.frames, self.frame_calls)
+        if len(self.slowest) < self.SLOWEST:
+            heapq.heappush(self.slowest, frame)
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, frame)
+        self.frame_calls = []
+        if end - self.refreshed > self.REFRESH:
+            self.refreshed = end
+            self.update()
+
+    # === Reporting ===
+    def update(self):
+        if not dpg.is_item_shown('profiler_window'):
+            return
+        dpg.set_value('profiler_summary', f'{self.frames} frames')
+        dpg.set_value('profiler_histogram', '\n'.join(
+            f'{label:>10} {count:>7} {bar(count, self.frames)}' for label, count in self.buckets()))
+
+        for row in dpg.get_item_children('profiler_callbacks')[1]:
+            dpg.delete_item(row)
+        for name, (calls, total, longest) in self.top(15):
+            with dpg.table_row(parent='profiler_callbacks'):
+                dpg.add_text(name)
+                dpg.add_text(str(calls))
+                dpg.add_text(f'{total * 1000:.1f}')
+                dpg.add_text(f'{longest * 1000:.1f}')
+
+        lines = []
+        for duration, frame, calls in sorted(self.slowest, reverse=True)[:5]:
+            lines.append(f'Frame {frame}: {duration * 1000:.1f} ms')
+            for name, spent in sorted(calls, key=lambda call: -call[1])[:4]:
+                lines.append(f'    {spent * 1000:8.1f} ms  {name}')
+        dpg.set_value('profiler_slowest', '\n'.join(lines))
+
+    def buckets(self) -> list[tuple[str, int]]:
+        labels = [f'< {bound} ms' for bound in self.BUCKETS] + [f'>= {self.BUCKETS[-1]} ms']
+        return list(zip(labels, self.histogram))
+
+    def top(self, count: int = None) -> list[tuple[str, list]]:
+        return sorted(self.stats.items(), key=lambda item: -item[1][1])[:count]
+
+    def dump(self) -> str:
+        '''Write everything recorded so far to a JSON file in tempdir, returns its path'''
+        path = constants.tempdir / f'profile-{strftime("%Y%m%d-%H%M%S")}.json'
+        report = {
+            'frames': self.frames,
+            'histogram': dict(self.buckets()),
+            'callbacks': [{'name': name, 'calls': calls, 'total_ms': total * 1000, 'max_ms': longest * 1000}
+                          for name, (calls, total, longest) in self.top()],
+            'slowest_frames': [{'frame': frame, 'ms': duration * 1000,
+                                'callbacks': [{'name': name, 'ms': spent * 1000} for name, spent in calls]}
+                               for duration, frame, calls in sorted(self.slowest, reverse=True)],
+        }
+        path.write_text(json.dumps(report, indent=2))
+        print(f'Profile written to {path}')
+        return str(path)
+
+
+def callback_name(func) -> str:
+    '''Readable name for a callback; lambdas and nested functions get their line number'''
+    func = getattr(func, 'func', func)  # functools.partial
+    name = getattr(func, '__qualname__', None) or repr(func)
+    code = getattr(func, '__code__', None)
+    if code and '<' in name:
+        name += f':{code.co_firstlineno}'
+    return name
+
+
+def bar(count: int, total: int, width: int = 30) -> str:
+    return '#' * round(width * count / total) if total else ''
@@ -0,0 +1,87 @@
+import queue
+import threading
+from time import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dearpygui import dearpygui as dpg
+
+
+class FrameScheduler:
+    '''Paces the render loop. Frames render at the full (vsync) rate while the
+    user is interacting, a transfer is running or background results are
+    pending, and drop to IDLE_FPS once nothing has happened for IDLE_AFTER seconds.
+
+    Background work submitted through `submit` runs on a worker thread; its
+    `then` callback is queued and run on the render thread by `run_pending`.'''
+
+    IDLE_FPS = 10
+    IDLE_AFTER = 1.0
+
+    def __init__(self, workers: int = 4):
+        self.last_activity = time()
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='background')
+        self.results = queue.SimpleQueue()
+        self.running: set[Future] = set()
+        self.profiler = None  # FrameProfiler timing the callbacks run by run_pending, when profiling
+        self._wake = threading.Event()
+
+    def build(self):
+        with dpg.handler_registry():
+            dpg.add_mouse_move_handler(callback=self.wake)
+            dpg.add_mouse_click_handler(callback=self.wake)
+            dpg.add_mouse_wheel_handler(callback=self.wake)
+            dpg.add_key_down_handler(callback=self.wake)
+        dpg.set_viewport_resize_callback(self.wake)
+
+    def wake(self, *args):
+        self.last_activity = time()
+        self._wake.set()
+
+    def submit(self, func, *args, then=None) -> Future:
+        '''Run func(*args) in the background, then call then(future) on the render thread'''
+        future = self.executor.submit(func, *args)
+        self.running.add(future)
+
+        def done(future):
+            self.running.discard(future)
+            if then:
+                self.results.put((then, future))
+            self.wake()
+        future.add_done_callback(done)
+        return future
+
+    def call_soon(self, func, *args):
+        '''Queue func(*args) to run on the render thread before the next frame'''
+        self.results.put((func, *args))
+        self.wake()
+
+    def run_pending(self):
+        while True:
+            try:
+                func, *args = self.results.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if self.profiler:
+                    self.profiler.call(func, *args)
+                else:
+                    func(*args)
+            except Exception as e:
+                print('Error in scheduled callback:', e)
+
+    def idle(self, busy: bool = False) -> bool:
+        if busy or self.running or not self.results.empty():
+            self.last_activity = time()
+            return False
+        return time() - self.last_activity > self.IDLE_AFTER
+
+    def throttle(self, frame_start: float, busy: bool = False):
+        '''Sleep out the rest of an idle frame; returns early when woken'''
+        if not self.idle(busy):
+            return
+        self._wake.clear()
+        remaining = 1 / self.IDLE_FPS - (time() - frame_start)
+        if remaining > 0:
+            self._wake.wait(remaining)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
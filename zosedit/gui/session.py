@@ -0,0 +1,127 @@
+from dearpygui import dearpygui as dpg
+from functools import wraps
+from traceback import format_exc
+from textwrap import indent
+from zosedit.gui.dialog import dialog
+from zosedit.models import Dataset, Members
+from zosedit.zftp import zFTP, zFTPError, TransferCancelled, Source, SessionPool
+from zosedit.prefetch import Prefetcher
+from zosedit import constants
+
+
+def reports(fallback=None, quiet=False):
+    '''Show zFTPErrors raised by the wrapped operation in an error dialog and return `fallback` instead'''
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            except zFTPError as e:
+                if quiet or isinstance(e, TransferCancelled):
+                    print(indent(str(e), '    '))
+                else:
+                    self.show_error(str(e))
+                return fallback() if callable(fallback) else fallback
+        return wrapper
+    return decorator
+
+
+def succeeds(func):
+    '''Adapt an operation with no result to return True on success'''
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        func(*args, **kwargs)
+        return True
+    return wrapper
+
+
+class GuiFTP(zFTP):
+    '''zFTP session owned by the GUI. Errors are reported through dialogs and
+    operations return empty/False results instead of raising.'''
+
+    def __init__(self, root):
+        super().__init__(debuglevel=2, cache=root.cache, recorder=root.recorder)
+        self.root = root
+        self.prefetcher = Prefetcher(self, sessions=1, max_volume=constants.PREFETCH_MAX_ENTRIES)
+        self.pool: SessionPool = None
+
+    list_datasets = reports(list)(zFTP.list_datasets)
+    get_members = reports(Members, quiet=True)(zFTP.get_members)
+    retrieve = reports(None)(zFTP.retrieve)
+    download = reports(None)(zFTP.download)
+    mkdir = reports(False)(succeeds(zFTP.mkdir))
+    upload = reports(False)(succeeds(zFTP.upload))
+    delete = reports(False)(succeeds(zFTP.delete))
+    list_jobs = reports(list)(zFTP.list_jobs)
+    list_spools = reports(list)(zFTP.list_spools)
+    download_spool = reports(None)(zFTP.download_spool)
+
+    def search_pool(self) -> SessionPool:
+        '''Spare sessions for running several searches on this host at once, opened on first use'''
+        if self.pool is None:
+            self.pool = SessionPool(self, constants.SEARCH_SESSIONS)
+        return self.pool
+
+    def quit(self):
+        self.prefetcher.close()
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+        super().quit()
+
+    @reports(False)
+    def submit_job(self, dataset: Dataset, data: Source = None):
+        submission = super().submit_job(dataset, data)
+        self.show_response(submission)
+        return True
+
+    def operator_command_prompt(self):
+        def _submit_command():
+            try:
+                submission = self.operator_command(
+                    dpg.get_value('operator_command_input'),
+                    name=dpg.get_value('operator_command_job_name'),
+                    params=dpg.get_value('operator_command_job_params'),
+                )
+            except zFTPError as e:
+                dpg.delete_item('operator_command_prompt')
+                self.show_error(f'Error submitting operator command:\n{e}')
+                return
+            dpg.delete_item('operator_command_prompt')
+            self.show_response(submission)
+
+        w, h = 420, 150
+        with dialog(tag='operator_command_prompt', label='Operator Command', width=w, height=h, modal=False):
+            dpg.add_input_text(label='Command', tag='operator_command_input', hint='S <JOBNAME>',
+                               on_enter=True, callback=_submit_command)
+            dpg.add_spacer(height=5)
+
+            with dpg.collapsing_header(label="Advanced"):
+                dpg.add_input_text(label='Job Name', tag='operator_command_job_name', default_value='ZEDITOPR')
+                dpg.add_input_text(label='Job Card Params', tag='operator_command_job_params',
+                                   default_value='CLASS=A,MSGCLASS=X,MSGLEVEL=(1,1),NOTIFY=&SYSUID')
+
+            dpg.add_button(label='Submit', callback=_submit_command)
+
+    # === Dialogs ===
+    def show_error(self, message):
+        print(indent(message, '    '))
+        print(format_exc())
+        with dialog(label='FTP Error', tag='error', autosize=True):
+            dpg.add_text(message, color=(255, 0, 0))
+
+    def show_response(self, submission):
+        with dialog(label='FTP Response', tag='ftp_response', width=300, height=150):
+            dpg.add_text(submission.response)
+            if submission.job_id:
+                dpg.add_button(label=f'Open Job {submission.job_id}',
+                               width=-1,
+                               callback=self._open_job_by_id,
+                               user_data=submission.job_id)
+        print(submission.response)
+
+    def _open_job_by_id(self, sender, data, id):
+        dpg.delete_item('ftp_response')
+        jobs = self.list_jobs(id=id)
+        if jobs:
+            self.root.editor.open_job(jobs[0])
@@ -0,0 +1,177 @@
+import mmap
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from pathlib import Path
+from dearpygui import dearpygui as dpg
+
+
+class MappedText:
+    '''Read-only, memory-mapped text file with an index of line start offsets.
+    Only the lines asked for are ever decoded into Python strings.'''
+
+    CHUNK = 16 * 1024 * 1024  # Bytes indexed per pass
+
+    def __init__(self, path: Path, encoding: str = 'utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self.file = path.open('rb')
+        size = path.stat().st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.offsets = array('q', [0])
+        self.longest = 0
+        self._index(size)
+
+    def _index(self, size: int):
+        data = self.data
+        pos = 0
+        while pos < size:
+            # Index whole lines only, so no line is split between passes
+            if size - pos <= self.CHUNK:
+                end = size
+            else:
+                end = data.rfind(b'\n', pos, pos + self.CHUNK) + 1
+                if end <= pos:  # A single line longer than CHUNK
+                    end = data.find(b'\n', pos + self.CHUNK) + 1 or size
+            lines = data[pos:end].split(b'\n')
+            if not lines[-1]:
+                lines.pop()
+            ends = accumulate((len(line) + 1 for line in lines), initial=pos)
+            next(ends)
+            self.offsets.extend(ends)
+            self.longest = max(self.longest, max(map(len, lines), default=0))
+            pos = end
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lines(self, start: int, stop: int) -> str:
+        '''Text of lines [start, stop)'''
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return ''
+        text = self.data[self.offsets[start]:self.offsets[stop]].decode(self.encoding, errors='replace')
+        return text[:-1] if text.endswith('\n') else text
+
+    def find(self, text: str, line: int = 0) -> int:
+        '''Index of the first line at or after `line` containing `text`, or None'''
+        if not text or line >= len(self):
+            return None
+        pos = self.data.find(text.encode(self.encoding), self.offsets[max(line, 0)])
+        if pos < 0:
+            return None
+        return bisect_right(self.offsets, pos) - 1
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+class SpoolViewer:
+    '''Paged read-only view of a downloaded spool file.
+
+    The file is memory-mapped and only the lines around the scroll position are
+    put in the text widget; spacers above and below it stand in for the rest, so
+    the scrollbar covers the whole file. Line height and character width are
+    measured once, the widget is re-filled only when the visible lines leave the
+    rendered page.'''
+
+    OVERSCAN = 1.0  # Extra pages rendered above and below the visible one
+
+    def __init__(self, path: Path, parent: int):
+        self.text = MappedText(path)
+        self.parent = parent
+        self.start = self.stop = 0
+        self.match: int = None
+
+        # Text metrics, measured once; the default font is monospace
+        line = dpg.get_text_size('A') or (7, 13)
+        lines = dpg.get_text_size('A\nA') or (7, 26)
+        self.line_height = max(lines[1] - line[1], 1)
+        self.char_width = (dpg.get_text_size('A' * 10) or (70, 13))[0] / 10
+        self.content_width = self.text.longest * self.char_width + 20
+
+        with dpg.group(horizontal=True, parent=parent):
+            self.line_input = dpg.add_input_int(label='Line', width=120, min_value=1, min_clamped=True,
+                                                step=0, on_enter=True, callback=self.jump_to_input)
+            self.find_input = dpg.add_input_text(hint='Find', width=200, on_enter=True, callback=self.find_next)
+            dpg.add_button(label='Next', callback=self.find_next)
+            self.status = dpg.add_text(f'{len(self.text)} lines')
+
+        with dpg.child_window(parent=parent, horizontal_scrollbar=True, border=False) as self.window:
+            self.top = dpg.add_spacer(height=0)
+            self.view = dpg.add_input_text(multiline=True, readonly=True, width=self.content_width, height=0)
+            self.bottom = dpg.add_spacer(height=0)
+        dpg.bind_item_theme(self.window, 'spool_viewer_theme')
+        dpg.bind_item_theme(self.view, 'spool_input_theme')
+
+        with dpg.item_handler_registry() as reg:
+            dpg.add_item_visible_handler(callback=self.update)
+        dpg.bind_item_handler_registry(self.window, reg)
+        self.render(0)
+
+    @property
+    def rows(self) -> int:
+        '''Lines that fit in the window'''
+        return int(dpg.get_item_height(self.window) or dpg.get_viewport_height()) // self.line_height + 1
+
+    @property
+    def first(self) -> int:
+        '''First visible line'''
+        return int(dpg.get_y_scroll(self.window) // self.line_height)
+
+    def update(self, *args):
+        '''Re-render if the visible lines have scrolled out of the rendered page'''
+        first = self.first
+        if first < self.start or first + self.rows > self.stop:
+            self.render(first)
+
+    def render(self, first: int):
+        overscan = int(self.rows * self.OVERSCAN)
+        self.start = max(first - overscan, 0)
+        self.stop = min(first + self.rows + overscan, len(self.text))
+        dpg.configure_item(self.top, height=self.start * self.line_height)
+        dpg.set_value(self.view, self.text.lines(self.start, self.stop))
+        dpg.configure_item(self.view, height=(self.stop - self.start + 1) * self.line_height)
+        dpg.configure_item(self.bottom, height=(len(self.text) - self.stop) * self.line_height)
+
+    def resize(self, width: float):
+        w = min(self.content_width + 34, width - 15)
+        h = min((len(self.text) + 1) * self.line_height + 34, dpg.get_viewport_height() - 260)
+        dpg.configure_item(self.window, width=w, height=h)
+
+    def scroll(self) -> float:
+        return dpg.get_y_scroll(self.window)
+
+    def scroll_to(self, y: float):
+        dpg.set_y_scroll(self.window, y)
+        self.render(int(y // self.line_height))
+
+    def jump_to(self, line: int):
+        '''Scroll so that line (0-based) is at the top'''
+        line = min(max(line, 0), max(len(self.text) - 1, 0))
+        self.scroll_to(line * self.line_height)
+        dpg.set_value(self.line_input, line + 1)
+
+    def jump_to_input(self, *args):
+        self.jump_to(dpg.get_value(self.line_input) - 1)
+
+    def find_next(self, *args):
+        '''Jump to the next line containing the search text, wrapping around at the end'''
+        needle = dpg.get_value(self.find_input)
+        if not needle:
+            return
+        start = self.first if self.match is None else self.match + 1
+        line = self.text.find(needle, start)
+        if line is None and start:
+            line = self.text.find(needle, 0)
+        if line is None:
+            dpg.set_value(self.status, f"'{needle}' not found")
+            return
+        self.match = line
+        self.jump_to(line)
+        dpg.set_value(self.status, f'Found on line {line + 1} of {len(self.text)}')
+
+    def close(self):
+        self.text.close()
@@ -0,0 +1,108 @@
+import re
+from zosedit import constants
+from zosedit.index import wildcard
+from zosedit.models import Dataset, Job
+from zosedit.zftp import zFTP, zFTPError
+
+PARAMS = 'CLASS=A,MSGCLASS=X,MSGLEVEL=(1,1),NOTIFY=&SYSUID'
+MAX_NAME_LENGTH = 44  # Of a dataset name, without member
+
+
+def copy_jcl(source: Dataset, target: str, members: list[str] = None, move: bool = False,
+             replace: bool = False, allocate: bool = False, name: str = 'ZEDITCPY', params: str = PARAMS) -> str:
+    '''JCL copying `source` to `target` on the host.
+
+    A partitioned dataset, its `members` (all when None) or a single member is
+    copied with IEBCOPY into the partitioned dataset `target`; a single member
+    can be renamed by giving the target as DSN(NEWNAME). A sequential dataset is
+    copied with IEBGENER to a sequential dataset or member, as is a member copied
+    within its own library, which IEBCOPY would take for a compress. With `allocate` the
+    target is created like the source, with `move` the sources are deleted by a
+    last step that only runs when the copy ended with RC 0.'''
+    if members is not None and not members:
+        raise ValueError('No members to copy')
+    target_dsn, target_member = split_member(target)
+    if len(target_dsn) > MAX_NAME_LENGTH:
+        raise ValueError(f'{target_dsn} is longer than {MAX_NAME_LENGTH} characters')
+    if target_dsn == source.parent and not (source.member and target_member):
+        raise ValueError('Copy to another dataset, or to another member name in the same one')
+    if source.member:
+        members = [source.member]
+    disp = f'DISP=(NEW,CATLG,DELETE),\n//          LIKE={source.parent}' if allocate else 'DISP=SHR'
+    if (source.is_partitioned() or source.member) and target_dsn != source.parent:
+        if target_member and (not members or len(members) != 1):
+            raise ValueError('Only a single member can be copied to a member name')
+        if target_member and target_member != members[0]:
+            select = [f'  SELECT MEMBER=(({members[0]},{target_member}))']
+        else:
+            select = [f'  SELECT MEMBER={member}' for member in members or []]
+        jcl = constants.IEBCOPY_JCL.format(name=name.ljust(8), params=params, source=source.parent,
+                                           disp=disp, target=target_dsn, indd='((IN,R))' if replace else 'IN',
+                                           select='\n'.join(select))
+    else:
+        if not allocate and not target_member:
+            disp = 'DISP=OLD'
+        jcl = constants.IEBGENER_JCL.format(name=name.ljust(8), params=params, source=source.name,
+                                            disp=disp, target=target)
+    if move:
+        if members:
+            deletes = [f"  DELETE '{source.parent}({member})'" for member in members]
+        else:
+            deletes = [f"  DELETE '{source.parent}'"]
+        jcl += '\n' + constants.MOVE_DELETE_STEP.format(deletes='\n'.join(deletes))
+    return '\n'.join(line for line in jcl.splitlines() if line)
+
+
+def split_member(name: str) -> tuple[str, str]:
+    '''Split "DSN(MEMBER)" into ("DSN", "MEMBER"), stripping quotes'''
+    name = name.strip().strip("'").upper()
+    if match := re.fullmatch(r'(.+)\((.*)\)', name):
+        return match.group(1), match.group(2) or None
+    return name, None
+
+
+def copy_name(member: str) -> str:
+    '''A different name for a copy of `member` in its own library: @ in place of an
+    eighth character or after a shorter name, or # where that gives the same name'''
+    name = member[:7] + '@'
+    return name if name != member else member[:7] + '#'
+
+
+def copy_dataset_name(name: str) -> str:
+    '''A name for a copy of dataset `name`: with a COPY qualifier added, or in place
+    of the last qualifier (cut short, or @ or # when that gives the same name) where
+    adding one would go past 44 characters'''
+    if len(name) + 5 <= MAX_NAME_LENGTH:
+        return f'{name}.COPY'
+    parent, last = name.rsplit('.', 1)
+    room = MAX_NAME_LENGTH - len(parent) - 1
+    return f'{parent}.' + next(qualifier for qualifier in ('COPY'[:room], '@', '#') if qualifier != last)
+
+
+def select_members(zftp: zFTP, source: Dataset, patterns: list[str]) -> list[str]:
+    '''Members of a partitioned dataset matching any of the patterns (* and %),
+    from its member listing, so only names cross the network'''
+    regexes = [re.compile(wildcard(pattern.upper())) for pattern in patterns]
+    return [member for member in zftp.get_members(source) if any(regex.match(member) for regex in regexes)]
+
+
+def copy_on_host(zftp: zFTP, source: Dataset, target: str, members: list[str] = None, move: bool = False,
+                 replace: bool = False, interval: float = 2, timeout: float = None) -> Job:
+    '''Copy or move on the host in one job and wait for it; the target dataset is
+    allocated like the source when it doesn't exist. Raises zFTPError when the
+    job doesn't end with RC 0, which leaves the sources of a move in place.'''
+    target_dsn, _ = split_member(target)
+    exists = any(dataset.name == target_dsn for dataset in zftp.list_datasets(f"'{target_dsn}'"))
+    if not exists and split_member(target)[1] and not (source.member or source.is_partitioned()):
+        raise zFTPError(f'{target_dsn} does not exist, copy to a new sequential dataset or an existing PDS')
+    try:
+        jcl = copy_jcl(source, target, members, move, replace, allocate=not exists)
+    except ValueError as e:
+        raise zFTPError(str(e))
+    submission = zftp.submit_jcl(jcl, 'ZEDITCPY')
+    if not submission.job_id:
+        raise zFTPError(f'Copy job was not submitted: {submission}')
+    job = zftp.wait_for_job(submission.job_id, interval, timeout)
+    if job.rc != 0:
+        raise zFTPError(f'{"Move" if move else "Copy"} job {job.id} ended with RC {job.rc}, see its output')
+    return job
@@ -0,0 +1,195 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from operator import itemgetter
+from zosedit.models import Dataset, Job, Members
+
+
+class ResultIndex:
+    '''In-memory index over listed results, for filtering them as the user types.
+
+    Every entry is filed under a row, any hashable the caller uses to find it
+    again (the GUI uses table row ids). Full names and their qualifiers are kept
+    in sorted arrays, so a prefix is found by bisection instead of a scan, and
+    attribute values map to sets of rows. Entries added since the last query are
+    merged in by the next one.'''
+
+    ALIASES = {'recfm': 'recformat', 'dsorg': 'type', 'vol': 'volume', 'id': 'user'}
+
+    def __init__(self):
+        self.rows: set = set()
+        self.names: list[str] = []
+        self.name_rows: list = []
+        self.qualifiers: list[str] = []
+        self.qualifier_rows: list = []
+        self.attributes: dict[str, dict[str, set]] = {}
+        self.pending_names: list[tuple] = []
+        self.pending_qualifiers: list[tuple] = []
+        self.removed = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, row, names: list[str], attributes: dict[str, object] = None):
+        '''File `row` under each of `names` (and their qualifiers) and the given attribute values'''
+        self.rows.add(row)
+        for name in names:
+            if not name:
+                continue
+            name = name.upper()
+            self.pending_names.append((name, row))
+            self.pending_qualifiers.extend((qualifier, row) for qualifier in qualifiers(name))
+        for attribute, value in (attributes or {}).items():
+            if value is not None:
+                self.attributes.setdefault(attribute, {}).setdefault(str(value).upper(), set()).add(row)
+
+    def remove(self, rows):
+        '''Drop rows; their names are left in the arrays and skipped until the next compaction'''
+        for row in rows:
+            if row in self.rows:
+                self.rows.discard(row)
+                self.removed += 1
+        for values in self.attributes.values():
+            for matched in values.values():
+                matched.difference_update(rows)
+        if self.removed > len(self.rows):
+            self._compact()
+
+    def clear(self):
+        self.__init__()
+
+    def filter(self, text: str) -> set:
+        '''Rows matching every term of the filter text, or None for an empty filter.
+        See `parse_filter` for the syntax.'''
+        terms = parse_filter(text)
+        if not terms:
+            return None
+        self._merge()
+        result = None
+        for attribute, value in terms:
+            if attribute is None:
+                rows = self._match_name(value)
+            else:
+                rows = self._match_attribute(attribute, value)
+            result = rows if result is None else result & rows
+            if not result:
+                return set()
+        return result & self.rows
+
+    def _match_name(self, term: str) -> set:
+        if '*' in term or '%' in term:
+            # Wildcards: bisect to the literal prefix, then match what is left
+            prefix = re.split(r'[*%]', term, 1)[0]
+            lo, hi = prefix_range(self.names, prefix)
+            pattern = re.compile(wildcard(term))
+            return {self.name_rows[i] for i in range(lo, hi) if pattern.match(self.names[i])}
+        if '.' in term or '(' in term:
+            lo, hi = prefix_range(self.names, term)
+            return set(self.name_rows[lo:hi])
+        lo, hi = prefix_range(self.qualifiers, term)
+        return set(self.qualifier_rows[lo:hi])
+
+    def _match_attribute(self, attribute: str, value: str) -> set:
+        values = self.attributes.get(self.ALIASES.get(attribute, attribute), {})
+        rows = set()
+        for candidate, matched in values.items():
+            if candidate.startswith(value):
+                rows |= matched
+        return rows
+
+    def _merge(self):
+        if self.pending_names:
+            self.names, self.name_rows = merge(self.names, self.name_rows, self.pending_names)
+            self.pending_names = []
+        if self.pending_qualifiers:
+            self.qualifiers, self.qualifier_rows = merge(self.qualifiers, self.qualifier_rows, self.pending_qualifiers)
+            self.pending_qualifiers = []
+
+    def _compact(self):
+        self._merge()
+        live = self.rows
+        for keys, rows in (('names', 'name_rows'), ('qualifiers', 'qualifier_rows')):
+            pairs = [(key, row) for key, row in zip(getattr(self, keys), getattr(self, rows)) if row in live]
+            setattr(self, keys, [key for key, _ in pairs])
+            setattr(self, rows, [row for _, row in pairs])
+        self.removed = 0
+
+
+def merge(keys: list[str], rows: list, pending: list[tuple]) -> tuple[list[str], list]:
+    '''Merge (key, row) pairs into the sorted parallel arrays'''
+    if len(pending) * 16 < len(keys):
+        # A few new entries, e.g. a streamed batch: insert each in place
+        for key, row in pending:
+            i = bisect_right(keys, key)
+            keys.insert(i, key)
+            rows.insert(i, row)
+        return keys, rows
+    pairs = sorted(chain(zip(keys, rows), pending), key=itemgetter(0))
+    return [key for key, _ in pairs], [row for _, row in pairs]
+
+
+def prefix_range(keys: list[str], prefix: str) -> tuple[int, int]:
+    lo = bisect_left(keys, prefix)
+    return lo, bisect_left(keys, prefix + '\uffff', lo)
+
+
+def qualifiers(name: str) -> list[str]:
+    if '(' in name:
+        name = name.replace('(', '.').replace(')', '')
+    return name.split('.')
+
+
+def wildcard(term: str) -> str:
+    '''Regex for a filter term with z/OS style wildcards: * for any characters, % for one'''
+    return ''.join('.*' if c == '*' else '.' if c == '%' else re.escape(c) for c in term) + '$'
+
+
+def parse_filter(text: str) -> list[tuple[str, str]]:
+    '''Split filter text into (attribute, value) terms, all of which must match.
+
+    A plain term matches the start of any qualifier of a name (SRC matches
+    USER.SRC.COBOL), a term with a dot or parenthesis the start of the full
+    name, and * or % make it a wildcard match of the full name. `attribute:value`
+    matches the start of an attribute, e.g. recfm:FB, dsorg:PO, vol:VOL0, rc:0000,
+    or of a member's ISPF statistics, e.g. changed:2024/02, user:IBMUSER.'''
+    terms = []
+    for term in text.upper().split():
+        attribute, sep, value = term.partition(':')
+        if sep:
+            if value:
+                terms.append((attribute.lower(), value))
+        else:
+            terms.append((None, term))
+    return terms
+
+
+def name_prefix(text: str) -> str:
+    '''The full name prefix a filter narrows to, if it has one (USER.SRC in "USER.SRC recfm:FB")'''
+    for attribute, value in parse_filter(text):
+        if attribute is None and '.' in value:
+            return re.split(r'[*%(]', value, 1)[0]
+    return None
+
+
+def covers(pattern: str, prefix: str) -> bool:
+    '''Whether a catalog search pattern lists every dataset whose name starts with `prefix`'''
+    pattern = pattern.strip("'").upper()
+    return pattern.endswith('*') and re.match(wildcard(pattern), prefix.upper()) is not None
+
+
+def dataset_terms(dataset: Dataset) -> tuple[list[str], dict]:
+    '''Names and attributes a dataset or member row is indexed under'''
+    names = [dataset.name, dataset.member] if dataset.member else [dataset.name]
+    return names, {'recformat': dataset.recformat, 'type': dataset.type, 'volume': dataset.volume}
+
+
+def member_terms(member: Dataset, members: Members, i: int) -> tuple[list[str], dict]:
+    '''Names and attributes a member row is indexed under, with its ISPF statistics'''
+    names, attributes = dataset_terms(member)
+    attributes.update(changed=members.changed[i] or None, user=members.user[i] or None)
+    return names, attributes
+
+
+def job_terms(job: Job) -> tuple[list[str], dict]:
+    '''Names and attributes a job row is indexed under'''
+    return [job.name, job.id, job.owner], {'rc': job.rc, 'status': job.status, 'owner': job.owner}
@@ -3,10 +3,17 @@ import zosedit.gui.explorer as explorer
 import zosedit.gui.editor as editor
 from zosedit.gui.dialog import dialog
 
+from zosedit import constants
 from zosedit.constants import tempdir
-from zosedit.zftp import zFTP
+from zosedit.gui.session import GuiFTP
+from zosedit.gui.scheduler import FrameScheduler
+from zosedit.gui.overlay import ProgressOverlay
+from zosedit.gui.profiler import FrameProfiler
+from zosedit.cache import MetadataCache
+from zosedit.trace import TraceRecorder
 
 import platform
+from time import time
 
 if platform.system() == 'Windows':
     from os import startfile
@@ -18,7 +25,15 @@ class Root:
         self.zftp = None
         self.explorer = explorer.Explorer(self)
         self.editor = editor.Editor(self)
-        self.zftp = zFTP(self)
+        self.cache = MetadataCache()
+        self.recorder = TraceRecorder(constants.RECORD) if constants.RECORD else None
+        self.zftp = GuiFTP(self)  # Primary session, used for anything not tied to a host
+        self.sessions: dict[str, GuiFTP] = {}  # Connected sessions by host
+        self.excluded: set[str] = set()  # Hosts left out of searches
+        self.scheduler = FrameScheduler()
+        self.progress = ProgressOverlay()
+        self.profiler = FrameProfiler() if constants.PROFILE else None
+        self.scheduler.profiler = self.profiler
 
     def start(self):
         dpg.create_context()
@@ -32,16 +47,28 @@ class Root:
                     if platform.system() == 'Windows':
                         dpg.add_menu_item(label="Open Data Directory", callback=self.open_data_directory)
                 with dpg.menu(label="Run", tag='run_menu'):
-                    dpg.add_menu_item(label="Command", shortcut="F1", callback=self.zftp.operator_command_prompt)
+                    dpg.add_menu_item(label="Command", shortcut="F1", callback=lambda: self.zftp.operator_command_prompt())
+                    dpg.add_menu_item(label="Search on Host...", callback=lambda: self.explorer.host_search_prompt())
                     # dpg.add_menu_item(label="Submit", shortcut="F5", callback=self.editor.submit_open_file)
                 with dpg.menu(label="Session", tag='session_menu'):
                     dpg.add_menu_item(label="Login", callback=self.login)
                     dpg.add_menu_item(label="Logout", callback=self.logout)
-                # with dpg.menu(label='Settings'):
+                    dpg.add_menu(label="Hosts", tag='hosts_menu')
+                    dpg.add_separator()
+                    dpg.add_menu_item(label="Clear Host Cache", callback=self.clear_cache)
+                    dpg.add_menu_item(label="Clear All Caches", callback=lambda: self.cache.purge())
+                dpg.add_menu(label='Searches', tag='searches_menu')
+                with dpg.menu(label='Settings'):
+                    dpg.add_menu_item(label='Prefetch Members', check=True,
+                                      default_value=self.explorer.prefetch_members,
+                                      callback=lambda s, value: setattr(self.explorer, 'prefetch_members', value))
+                    dpg.add_menu_item(label='Prefetch Job Output', check=True,
+                                      default_value=self.explorer.prefetch_spools,
+                                      callback=lambda s, value: setattr(self.explorer, 'prefetch_spools', value))
                 #     dpg.add_menu_item(label='Show Style Editor', callback=dpg.show_style_editor)
 
             with dpg.handler_registry():
-                dpg.add_key_press_handler(dpg.mvKey_F1, callback=self.zftp.operator_command_prompt)
+                dpg.add_key_press_handler(dpg.mvKey_F1, callback=lambda: self.zftp.operator_command_prompt())
 
             with dpg.group(horizontal=True):
                 with dpg.child_window(label="Explorer", width=375, height=-1, tag='win_explorer', border=False):
@@ -51,41 +78,96 @@ class Root:
                                     width=-1, height=-1, horizontal_scrollbar=True):
                     self.editor.build()
 
+        self.scheduler.build()
+        self.progress.build()
+        if self.profiler:
+            self.profiler.build()
+        self.build_hosts_menu()
+        self.explorer.build_searches_menu()
         self.login()
 
         dpg.set_primary_window(main, True)
         dpg.setup_dearpygui()
         dpg.show_viewport()
 
+        profiler = self.profiler
         while dpg.is_dearpygui_running():
-            if self.zftp.waiting:
-                self.waiting_animation()
-            elif dpg.does_item_exist('overlay'):
-                dpg.delete_item('overlay')
+            frame_start = time()
+            if profiler:
+                profiler.run_callbacks()
+            self.scheduler.run_pending()
+            session = self.busy_session()
+            self.progress.update(session)
+            render_start = time()
             dpg.render_dearpygui_frame()
+            if profiler:
+                profiler.end_frame(frame_start, render_start)
+            self.scheduler.throttle(frame_start, busy=session.waiting)
+        if profiler:
+            profiler.dump()
+        if self.recorder:
+            self.recorder.close()
+        self.scheduler.shutdown()
+        for session in self.sessions.values():
+            session.prefetcher.close()
+            if session.pool:
+                session.pool.close()
         dpg.destroy_context()
 
-    def waiting_animation(self):
-        if not dpg.does_item_exist('overlay'):
-            dpg.add_viewport_drawlist(tag='overlay')
-
-        width = 100
-        margin = 30
-        xmin = dpg.get_viewport_width() - width - margin
-        xmax = dpg.get_viewport_width() - margin
-        y = 10
-        dpg.draw_line((xmin, y), (xmax, y), color=(37, 37, 38), parent='overlay')
-        x1 = ((dpg.get_frame_count() - self.zftp.wait_start)) % width
-        x2 = ((dpg.get_frame_count() - self.zftp.wait_start) + 10) % width
-        if (x2 < x1):
-            x2 = xmax - xmin
-        # dpg.draw_text((x, 15), '...', parent='overlay')
-        dpg.draw_line((x1 + xmin, y), (x2 + xmin, y), parent='overlay')
+    # Sessions
+    @property
+    def multi_host(self) -> bool:
+        return len(self.sessions) > 1
+
+    def session_for(self, item=None) -> GuiFTP:
+        '''The session a dataset or job was listed on, or the primary one'''
+        return self.sessions.get(getattr(item, 'host', None), self.zftp)
+
+    def search_sessions(self) -> list[GuiFTP]:
+        '''Sessions that searches fan out to'''
+        sessions = [session for host, session in self.sessions.items() if host not in self.excluded]
+        return sessions or [self.zftp]
+
+    def busy_session(self) -> GuiFTP:
+        return next((session for session in self.sessions.values() if session.waiting), self.zftp)
+
+    def build_hosts_menu(self):
+        for child in dpg.get_item_children('hosts_menu')[1]:
+            dpg.delete_item(child)
+        if not self.sessions:
+            dpg.add_menu_item(label='Not connected', enabled=False, parent='hosts_menu')
+        for host in self.sessions:
+            with dpg.menu(label=host, parent='hosts_menu'):
+                dpg.add_menu_item(label='Include in Searches', check=True, default_value=host not in self.excluded,
+                                  callback=self.include_host, user_data=host)
+                dpg.add_menu_item(label='Disconnect', callback=lambda s, d, host: self.disconnect(host), user_data=host)
+        self.editor.tag_tabs(self.multi_host)
+
+    def include_host(self, sender, included, host):
+        if included:
+            self.excluded.discard(host)
+        else:
+            self.excluded.add(host)
+
+    def disconnect(self, host: str):
+        session = self.sessions.pop(host, None)
+        if not session:
+            return
+        session.quit()
+        self.excluded.discard(host)
+        if session is self.zftp and self.sessions:
+            self.zftp = next(iter(self.sessions.values()))
+        self.build_hosts_menu()
 
     def logout(self):
-        self.zftp.quit()
+        for session in self.sessions.values():
+            session.quit()
+        self.sessions = {}
+        self.excluded = set()
         self.explorer.reset()
         self.editor.reset()
+        self.build_hosts_menu()
+        self.explorer.build_searches_menu()
         self.login()
 
     def login(self):
@@ -93,16 +175,23 @@ class Root:
             host = dpg.get_value('settings_host_input')
             username = dpg.get_value('settings_username_input')
             password = dpg.get_value('settings_password_input')
-            if self.zftp:
+
+            # Logging in to another host adds a session alongside the existing ones
+            session = self.sessions.get(host) or (GuiFTP(self) if self.sessions else self.zftp)
+            if session.ftp:
                 dpg.set_value('login_status', 'Closing existing connection...')
-                self.zftp.quit()
+                session.quit()
 
             dpg.set_value('login_status', f'Connecting to {host}...')
             try:
-                self.zftp.connect(host, username, password)
+                session.connect(host, username, password)
             except Exception as e:
                 dpg.set_value('login_status', f'Error connecting: {e}')
                 return
+            if not self.sessions:
+                self.zftp = session
+            self.sessions[host] = session
+            self.build_hosts_menu()
 
             dpg.delete_item('login_dialog')
             dpg.set_value('explorer_dataset_input', username)
@@ -122,6 +211,10 @@ class Root:
             dpg.add_text('', tag='login_status')
             dpg.focus_item('settings_username_input')
 
+    def clear_cache(self):
+        for host in self.sessions:
+            self.cache.purge(host)
+
     def open_data_directory(self):
         startfile(tempdir)
 
@@ -1,9 +1,11 @@
 import re
+from array import array
 from pathlib import Path
 
 
 class Dataset:
     cols = 'volume', 'unit', 'date', 'ext', 'used', 'recformat', 'reclength', 'block_size', 'type', 'name'
+    TRACK_SIZE = {'3390': 56664, '3380': 47476}
 
     def parse(string: str, member: str = None) -> 'Dataset':
         '''Parse an FTP list entry string into a Dataset object'''
@@ -39,7 +41,8 @@ class Dataset:
                  used: str = None,
                  volume: str = None,
                  new: bool = False,
-                 local_path: Path = None):
+                 local_path: Path = None,
+                 host: str = None):
 
         self.name = f'{name}({member})' if member else name
         self.member = member
@@ -56,6 +59,7 @@ class Dataset:
         self.new = new
         self.parent: str = name
         self.local_path: Path = local_path
+        self.host: str = host  # Host the dataset was listed on, None for the primary session
         self._populated = False
 
     def properties(self) -> dict:
@@ -65,6 +69,16 @@ class Dataset:
     def is_partitioned(self):
         return self.type == 'PO'
 
+    def is_unix(self):
+        '''Whether this is a z/OS UNIX file, named by its absolute path'''
+        return bool(self.name) and self.name.startswith('/')
+
+    def estimated_size(self) -> float:
+        '''Rough upper bound of the transfer size from the allocated tracks, None if unknown'''
+        if self.member or not str(self.used or '').isdecimal():
+            return None
+        return int(self.used) * self.TRACK_SIZE.get(str(self.unit), self.TRACK_SIZE['3390'])
+
     def __repr__(self):
         attrs = ', '.join(f"{key}={val}" for key, val in self.properties().items())
         return f"Dataset({attrs})"
@@ -75,10 +89,74 @@ class Dataset:
     def __call__(self, member: str) -> 'Dataset':
         if not member:
             return self
-        dataset = Dataset(member=member, **self.properties())
+        dataset = Dataset(member=member, host=self.host, **self.properties())
         return dataset
 
 
+class Members(list):
+    '''Member names of a partitioned dataset, in listing order, with their ISPF
+    statistics held in parallel columns rather than an object per member, so
+    libraries of tens of thousands of members sort and compare cheaply.
+    Members without statistics (or load modules) have '' and -1 in the columns.
+    The columns are not kept in step with list mutations; treat it as read-only.'''
+
+    COLUMNS = 'name', 'version', 'created', 'changed', 'size', 'user'
+
+    def __init__(self, names=()):
+        super().__init__(names)
+        count = len(self)
+        self.version: list[str] = [''] * count
+        self.created: list[str] = [''] * count
+        self.changed: list[str] = [''] * count  # yyyy/mm/dd hh:mm, which sorts as text
+        self.size = array('l', [-1]) * count  # Lines
+        self.user: list[str] = [''] * count
+        self._orders: dict[str, list[int]] = {}
+
+    @classmethod
+    def parse(cls, lines: list[str]) -> 'Members':
+        '''Parse a member listing; the first line is the column header'''
+        rows = [line.split() for line in lines[1:] if line.strip()]
+        members = cls(row[0] for row in rows)
+        # Name VV.MM Created Changed(date time) Size Init Mod Id
+        for i, row in enumerate(rows):
+            if len(row) == 9 and '.' in row[1] and row[5].isdecimal():
+                members.version[i] = row[1]
+                members.created[i] = row[2]
+                members.changed[i] = f'{row[3]} {row[4]}'
+                members.size[i] = int(row[5])
+                members.user[i] = row[8]
+        return members
+
+    def column(self, name: str):
+        return self if name == 'name' else getattr(self, name)
+
+    def order(self, column: str = 'name', descending: bool = False) -> list[int]:
+        '''Positions of the members sorted by a column; ties keep name order'''
+        key = column, descending
+        if key not in self._orders:
+            if column == 'name':
+                positions = range(len(self))  # Listings come sorted by name
+                self._orders[key] = list(reversed(positions) if descending else positions)
+            else:
+                values = self.column(column)
+                self._orders[key] = sorted(range(len(self)), key=values.__getitem__, reverse=descending)
+        return self._orders[key]
+
+    def stats(self, i: int) -> dict:
+        return {column: self.column(column)[i] for column in self.COLUMNS}
+
+    def fingerprint(self, i: int) -> str:
+        '''Changes whenever ISPF statistics record a save of the member; None without statistics'''
+        if not self.changed[i]:
+            return None
+        return f'{self.version[i]} {self.changed[i]} {self.size[i]}'
+
+    def fingerprints(self) -> dict[str, str]:
+        '''Member name -> fingerprint, for telling which members changed between two listings'''
+        return dict(zip(self, [f'{version} {changed} {size}' if changed else None
+                               for version, changed, size in zip(self.version, self.changed, self.size)]))
+
+
 class Job:
     cols = 'name', 'id', 'owner', 'status', 'class', 'rc', 'spool_count'
 
@@ -92,6 +170,7 @@ class Job:
         self.class_: str = None
         self.rc: int = None
         self.spool_count: int = None
+        self.host: str = None  # Host the job was listed on
         try:
             weirdness = re.search(r'\(([^)]*)\)', string)
             if weirdness:
@@ -170,3 +249,59 @@ class Spool:
 
     def __str__(self):
         return ', '.join(f"{col}={getattr(self, col)}" for col in self.cols)
+
+
+class UnixFile:
+    '''An entry of a z/OS UNIX directory listing, which is in `ls -l` format'''
+
+    pattern = re.compile(r'([-dlpscb])(\S{9})\S*\s+(\d+)\s+(\S+)\s+(\S+)\s+(\d+)\s+'
+                         r'(\w{3}\s+\d+\s+[\d:]+)\s(.+)')
+
+    def __init__(self, string: str, directory: str):
+        self.string = string
+        self.directory = directory.rstrip('/') or '/'
+
+        self.type: str = None
+        self.permissions: str = None
+        self.links: int = None
+        self.owner: str = None
+        self.group: str = None
+        self.size: int = None
+        self.mtime: str = None
+        self.name: str = None
+        self.target: str = None  # Where a symbolic link points
+        match = self.pattern.match(string)
+        if not match:
+            return
+        self.type, self.permissions, links, self.owner, self.group, size, mtime, self.name = match.groups()
+        self.links, self.size, self.mtime = int(links), int(size), ' '.join(mtime.split())
+        if self.type == 'l' and ' -> ' in self.name:
+            self.name, self.target = self.name.split(' -> ', 1)
+
+    @property
+    def path(self) -> str:
+        return f"{self.directory.rstrip('/')}/{self.name}"
+
+    def is_dir(self):
+        return self.type == 'd'
+
+    def __repr__(self):
+        return f"UnixFile({self.path}, type={self.type}, size={self.size}, mtime={self.mtime})"
+
+    def __str__(self):
+        return self.path
+
+
+class Submission:
+    '''The server's response to a job submitted through FILETYPE=JES'''
+
+    def __init__(self, response: str):
+        self.response = response
+        match = re.search(r'(J\d+|JOB\d+)', response)
+        self.job_id: str = match.group(0) if match else None
+
+    def __repr__(self):
+        return f"Submission(job_id={self.job_id}, response={self.response!r})"
+
+    def __str__(self):
+        return self.response
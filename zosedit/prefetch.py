@@ -0,0 +1,89 @@
+from concurrent.futures import Future, CancelledError
+from threading import Lock
+from time import sleep
+from zosedit.models import Job, Spool
+from zosedit.zftp import zFTP, SessionPool
+
+
+class Prefetcher:
+    '''Speculatively runs low priority fetches over spare sessions so results are
+    ready before the user asks for them.
+
+    Work never runs while the primary session is busy with a user request, and
+    `take` cancels queued work the user asks for directly. Concurrency is bounded
+    by the number of spare sessions and volume by `max_volume`, measured in
+    whatever units `size` reports for a result (entries, bytes, ...).'''
+
+    def __init__(self, zftp: zFTP, sessions: int = 1, max_volume: int = 20000):
+        self.zftp = zftp
+        self.sessions = sessions
+        self.max_volume = max_volume
+        self.sizes = {}
+        self.pool: SessionPool = None
+        self.futures: dict[object, Future] = {}
+        self.lock = Lock()
+
+    def schedule(self, key, func, *args, size=len) -> bool:
+        '''Queue func(session, *args) under `key`. Returns False if the volume limit was reached.'''
+        with self.lock:
+            if key in self.futures:
+                return True
+            if sum(self.sizes.values()) >= self.max_volume:
+                return False
+            if self.pool is None:
+                self.pool = SessionPool(self.zftp, self.sessions)
+            self.futures[key] = self.pool.submit(self._run, key, func, args, size)
+        return True
+
+    def _run(self, session: zFTP, key, func, args, size):
+        # Yield to user initiated requests on the primary session
+        while self.zftp.waiting:
+            sleep(0.05)
+        result = func(session, *args)
+        with self.lock:
+            if key in self.futures:
+                self.sizes[key] = size(result)
+        return result
+
+    def take(self, key, wait: bool = True):
+        '''Return the prefetched result for `key`, waiting if it is already in flight.
+        Returns None if it was never scheduled, was still queued, or failed, and
+        without `wait` also if it hadn't finished; its result is then dropped.'''
+        with self.lock:
+            future = self.futures.pop(key, None)
+            self.sizes.pop(key, None)
+        if future is None or future.cancel() or not (wait or future.done()):
+            return None
+        try:
+            result = future.result()
+        except (CancelledError, Exception) as e:
+            print(f'Prefetch of {key} failed: {e}')
+            return None
+        return result
+
+    def clear(self, kind: str = None):
+        '''Drop queued work and held results, e.g. when a new search replaces the old one.
+        With `kind`, only keys of the form (kind, ...) are dropped.'''
+        with self.lock:
+            keys = [key for key in self.futures if kind is None or key[0] == kind]
+            futures = [self.futures.pop(key) for key in keys]
+            for key in keys:
+                self.sizes.pop(key, None)
+        for future in futures:
+            future.cancel()
+
+    def close(self):
+        '''Drop everything and disconnect the spare sessions'''
+        self.clear()
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+
+
+def fetch_spools(session: zFTP, job: Job, max_bytes: int) -> list[Spool]:
+    '''List a job's spools and download the ones no larger than `max_bytes`'''
+    spools = session.list_spools(job)
+    for spool in spools:
+        if spool.byte_count is not None and spool.byte_count <= max_bytes:
+            session.download_spool(spool)
+    return spools
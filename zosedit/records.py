@@ -0,0 +1,60 @@
+'''Conversion between editor text and blocks of EBCDIC records for binary uploads.
+
+Whole blocks are converted at once: the text goes through the codec in one call,
+and records are cut and padded with split/join and ljust on bytes.'''
+from zosedit.models import Dataset
+
+EBCDIC = 'cp1047'
+
+
+class RecordLengthError(ValueError):
+    '''Lines that don't fit in the record length; `lines` are 1-based line numbers'''
+
+    def __init__(self, lines: list[int], limit: int):
+        self.lines = lines
+        self.limit = limit
+        shown = ', '.join(map(str, lines[:10])) + (f' and {len(lines) - 10} more' if len(lines) > 10 else '')
+        super().__init__(f'{"Line" if len(lines) == 1 else "Lines"} {shown} {"is" if len(lines) == 1 else "are"} '
+                         f'longer than the record length of {limit} and would be truncated')
+
+
+def codec(encoding: str) -> str:
+    if encoding == 'cp1047':
+        import ebcdic  # noqa: F401 - registers the cp1047 codec
+    return encoding
+
+
+def data_length(dataset: Dataset) -> int:
+    '''Bytes of data a record of the dataset holds; variable records lose 4 to the RDW'''
+    lrecl = int(dataset.reclength)
+    return lrecl if str(dataset.recformat or 'F').startswith('F') else lrecl - 4
+
+
+def split_records(text: str, encoding: str, limit: int) -> list[bytes]:
+    '''Encode text and split it into records, raising RecordLengthError for overlong lines'''
+    data = text.encode(codec(encoding))
+    records = data.split('\n'.encode(encoding))
+    if records and max(map(len, records)) > limit:
+        raise RecordLengthError([i for i, record in enumerate(records, 1) if len(record) > limit], limit)
+    return records
+
+
+def encode(text: str, dataset: Dataset, encoding: str = EBCDIC) -> bytes:
+    '''Encode text for a binary upload to the dataset: every line padded with blanks
+    to the record's data length, as a stream upload carries no record boundaries'''
+    limit = data_length(dataset)
+    return encode_fixed(text, limit, encoding)
+
+
+def encode_fixed(text: str, lrecl: int, encoding: str = EBCDIC) -> bytes:
+    '''Fixed length records, blank padded'''
+    pad = ' '.encode(codec(encoding))
+    return b''.join([record.ljust(lrecl, pad) for record in split_records(text, encoding, lrecl)])
+
+
+def strip_blanks(text: str) -> str:
+    '''Remove trailing blanks from every line of downloaded text, and the final line end'''
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return '\n'.join([line.rstrip() for line in lines])
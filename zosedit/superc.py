@@ -0,0 +1,142 @@
+import re
+from zosedit import constants
+from zosedit.models import Dataset, Job
+from zosedit.zftp import zFTP, zFTPError
+
+MAX_STEPS = 255  # Steps allowed in one job
+MAX_STRING = 60  # Longest string that fits a SRCHFOR statement on one card
+
+# Listing lines: a member's heading, and a hit as line number and source
+MEMBER_HEADER = re.compile(r'^[ 01\-+]?\s*([A-Z0-9@#$][A-Z0-9@#$]{0,7})\s+-+\s+STRING\(S\) FOUND')
+HIT_LINE = re.compile(r'^[ 01\-+]?\s*(\d+)  (.*)$')
+
+
+class SearchHit:
+    '''A line SuperC found; `member` is None for sequential datasets'''
+
+    def __init__(self, dataset: Dataset, member: str, line: int, text: str):
+        self.dataset = dataset
+        self.member = member
+        self.line = line
+        self.text = text
+
+    @property
+    def name(self) -> str:
+        return f'{self.dataset.name}({self.member})' if self.member else self.dataset.name
+
+    def target(self) -> Dataset:
+        '''The dataset or member to open for this hit'''
+        return self.dataset(self.member)
+
+    def __repr__(self):
+        return f'SearchHit({self.name}, line={self.line}, text={self.text!r})'
+
+
+def search_jcl(datasets: list[tuple[Dataset, str]], strings: list[str], any_case: bool = True,
+               name: str = 'ZEDITSRC', params: str = 'CLASS=A,MSGCLASS=X,MSGLEVEL=(1,1),NOTIFY=&SYSUID') -> str:
+    '''JCL for a SuperC search job with a step per (dataset, member pattern); a member
+    pattern, or None for all members, is passed to SuperC as a SELECT statement'''
+    if not strings:
+        raise ValueError('Nothing to search for')
+    statements = []
+    for string in strings:
+        if len(string) > MAX_STRING:
+            raise ValueError(f'Search strings can be at most {MAX_STRING} characters: {string}')
+        statements.append(f"SRCHFOR  '{string.replace(chr(39), chr(39) * 2)}'")
+    steps = []
+    for number, (dataset, member) in enumerate(datasets, 1):
+        select = [f'SELECT   {member}'] if member else []
+        steps.append(constants.SUPERC_STEP.format(step=step_name(number), dataset=dataset.name,
+                                                  options=',ANYC' if any_case else '',
+                                                  statements='\n'.join(statements + select)))
+    return constants.SUPERC_JCL.format(name=name.ljust(8), params=params, steps='\n'.join(steps))
+
+
+def step_name(number: int) -> str:
+    return f'S{number:03d}'
+
+
+def parse_listing(text: str, dataset: Dataset) -> list[SearchHit]:
+    '''Hits in a SuperC search listing (OUTDD) of one dataset'''
+    hits = []
+    member = None
+    listing = False
+    for line in text.splitlines():
+        if 'SUMMARY SECTION' in line:
+            break
+        if 'SOURCE SECTION' in line:
+            listing = True
+            continue
+        if not listing or 'ISRSUPC' in line:
+            continue
+        if match := MEMBER_HEADER.match(line):
+            member = match.group(1)
+        elif match := HIT_LINE.match(line):
+            hits.append(SearchHit(dataset, member if dataset.is_partitioned() else None,
+                                  int(match.group(1)), match.group(2).rstrip()))
+    return hits
+
+
+def search_targets(zftp: zFTP, patterns: list[str]) -> tuple[list[tuple[Dataset, str]], list[str]]:
+    '''Resolve dataset patterns, each optionally with a member pattern as in
+    USER.*.COBOL(PAY*), to the (dataset, member pattern) pairs to search'''
+    targets, errors = [], []
+    for pattern in patterns:
+        pattern = pattern.strip("'").upper()
+        dsn, member = pattern, None
+        if match := re.fullmatch(r'(.+)\((.*)\)', pattern):
+            dsn, member = match.group(1), match.group(2) or None
+        wildcard = '*' in dsn or '%' in dsn
+        datasets = [dataset for dataset in zftp.list_datasets(f"'{dsn}'")
+                    if dataset.type in ('PS', 'PO') and (wildcard or dataset.name == dsn)]
+        if not datasets:
+            errors.append(f'{pattern}: no sequential or partitioned datasets found')
+        targets.extend((dataset, member if dataset.is_partitioned() else None) for dataset in datasets)
+    return targets, errors
+
+
+def search_on_host(zftp: zFTP, datasets: list[tuple[Dataset, str]], strings: list[str], any_case: bool = True,
+                   interval: float = 2, timeout: float = None, progress=None) -> tuple[list[SearchHit], list[str]]:
+    '''Search datasets on the host with SuperC jobs and collect the hits; only the
+    hit listings are downloaded. Returns (hits, errors). progress(message) is
+    called as the jobs move along.'''
+    hits, errors = [], []
+    for start in range(0, len(datasets), MAX_STEPS):
+        batch = datasets[start:start + MAX_STEPS]
+        try:
+            jcl = search_jcl(batch, strings, any_case)
+        except ValueError as e:
+            raise zFTPError(str(e))
+        submission = zftp.submit_jcl(jcl, 'ZEDITSRC')
+        if not submission.job_id:
+            raise zFTPError(f'Search job was not submitted: {submission}')
+        if progress:
+            progress(f'Waiting for search job {submission.job_id}...')
+        job = zftp.wait_for_job(submission.job_id, interval, timeout)
+        if progress:
+            progress(f'Reading results of {job.id}...')
+        batch_hits, batch_errors = collect_results(zftp, job, batch)
+        hits.extend(batch_hits)
+        errors.extend(batch_errors)
+    return hits, errors
+
+
+def collect_results(zftp: zFTP, job: Job, datasets: list[tuple[Dataset, str]]) -> tuple[list[SearchHit], list[str]]:
+    '''Parse the OUTDD listing of every step of a finished search job'''
+    steps = {step_name(number): dataset for number, (dataset, _) in enumerate(datasets, 1)}
+    outputs = {spool.stepname: spool for spool in zftp.list_spools(job) if spool.ddname == 'OUTDD'}
+    hits, errors = [], []
+    for step, dataset in steps.items():
+        spool = outputs.get(step)
+        if spool is None:
+            errors.append(f'{dataset.name}: not searched, see the output of {job.id}')
+            continue
+        path = zftp.download_spool(spool)
+        try:
+            hits.extend(parse_listing(path.read_text(errors='replace'), dataset))
+        finally:
+            path.unlink(missing_ok=True)
+    if not isinstance(job.rc, int) or job.rc > 1:
+        # SuperC ends with 0 when nothing was found and 1 when something was
+        errors.append(f'Search job {job.id} ended with RC {job.rc}')
+    return hits, errors
@@ -0,0 +1,298 @@
+'''Record FTP sessions to trace files and serve them back, for benchmarking and
+checking the parsers and transfer pipeline offline against real captures.
+
+    zosedit --record ls.trace ls 'USER.*'         record a CLI session
+    ZOSEDIT_RECORD=gui.trace zosedit              record a GUI session
+    python -m zosedit.trace info ls.trace         summarise a trace
+    python -m zosedit.trace serve ls.trace        replay it with the recorded timing
+    zosedit --host 127.0.0.1:PORT ls 'USER.*'     ...and run against it
+
+A trace is a gzipped file of JSON lines, one per event: [session, time, kind,
+payload]. Kinds are c/s for control lines sent by the client/server, o/x for a
+data connection opening/closing, and d/u for data received/sent by the client
+(base64). Passwords are not recorded.
+'''
+import sys
+import gzip
+import json
+import socket
+import argparse
+import threading
+import socketserver
+from base64 import b64encode, b64decode
+from collections import deque
+from ftplib import FTP
+from pathlib import Path
+from time import time, sleep
+
+
+class TraceRecorder:
+    '''Writes the events of any number of sessions to one trace file'''
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self.start = time()
+        self.sessions = 0
+        self.lock = threading.Lock()
+
+    def session(self) -> 'TraceSession':
+        with self.lock:
+            self.sessions += 1
+            return TraceSession(self, self.sessions)
+
+    def write(self, session: int, kind: str, payload: str):
+        event = json.dumps([session, round(time() - self.start, 4), kind, payload])
+        with self.lock:
+            if not self.file.closed:
+                self.file.write(event + '\n')
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class TraceSession:
+
+    def __init__(self, recorder: TraceRecorder, id: int):
+        self.recorder = recorder
+        self.id = id
+
+    def record(self, kind: str, payload=''):
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = b64encode(payload).decode('ascii')
+        self.recorder.write(self.id, kind, payload)
+
+
+class RecordingFTP(FTP):
+    '''FTP client that records its control dialogue and data connections'''
+
+    def __init__(self, recorder: TraceRecorder, **kwargs):
+        self.session = recorder.session()
+        super().__init__(**kwargs)
+
+    def putline(self, line: str):
+        self.session.record('c', 'PASS ****' if line[:5].upper() == 'PASS ' else line)
+        super().putline(line)
+
+    def getline(self) -> str:
+        line = super().getline()
+        self.session.record('s', line)
+        return line
+
+    def abort(self):
+        self.session.record('c', 'ABOR')
+        return super().abort()
+
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = super().ntransfercmd(cmd, rest)
+        self.session.record('o')
+        return RecordingSocket(conn, self.session), size
+
+
+class RecordingSocket(socket.socket):
+    '''Data connection that records what passes through it'''
+
+    def __init__(self, conn: socket.socket, session: TraceSession):
+        timeout = conn.gettimeout()
+        super().__init__(conn.family, conn.type, conn.proto, fileno=conn.detach())
+        self.settimeout(timeout)
+        self.session = session
+
+    def recv(self, size, *flags):
+        data = super().recv(size, *flags)
+        if data:
+            self.session.record('d', data)
+        return data
+
+    def recv_into(self, buffer, nbytes=0, *flags):
+        count = super().recv_into(buffer, nbytes, *flags)
+        if count:
+            self.session.record('d', memoryview(buffer)[:count])
+        return count
+
+    def sendall(self, data, *flags):
+        self.session.record('u', data)
+        return super().sendall(data, *flags)
+
+    def _real_close(self, *args):
+        self.session.record('x')
+        super()._real_close(*args)
+
+
+def load(path: Path) -> list[list[tuple]]:
+    '''Events of each session in a trace, as (kind, time, payload), in the order the sessions began'''
+    sessions: dict[int, list] = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            session, t, kind, payload = json.loads(line)
+            sessions.setdefault(session, []).append((kind, t, payload))
+    return list(sessions.values())
+
+
+# === Replay ===
+class ReplayServer(socketserver.ThreadingTCPServer):
+    '''FTP server that plays the sessions of a trace back. Each control connection
+    gets the next recorded session, in the order they were opened. Client lines
+    are read where they were recorded and compared with the recording; server
+    lines and data are sent as recorded, with passive mode replies pointed at a
+    local data port.
+
+    `speed` scales the recorded gaps before each server event: 1 replays the
+    original timing, 10 runs ten times faster and 0 sends everything at once.'''
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, trace: Path, address: tuple = ('127.0.0.1', 0), speed: float = 1.0):
+        self.sessions = deque(load(trace))
+        self.speed = speed
+        self.mismatches: list[str] = []
+        self.lock = threading.Lock()
+        super().__init__(address, ReplayHandler)
+
+    @property
+    def address(self) -> str:
+        '''host:port to connect to'''
+        host, port = self.server_address[:2]
+        return f'{host}:{port}'
+
+    def next_session(self) -> list[tuple]:
+        with self.lock:
+            return self.sessions.popleft() if self.sessions else None
+
+    def mismatch(self, message: str):
+        print(f'Replay mismatch: {message}', file=sys.stderr)
+        with self.lock:
+            self.mismatches.append(message)
+
+    def start(self) -> 'ReplayServer':
+        '''Serve on a background thread'''
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class ReplayHandler(socketserver.StreamRequestHandler):
+    server: ReplayServer
+
+    def handle(self):
+        events = self.server.next_session()
+        if events is None:
+            self.send('421 No recorded sessions left')
+            return
+        self.listener: socket.socket = None
+        self.data: socket.socket = None
+        previous = events[0][1]
+        try:
+            for kind, t, payload in events:
+                if kind != 'c' and self.server.speed:
+                    sleep(max(t - previous, 0) / self.server.speed)
+                previous = t
+                if not self.replay(kind, payload):
+                    return
+        except OSError:
+            pass
+        finally:
+            for sock in (self.listener, self.data):
+                if sock:
+                    sock.close()
+
+    def replay(self, kind: str, payload: str) -> bool:
+        if kind == 'c':
+            line = self.rfile.readline()
+            if not line:
+                return False
+            line = line.lstrip(b'\xff\xf4\xf2').decode('utf-8', errors='replace').rstrip('\r\n')
+            if not same_command(line, payload):
+                self.server.mismatch(f'expected {payload!r}, got {line!r}')
+        elif kind == 's':
+            if payload[:4] in ('227 ', '229 '):
+                payload = self.passive(payload[:3])
+            self.send(payload)
+        elif kind == 'o':
+            self.data, _ = self.listener.accept()
+            self.listener.close()
+            self.listener = None
+        elif kind == 'd':
+            try:
+                self.data.sendall(b64decode(payload))
+            except OSError:
+                pass  # The client closed the connection early, e.g. an aborted listing
+        elif kind == 'u':
+            self.drain(len(b64decode(payload)))
+        elif kind == 'x':
+            if self.data:
+                self.data.close()
+                self.data = None
+        return True
+
+    def send(self, line: str):
+        self.wfile.write((line + '\r\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def passive(self, code: str) -> str:
+        '''Listen on a new local data port and answer PASV/EPSV with it'''
+        self.listener = socket.create_server((self.server.server_address[0], 0))
+        host, port = self.listener.getsockname()[:2]
+        if code == '229':
+            return f'229 Entering Extended Passive Mode (|||{port}|)'
+        return f"227 Entering Passive Mode ({host.replace('.', ',')},{port >> 8},{port & 0xff})"
+
+    def drain(self, size: int):
+        while size > 0:
+            block = self.data.recv(min(size, 65536))
+            if not block:
+                return
+            size -= len(block)
+
+
+def same_command(line: str, recorded: str) -> bool:
+    '''Whether a client line matches the recorded one; passwords and data ports are not compared'''
+    verb = line.split(' ', 1)[0].upper()
+    if verb != recorded.split(' ', 1)[0].upper():
+        return False
+    return verb in ('PASS', 'PORT', 'EPRT') or line == recorded
+
+
+# === Command line ===
+def info(args):
+    for number, events in enumerate(load(args.trace), 1):
+        commands = sum(kind == 'c' for kind, _, _ in events)
+        down = sum(len(b64decode(payload)) for kind, _, payload in events if kind == 'd')
+        up = sum(len(b64decode(payload)) for kind, _, payload in events if kind == 'u')
+        duration = events[-1][1] - events[0][1]
+        print(f'Session {number}: {commands} commands, {down} bytes down, {up} bytes up, {duration:.2f} s')
+
+
+def serve(args):
+    server = ReplayServer(args.trace, (args.bind, args.port), args.speed)
+    print(f'Replaying {len(server.sessions)} session(s) from {args.trace} on {server.address}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 1 if server.mismatches else 0
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog='python -m zosedit.trace', description='Inspect and replay FTP traces')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    cmd = commands.add_parser('info', help='summarise the sessions of a trace')
+    cmd.add_argument('trace', type=Path)
+    cmd.set_defaults(func=info)
+
+    cmd = commands.add_parser('serve', help='serve a trace back to clients')
+    cmd.add_argument('trace', type=Path)
+    cmd.add_argument('--bind', default='127.0.0.1', help='address to listen on')
+    cmd.add_argument('--port', type=int, default=0, help='port to listen on (default: any free port)')
+    cmd.add_argument('--speed', type=float, default=1.0,
+                     help='timing scale: 1 for the recorded timing, 0 for no delays (default: 1)')
+    cmd.set_defaults(func=serve)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
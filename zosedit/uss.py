@@ -0,0 +1,68 @@
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import Iterator
+from zosedit.models import UnixFile
+from zosedit.zftp import zFTP, zFTPError, SessionPool
+
+
+def walk(zftp: zFTP, pool: SessionPool, root: str, max_depth: int = None,
+         max_dirs: int = None) -> Iterator[tuple[str, list[UnixFile], bool, Exception]]:
+    '''Walk a z/OS UNIX directory tree breadth first, listing directories in
+    parallel over the sessions of `pool`. Yields (path, files, cached, error) for
+    each directory as its listing arrives; `error` is set, and `files` empty, when
+    it couldn't be listed. Closing the generator cancels the listings still queued.
+
+    A directory's mtime changes when entries are added, removed or renamed in it,
+    so a cached listing is used when the mtime its parent just listed matches the
+    one it was cached under. Only fresh listings vouch for their subdirectories'
+    mtimes: below a cached directory, listings are fetched again. Sizes and times
+    of files changed in place may be stale in a cached listing. Symbolic links are
+    not followed, so the walk cannot loop.'''
+    root = root.rstrip('/') or '/'
+    pending: dict[Future, tuple[str, int]] = {}
+    queued = 0
+
+    def visit(path: str, mtime: str, depth: int, trusted: bool):
+        '''Take a directory's listing from the cache, or queue it on the pool'''
+        nonlocal queued
+        queued += 1
+        if trusted and mtime and zftp.cache is not None:
+            cached = zftp.cache.directory(zftp.host, zftp.user, path, mtime)
+            if cached:
+                return cached[0]
+        pending[pool.submit(lambda session: session.list_dir(path, mtime))] = path, depth
+        return None
+
+    ready: list[tuple[str, int, list[UnixFile]]] = []
+
+    def descend(files: list[UnixFile], depth: int, fresh: bool):
+        if max_depth is not None and depth >= max_depth:
+            return
+        for file in files:
+            if not file.is_dir() or (max_dirs is not None and queued >= max_dirs):
+                continue
+            cached = visit(file.path, file.mtime, depth + 1, fresh)
+            if cached is not None:
+                ready.append((file.path, depth + 1, cached))
+
+    try:
+        visit(root, None, 0, False)
+        while pending or ready:
+            while ready:
+                path, depth, files = ready.pop(0)
+                yield path, files, True, None
+                descend(files, depth, False)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, depth = pending.pop(future)
+                try:
+                    files = future.result()
+                except (zFTPError, OSError) as e:
+                    yield path, [], False, e
+                    continue
+                yield path, files, False, None
+                descend(files, depth, True)
+    finally:
+        for future in pending:
+            future.cancel()
@@ -1,46 +1,281 @@
 import re
-import ebcdic
-from typing import Literal
-from ftplib import FTP
+import io
+import errno
+import sys
+import queue
+import socket
+import threading
+from typing import Literal, Iterable, Iterator, Union, BinaryIO
+from ftplib import FTP, all_errors, error_reply, error_perm, error_temp
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from dearpygui import dearpygui as dpg
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import wraps
 from zosedit.constants import tempdir
-from traceback import format_exc
-from textwrap import indent
-from .models import Dataset, Job, Spool
-from zosedit.gui.dialog import dialog
+from .models import Dataset, Job, Members, Spool, Submission, UnixFile
+from .compression import Compressor, Decompressor, FILLER
+from .records import data_length
+from .trace import TraceRecorder, RecordingFTP
 from . import constants
-from time import time
+from time import time, sleep
+
+
+Source = Union[bytes, bytearray, memoryview, str, BinaryIO, Iterable[Union[bytes, str]]]
+
+# Socket errors of a network that went away, beyond the ConnectionError and TimeoutError subclasses
+NETWORK_ERRNOS = {errno.ENETDOWN, errno.ENETUNREACH, errno.ENETRESET, errno.EHOSTDOWN, errno.EHOSTUNREACH}
+
+
+class zFTPError(Exception):
+    '''Raised when an FTP operation against the host fails'''
+
+    def __init__(self, message: str, code: str = None):
+        super().__init__(message)
+        self.code = code
+
+    @classmethod
+    def wrap(cls, message: str, error: Exception) -> 'zFTPError':
+        match = re.match(r'(\d{3})', str(error))
+        return cls(f'{message}:\n{error}', match.group(1) if match else None)
+
+
+class TransferCancelled(zFTPError):
+    '''Raised when a transfer is aborted through zFTP.cancel'''
+
+
+class Progress:
+    '''Byte count and throughput of the transfer in progress'''
+
+    def __init__(self, label: str, total: float = None):
+        self.label = label
+        self.total = total
+        self.transferred = 0
+        self.wire = 0  # Bytes on the data connection, less than `transferred` when compressed
+        self.start = time()
+
+    def update(self, count: int):
+        self.transferred += count
+
+    @property
+    def elapsed(self) -> float:
+        return max(time() - self.start, 1e-6)
+
+    @property
+    def rate(self) -> float:
+        '''Bytes per second'''
+        return self.transferred / self.elapsed
+
+    @property
+    def fraction(self) -> float:
+        '''Completed fraction of the estimated total, or None when the size is unknown'''
+        if not self.total:
+            return None
+        return min(self.transferred / self.total, 1.0)
+
+    def __str__(self):
+        text = format_size(self.transferred)
+        if self.total:
+            text += f' of ~{format_size(self.total)}'
+        return f'{text} ({format_size(self.rate)}/s)'
+
+
+class Checkpoint:
+    '''How much of a retrieval is safely on disk, to resume it from after a failure'''
+
+    def __init__(self):
+        self.records = 0  # Complete records written
+        self.offset = 0  # File size up to the end of the last complete record
+        self.marker: str = None  # Last restart marker the server sent
+        self.marked: tuple[int, int, int] = None  # File size, records and offset when it arrived
+
+    def mark(self, marker: bytes, size: int):
+        self.marker = marker.decode('ascii')
+        self.marked = size, self.records, self.offset
+
+    def add(self, data: bytes, size: int):
+        '''Count the records in data, just written to make the file `size` bytes long'''
+        lines = data.count(b'\n')
+        if lines:
+            self.records += lines
+            self.offset = size - (len(data) - data.rfind(b'\n') - 1)
+
+
+def interrupted(error: Exception) -> bool:
+    '''Whether a transfer failed on its connection, so that a new connection may get
+    past it: a dropped, reset or timed out socket, a closed control connection or a
+    4xx reply such as 426 (connection closed, transfer aborted). Errors of local
+    files, such as a full disk, are not.'''
+    if isinstance(error, (EOFError, error_temp, ConnectionError, TimeoutError, socket.gaierror)):
+        return True
+    return isinstance(error, OSError) and error.errno in NETWORK_ERRNOS
+
+
+def skip_records(data: bytes, count: int) -> tuple[bytes, int]:
+    '''Drop the first `count` records of a block of text; returns the rest of the block and of the count'''
+    lines = data.count(b'\n')
+    if lines < count:
+        return b'', count - lines
+    end = -1
+    for _ in range(count):
+        end = data.index(b'\n', end + 1)
+    return data[end + 1:], 0
+
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+class IterStream(io.RawIOBase):
+    '''Readable binary stream over an iterable of bytes/str chunks'''
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]], encoding: str = 'utf-8'):
+        self.chunks = iter(chunks)
+        self.encoding = encoding
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = chunk.encode(self.encoding) if isinstance(chunk, str) else bytes(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def as_stream(data: Source, encoding: str = 'utf-8') -> BinaryIO:
+    '''Wrap in-memory data, a file object, or an iterable of chunks in a readable binary stream'''
+    if isinstance(data, str):
+        return io.BytesIO(data.encode(encoding))
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return io.BytesIO(data)
+    if isinstance(data, Path):
+        return data.open('rb')
+    if hasattr(data, 'read'):
+        return data
+    return io.BufferedReader(IterStream(data, encoding))
+
+
+# === Listing parsers ===
+def parse_datasets(lines: list[str]) -> list[Dataset]:
+    datasets = [Dataset.parse(line) for line in set(lines[1:])]
+    return sorted(datasets, key=dataset_order)
+
+
+def dataset_order(dataset: Dataset) -> tuple:
+    '''Sort key for dataset listings: sequential datasets first, then by name and volume'''
+    return dataset.is_partitioned(), dataset.name, dataset.volume or ''
+
+
+def parse_unix_files(lines: list[str], directory: str) -> list[UnixFile]:
+    files = [UnixFile(line, directory) for line in lines]
+    return [file for file in files if file.name and file.name not in ('.', '..')]
+
+
+def remote_name(dataset: Dataset) -> str:
+    '''Name of a dataset in FTP commands: quoted, so it isn't prefixed with the user ID, or a UNIX path'''
+    return dataset.name if dataset.is_unix() else f"'{dataset.name}'"
+
+
+def parse_members(lines: list[str]) -> Members:
+    return Members.parse(lines)
+
+
+def parse_jobs(lines: list[str]) -> list[Job]:
+    # If only a single job is returned it provides a different format
+    if '--------' in lines:
+        lines = ['', lines[1] + '  ' + lines[-1]]
+
+    result = [Job(job_str) for job_str in lines[1:]]
+    result.sort(key=lambda job: (job.rc == 'Active'), reverse=True)
+    return result
+
+
+JOB_HEADER = 'JOBNAME  JOBID    OWNER    STATUS CLASS'
+JOB_ID_PREFIXES = 'JOB', 'TSU', 'STC'
+
+
+def narrow_job_id(pattern: str) -> list[str]:
+    '''Split a job ID prefix pattern into narrower patterns covering the same IDs,
+    e.g. J* into JOB* and J0* to J9*. Returns [] if it can't be split.'''
+    prefix = pattern[:-1].upper()
+    if not pattern.endswith('*') or '*' in prefix or '?' in prefix or len(prefix) >= 8:
+        return []
+    if not prefix:
+        return [f'{word[0]}*' for word in JOB_ID_PREFIXES]
+    words = [f'{word}*' for word in JOB_ID_PREFIXES if word.startswith(prefix) and word != prefix]
+    if words and len(prefix) > 1:
+        return words
+    return words + [f'{prefix}{digit}*' for digit in '0123456789']
+
+
+def parse_spools(lines: list[str], job: Job) -> list[Spool]:
+    return [Spool(spool_str, job) for spool_str in lines[4:-1]]
 
 
 def waits(func):
+    @wraps(func)
     def wrapper(self, *args, **kwargs):
-        self.waiting = True
-        self.wait_start = dpg.get_frame_count()
-        try:
-            result = func(self, *args, **kwargs)
-        except Exception as e:
-            self.waiting = False
-            raise e
-        self.waiting = False
-        return result
+        with self.busy():
+            return func(self, *args, **kwargs)
     return wrapper
 
 
 class zFTP:
+    '''A single FTP session with a z/OS host.
 
-    KEEP_ALIVE_INTERVAL = 60
+    Operations raise zFTPError on failure. The session is safe to share between
+    threads, but operations on it are serialized; use a SessionPool to run
+    transfers concurrently.'''
 
-    def __init__(self, root):
-        self.root = root
-        self.host = None
-        self.user = None
-        self.password = None
+    KEEP_ALIVE_INTERVAL = 60
+    BLOCK_SIZE = 64 * 1024
+    POLL_INTERVAL = 0.25  # How often a stalled transfer checks for cancellation
+    BATCH_INTERVAL = 0.1  # How often streamed listings hand over what has arrived
+    JES_ENTRY_LIMIT = 1000  # Jobs per listing; JES2 won't return more than this
+    COMPRESS_MIN_SIZE = 32 * 1024  # Smaller transfers aren't worth the MODE round trips
+    RETRY_DELAY = 2  # Seconds before reconnecting after an interrupted transfer, times the attempt
+
+    def __init__(self, host: str = None, user: str = None, password: str = None, debuglevel: int = 0,
+                 cache=None, compress: bool = None, recorder: TraceRecorder = None):
+        self.host = host  # host or host:port
+        self.user = user
+        self.password = password
+        self.debuglevel = debuglevel
+        self.cache = cache  # Optional MetadataCache that listings are written through to
+        self.compress = constants.COMPRESS_TRANSFERS if compress is None else compress
+        self.compressible: bool = None  # Whether the server accepts MODE C, None until tried
+        self.recorder = recorder  # Records the session to a trace file when set
         self.waiting = False
         self.wait_start = 0
         self.ftp = None
+        self.lock = threading.RLock()
         self.last_keep_alive = time()
+        self.progress: Progress = None
+        self._depth = 0
+        self._cancel = threading.Event()
+
+    @contextmanager
+    def busy(self):
+        '''Hold the session for an operation, marking it as waiting'''
+        with self.lock:
+            if not self._depth:
+                self.wait_start = time()
+            self._depth += 1
+            self.waiting = True
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                self.waiting = self._depth > 0
 
     def keep_alive(self):
         if time() - self.last_keep_alive > self.KEEP_ALIVE_INTERVAL:
@@ -49,183 +284,263 @@ class zFTP:
 
     # === Datasets ===
     @waits
-    def list_datasets(self, search_string: str):
-        files = []
-        try:
-            self.set_ftp_vars('SEQ')
-            self.ftp.dir(search_string, files.append)
-        except Exception as e:
-            if '550' in str(e):
-                return []
-            print('Error listing datasets')
-            print(indent(format_exc(), '    '))
-            self.show_error(f'Error listing datasets:\n{e}')
-            return []
-        datasets = [Dataset.parse(file_) for file_ in set(files[1:])]
-        datasets = sorted(datasets, key=lambda x: (x.is_partitioned(), x.name, x.volume or ''))
-        return datasets
+    def list_datasets(self, search_string: str) -> list[Dataset]:
+        datasets = [dataset for batch in self.iter_datasets(search_string) for dataset in batch]
+        return sorted(datasets, key=dataset_order)
+
+    def iter_datasets(self, search_string: str) -> Iterator[list[Dataset]]:
+        '''Yield datasets in batches as the catalog listing streams in, unsorted.
+        The session is held until the generator finishes; closing it early aborts the listing.'''
+        lines = []
+        with self.busy():
+            try:
+                self.set_ftp_vars('SEQ')
+                self.ftp.voidcmd('TYPE A')
+                with self.ftp.transfercmd(f'LIST {search_string}') as conn, \
+                        conn.makefile('r', encoding=self.ftp.encoding) as listing:
+                    seen = set()
+                    batch = []
+                    last = 0  # Yield the first line straight away
+                    try:
+                        for line in listing:
+                            line = line.rstrip('\r\n')
+                            lines.append(line)
+                            if len(lines) == 1 or line in seen:  # Header and duplicates
+                                continue
+                            seen.add(line)
+                            dataset = Dataset.parse(line)
+                            dataset.host = self.host
+                            batch.append(dataset)
+                            if time() - last >= self.BATCH_INTERVAL:
+                                yield batch
+                                batch, last = [], time()
+                    except GeneratorExit:
+                        self._abort(conn)
+                        raise
+                self.ftp.voidresp()
+            except all_errors as e:
+                if '550' in str(e):
+                    self._remember('datasets', search_string, [])
+                    return
+                raise zFTPError.wrap('Error listing datasets', e)
+        self._remember('datasets', search_string, lines)
+        if batch:
+            yield batch
 
     @waits
-    def get_members(self, dataset: Dataset):
-        members = []
-
-        def append(line):
-            members.append(line.split()[0])
+    def get_members(self, dataset: Dataset) -> Members:
+        lines = []
         try:
             self.set_ftp_vars('SEQ', VOLUME=dataset.volume)
-            self.ftp.dir(f"'{dataset.name}(*)'", append)
-        except Exception as e:
-            print('Error getting members for', dataset.name)
-            print(indent(format_exc(), '    '))
-            print(e)
-        dataset._populated = True
-        return members[1:] if members else []
+            self.ftp.dir(f"'{dataset.name}(*)'", lines.append)
+        except all_errors as e:
+            if '550' not in str(e):
+                raise zFTPError.wrap(f'Error getting members for {dataset.name}', e)
+        self._remember('members', dataset.name, lines)
+        return parse_members(lines)
 
     @waits
-    def download(self, dataset: Dataset):
-        raw_data = []
-
-        # Download file
-        def write(data):
-            raw_data.append(data)
+    def list_dir(self, path: str, mtime: str = None) -> list[UnixFile]:
+        '''List a z/OS UNIX directory. The listing is cached under the directory's
+        mtime as seen in its parent's listing, so a changed directory misses the cache.'''
+        lines = []
+        try:
+            self.set_ftp_vars('SEQ')
+            self.ftp.retrlines(f'LIST {path}', lines.append)
+        except all_errors as e:
+            raise zFTPError.wrap(f'Error listing directory {path}', e)
+        self._remember('dirs', (path, mtime or ''), lines)
+        return parse_unix_files(lines, path)
 
+    @waits
+    def retrieve(self, dataset: Dataset) -> io.StringIO:
+        '''Download a dataset into an in-memory text buffer'''
+        buffer = io.BytesIO()
         try:
             self.set_ftp_vars('SEQ', VOLUME=dataset.volume)
-            self.ftp.retrlines(f"RETR '{dataset.name}'", write)
-            content = '\n'.join(raw_data)
-            path = tempdir / dataset.name
-            path.write_text(content, errors='replace')
-            dataset.local_path = path
-            return True
-        except Exception as e:
-            self.show_error(f'Error downloading dataset {dataset.name}:\n{e}')
-            return False
+            self.transfer(f'RETR {remote_name(dataset)}', buffer.write, total=dataset.estimated_size())
+        except all_errors as e:
+            raise zFTPError.wrap(f'Error downloading dataset {dataset.name}', e)
+        text = buffer.getvalue().decode(self.ftp.encoding, errors='replace')
+        return io.StringIO(text.replace('\r\n', '\n'))
+
+    @waits
+    def download(self, dataset: Dataset, path: Path = None) -> Path:
+        path = path or tempdir / dataset.name.lstrip('/')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Ask for restart markers, which the host only sends in compressed mode
+            self._save(f'RETR {remote_name(dataset)}', path, dataset.estimated_size(), lambda: self.set_ftp_vars(
+                'SEQ', VOLUME=dataset.volume, CHKPTINT=constants.CHECKPOINT_RECORDS))
+        except all_errors as e:
+            raise zFTPError.wrap(f'Error downloading dataset {dataset.name}', e)
+        dataset.local_path = path
+        return path
 
     @waits
     def mkdir(self, dataset: Dataset):
         try:
             self.set_ftp_vars('SEQ', RECFM=dataset.recformat, LRECL=dataset.reclength, BLKSIZE=dataset.block_size)
             self.ftp.mkd(f"'{dataset.name}'")
-        except Exception as e:
-            self.show_error(f'Error creating partitioned dataset:\n{e}')
-            return
+        except all_errors as e:
+            raise zFTPError.wrap('Error creating partitioned dataset', e)
 
     @waits
-    def upload(self, dataset: Dataset):
+    def upload(self, dataset: Dataset, data: Source = None):
+        '''Upload `data` (bytes, a file object or an iterable of chunks) to the dataset.
+        Falls back to the dataset's local file when no data is given. An upload
+        interrupted by a dropped connection is sent again from the start, up to
+        TRANSFER_RETRIES times, when the data can be read again (anything but an
+        iterable of chunks or an unseekable stream): a partly stored dataset can't be
+        appended to reliably, as the host doesn't say how much of it was written.'''
+        command = f'STOR {remote_name(dataset)}'
+        source = None
         try:
-            if dataset.member:
-                self.set_ftp_vars('SEQ')
-            else:
-                self.set_ftp_vars('SEQ', RECFM=dataset.recformat, LRECL=dataset.reclength, BLKSIZE=dataset.block_size)
-            self.ftp.storbinary(f"STOR '{dataset.name}'", dataset.local_path.open('rb'))
-        except Exception as e:
-            self.show_error(f'Error uploading dataset:\n{e}')
-            return False
-        return True
+            source = as_stream(dataset.local_path if data is None else data)
+            start = source.tell() if source.seekable() else None
+            size = None  # Known for data that can be read again, so small stores skip compressed mode
+            if start is not None:
+                size = source.seek(0, io.SEEK_END) - start
+                source.seek(start)
+            # Dataset data comes as blank padded records, which compressed mode has to mark the ends of
+            record_length = None
+            if not dataset.is_unix() and str(dataset.reclength).isdigit():
+                record_length = data_length(dataset)
+            attempt = 0
+            while True:
+                try:
+                    if attempt:
+                        self._reconnect()
+                    if dataset.member or dataset.is_unix():
+                        self.set_ftp_vars('SEQ')
+                    else:
+                        self.set_ftp_vars('SEQ', RECFM=dataset.recformat, LRECL=dataset.reclength,
+                                          BLKSIZE=dataset.block_size)
+                    # UNIX files are stored as text for the server to convert, datasets as ready made records
+                    self.transfer(command, source=source, total=size, type_='A' if dataset.is_unix() else 'I',
+                                  record_length=record_length)
+                    break
+                except all_errors as e:
+                    attempt += 1
+                    if not interrupted(e) or start is None or attempt > constants.TRANSFER_RETRIES:
+                        raise
+                    self._interrupted(command, e, attempt, 'sending it again')
+                    source.seek(start)
+        except all_errors as e:
+            raise zFTPError.wrap(f'Error uploading dataset {dataset.name}', e)
+        finally:
+            if source is not None and source is not data:  # Opened here, e.g. from the local file
+                source.close()
 
     @waits
     def delete(self, dataset: Dataset):
         try:
             self.set_ftp_vars('SEQ', VOLUME=dataset.volume)
-            self.ftp.delete(f"'{dataset.name}'")
-            print('Deleted', dataset.name)
-        except Exception as e:
-            self.show_error(f'Error deleting dataset:\n{e}')
-            return False
-        return True
+            self.ftp.delete(remote_name(dataset))
+            print('Deleted', dataset.name, file=sys.stderr)
+        except all_errors as e:
+            raise zFTPError.wrap(f'Error deleting dataset {dataset.name}', e)
 
     # === Jobs ===
     @waits
-    def submit_job(self, dataset: Dataset, download=True):
+    def submit_jcl(self, jcl: Source, name: str = 'ZEDITJOB') -> Submission:
+        source = None
         try:
-            if download and not self.download(dataset):
-                return False
-            path = dataset.local_path
             self.set_ftp_vars('JES')
-            response = self.ftp.storlines(f"STOR '{dataset.name}'", path.open('rb'))
-            self.show_response(response)
-        except Exception as e:
-            self.show_error(f'Error submitting job:\n{e}')
-            return False
-        return True
+            source = as_stream(jcl)
+            response = self.ftp.storlines(f"STOR '{name}'", source)
+        except all_errors as e:
+            raise zFTPError.wrap('Error submitting job', e)
+        finally:
+            if source is not None and source is not jcl:
+                source.close()
+        return Submission(response)
 
     @waits
-    def operator_command_prompt(self):
-        def _submit_command():
-            try:
-                jcl = constants.OPERCMD_JCL.format(
-                    name=dpg.get_value('operator_command_job_name').ljust(10),
-                    params=dpg.get_value('operator_command_job_params'),
-                    command=dpg.get_value('operator_command_input')
-                )
-
-                with NamedTemporaryFile(delete=False) as f:
-                    path = Path(f.name)
-                    path.write_text(jcl)
-
-                self.set_ftp_vars('JES')
-                response = self.ftp.storlines(f"STOR 'ZEDITOPR'", path.open('rb'))
-
-                path.unlink()
-                dpg.delete_item('operator_command_prompt')
-                self.show_response(response)
-            except Exception as e:
-                dpg.delete_item('operator_command_prompt')
-                self.show_error(f'Error submitting operator command:\n{e}')
-                return
-
-        w, h = 420, 150
-        with dialog(tag='operator_command_prompt', label='Operator Command', width=w, height=h, modal=False):
-            dpg.add_input_text(label='Command', tag='operator_command_input', hint='S <JOBNAME>',
-                               on_enter=True, callback=_submit_command)
-            dpg.add_spacer(height=5)
-
-            with dpg.collapsing_header(label="Advanced"):
-                dpg.add_input_text(label='Job Name', tag='operator_command_job_name', default_value='ZEDITOPR')
-                dpg.add_input_text(label='Job Card Params', tag='operator_command_job_params',
-                                   default_value='CLASS=A,MSGCLASS=X,MSGLEVEL=(1,1),NOTIFY=&SYSUID')
-
-            dpg.add_button(label='Submit', callback=_submit_command)
+    def submit_job(self, dataset: Dataset, data: Source = None) -> Submission:
+        '''Submit JCL to JES. Uses `data` if given, otherwise the dataset's content on the host'''
+        if data is None:
+            data = self.retrieve(dataset).getvalue()
+        return self.submit_jcl(data, dataset.name)
+
+    def operator_command(self, command: str, name: str = 'ZEDITOPR',
+                         params: str = 'CLASS=A,MSGCLASS=X,MSGLEVEL=(1,1),NOTIFY=&SYSUID') -> Submission:
+        jcl = constants.OPERCMD_JCL.format(name=name.ljust(10), params=params, command=command)
+        return self.submit_jcl(jcl, 'ZEDITOPR')
+
+    def wait_for_job(self, job_id: str, interval: float = 2, timeout: float = None) -> Job:
+        '''Poll JES until a job is no longer queued or running, returns its final listing'''
+        deadline = timeout and time() + timeout
+        while True:
+            jobs = self.list_jobs(id=job_id)
+            if jobs and jobs[0].status not in ('ACTIVE', 'INPUT'):
+                return jobs[0]
+            if deadline and time() > deadline:
+                raise zFTPError(f'Job {job_id} did not finish within {timeout:.0f}s')
+            sleep(interval)
 
     @waits
-    def list_jobs(self, name=None, id=None, owner=None):
+    def list_jobs(self, name=None, id=None, owner=None) -> list[Job]:
+        jobs = []
+        for page, truncated in self.iter_jobs(name, id, owner):
+            jobs.extend(page)
+            if truncated:
+                print('Job listing truncated', file=sys.stderr)
+        jobs.sort(key=lambda job: (job.rc == 'Active'), reverse=True)
+        return jobs
+
+    def iter_jobs(self, name=None, id=None, owner=None, limit: int = None) -> Iterator[tuple[list[Job], bool]]:
+        '''Yield (jobs, truncated) a page at a time. A page cut off at JESENTRYLIMIT
+        is yielded as it is, then listed again as narrower job ID patterns (JOB* as
+        JOB0* to JOB9*, and so on) so the rest of the jobs follow in later pages.
+        `truncated` is set when some jobs could not be listed, either because the
+        pattern can't be narrowed or because `limit` jobs were reached.'''
         name = name or '*'
         owner = owner or '*'
         id = id or '*'
+        limit = limit or constants.JOB_LIST_LIMIT
+        pending = [id]
+        seen: dict[str, Job] = {}
+        while pending:
+            pattern = pending.pop(0)
+            lines, complete = self._list_jobs_page(name, pattern, owner)
+            page = [job for job in parse_jobs(lines) if job.id not in seen][:limit - len(seen)]
+            for job in page:
+                job.host = self.host
+            seen.update((job.id, job) for job in page)
+            narrower = [] if complete else narrow_job_id(pattern)
+            pending[:0] = narrower
+            full = len(seen) >= limit
+            truncated = (not complete and not narrower) or (full and bool(pending))
+            if page or truncated:
+                yield page, truncated
+            if full:
+                return
+        self._remember('jobs', (name, id, owner), [JOB_HEADER] + [job.string for job in seen.values()])
+
+    @waits
+    def _list_jobs_page(self, name: str, id: str, owner: str) -> tuple[list[str], bool]:
+        '''One JES listing; returns its lines and whether it was complete'''
         raw_data: list[str] = []
         try:
-            self.set_ftp_vars(f'JES', JESJOBNAME=name, JESOWNER=owner, JESENTRYLIMIT=1000)
-            self.ftp.dir(id, raw_data.append)
-        except Exception as e:
+            self.set_ftp_vars(f'JES', JESJOBNAME=name, JESOWNER=owner, JESENTRYLIMIT=self.JES_ENTRY_LIMIT)
+            response = self.ftp.retrlines(f'LIST {id}', raw_data.append)
+        except all_errors as e:
             if '550' in str(e):
-                return []
-            self.show_error(f'Error listing jobs:\n{e}')
-            return []
-
-        # If only a single job is returned it provides a different format
-        if '--------' in raw_data:
-            raw_data = ['', raw_data[1] + '  ' + raw_data[-1]]
-
-        result = [Job(job_str) for job_str in raw_data[1:]]
-        result.sort(key=lambda job: (job.rc == 'Active'), reverse=True)
-        return result
+                return [], True
+            raise zFTPError.wrap('Error listing jobs', e)
+        return raw_data, 'JESENTRYLIMIT' not in response
 
     @waits
-    def download_spools(self, job: Job):
-        spools = self.list_spools(job)
-
-        self.set_ftp_vars('JES')
+    def download_spools(self, job: Job) -> Iterator[Spool]:
         exceptions = []
-        for spool in spools:
-            spool_name = f'{job.id}.{spool.id}'
+        for spool in self.list_spools(job):
             try:
-                path = tempdir / f'{job.id}-{spool.ddname}.txt'
-                lines = []
-                self.ftp.retrlines(f"RETR {spool_name}", lines.append)
-                path.write_text('\n'.join(lines))
-                spool.local_path = path
+                self.download_spool(spool, tempdir / f'{job.id}-{spool.ddname}.txt')
                 yield spool
-            except Exception as e:
+            except TransferCancelled:
+                raise
+            except zFTPError as e:
                 exceptions.append((spool, e))
                 continue
 
@@ -233,57 +548,238 @@ class zFTP:
         for spool, exception in exceptions:
             errors.append(f'Error downloading spool "{spool}":\n    {exception}')
         if errors:
-            self.show_error('\n'.join(errors))
+            raise zFTPError('\n'.join(errors))
 
     @waits
-    def download_spool(self, spool: Spool) -> bool:
+    def download_spool(self, spool: Spool, path: Path = None) -> Path:
         try:
-            path = tempdir / f'{spool.id}.txt'
-            lines = []
-            self.set_ftp_vars('JES')
-            self.ftp.retrlines(f"RETR {spool.job.id}.{spool.id}", lines.append)
-            path.write_text('\n'.join(lines))
+            path = path or tempdir / f'{spool.job.id}.{spool.id}.txt'
+            self._save(f"RETR {spool.job.id}.{spool.id}", path, spool.byte_count, lambda: self.set_ftp_vars('JES'))
             spool.local_path = path
-            return True
-        except Exception as e:
-            self.show_error(f'Error downloading spool {spool.job.id}.{spool.ddname}:\n{e}')
-            return False
+            return path
+        except all_errors as e:
+            raise zFTPError.wrap(f'Error downloading spool {spool.job.id}.{spool.ddname}', e)
 
     @waits
-    def list_spools(self, job: Job):
+    def list_spools(self, job: Job) -> list[Spool]:
         raw_data: list[str] = []
         try:
             self.set_ftp_vars('JES')
             self.ftp.dir(job.id, raw_data.append)
-        except Exception as e:
-            self.show_error(f'Error listing spool outputs:\n{e}')
-            return []
-
-        return [Spool(spool_str, job) for spool_str in raw_data[4:-1]]
-
-    # === Dialogs ===
-    def show_error(self, message):
-        print(indent(message, '    '))
-        print(format_exc())
-        with dialog(label='FTP Error', tag='error', autosize=True):
-            dpg.add_text(message, color=(255, 0, 0))
-
-    def show_response(self, response):
-        with dialog(label='FTP Response', tag='ftp_response', width=300, height=150):
-            dpg.add_text(response)
-            match = re.search(r'(J\d+|JOB\d+)', response)
-            if match:
-                id = match.group(0)
-                dpg.add_button(label=f'Open Job {id}',
-                               width=-1,
-                               callback=self._open_job_by_id,
-                               user_data=id)
-        print(response)
-
-    def _open_job_by_id(self, sender, data, id):
-        dpg.delete_item('ftp_response')
-        job = self.list_jobs(id=id)[0]
-        self.root.editor.open_job(job)
+        except all_errors as e:
+            raise zFTPError.wrap('Error listing spool outputs', e)
+        self._remember('spools', job.id, raw_data)
+        return parse_spools(raw_data, job)
+
+    @waits
+    def purge_job(self, job: Job):
+        '''Purge a job and its output from JES'''
+        try:
+            self.set_ftp_vars('JES')
+            self.ftp.delete(job.id)
+        except all_errors as e:
+            raise zFTPError.wrap(f'Error purging job {job.id}', e)
+
+    def _remember(self, kind: str, query, lines: list[str]):
+        if self.cache is not None:
+            try:
+                self.cache.put(self.host, self.user, kind, query, lines)
+            except Exception as e:
+                print('Error caching listing:', e, file=sys.stderr)
+
+    # === Transfers ===
+    def transfer(self, command: str, write=None, source: BinaryIO = None, total: float = None, type_: str = None,
+                 rest: str = None, checkpoint=None, record_length: int = None):
+        '''Run a data transfer, passing received blocks to `write` or sending blocks read
+        from `source`. Progress is published on `self.progress` and the transfer can be
+        aborted from another thread with `cancel`. Retrievals default to TYPE A and
+        stores to TYPE I; the type also decides the filler byte of compressed mode.
+        Stores are only compressed when they are records of `record_length` bytes:
+        compressed mode carries record boundaries as end of record markers, where
+        stream mode leaves it to the host to cut a byte stream at LRECL or line ends.
+
+        In compressed mode, checkpoint(marker) is called for each restart marker the
+        server sends, once everything before it has been passed to `write`, and `rest`
+        resumes a retrieval from such a marker.'''
+        type_ = type_ or ('A' if write else 'I')
+        self.ftp.voidcmd(f'TYPE {type_}')
+        filler = FILLER[type_]
+        # A restart marker only means something in compressed mode, however little is left to send
+        compressed = bool(write or record_length) and self._compressed_mode(None if rest is not None else total)
+        decoder = Decompressor(filler) if compressed and write else None
+        encoder = Compressor(filler, record_length) if compressed and source else None
+        if rest is not None and not compressed:
+            raise zFTPError(f'Cannot resume without compressed mode: {command}')
+
+        self._cancel.clear()
+        self.progress = Progress(command, total)
+        try:
+            with self.ftp.transfercmd(command, rest) as conn:
+                conn.settimeout(self.POLL_INTERVAL)
+                while True:
+                    if self._cancel.is_set():
+                        self._abort(conn)
+                        raise TransferCancelled(f'Transfer cancelled: {command}')
+                    if write:
+                        try:
+                            block = conn.recv(self.BLOCK_SIZE)
+                        except socket.timeout:
+                            continue
+                        if not block:
+                            break
+                        self.progress.wire += len(block)
+                        if decoder:
+                            block = decoder.feed(block)
+                        self.progress.update(len(block))
+                        if decoder and decoder.restarts and checkpoint:
+                            start = 0
+                            for offset, marker in decoder.restarts:
+                                write(block[start:offset])
+                                checkpoint(marker)
+                                start = offset
+                            block = block[start:]
+                        write(block)
+                        if decoder and decoder.eof:
+                            break
+                    else:
+                        data = source.read(self.BLOCK_SIZE)
+                        block = (encoder.feed(data) if data else encoder.finish()) if encoder else data
+                        conn.settimeout(None)
+                        conn.sendall(block)
+                        conn.settimeout(self.POLL_INTERVAL)
+                        self.progress.wire += len(block)
+                        self.progress.update(len(data))
+                        if not data:
+                            break
+            response = self.ftp.voidresp()
+            if decoder and not decoder.eof:
+                # Block and compressed modes end with a marker, so a data connection closed early shows
+                raise ConnectionError(f'Data connection closed before the end of file marker: {command}')
+            return response
+        finally:
+            self.progress = None
+            if compressed:
+                self._stream_mode()
+
+    def _compressed_mode(self, total: float = None) -> bool:
+        '''Switch to compressed mode for a transfer if it is enabled, the transfer isn't
+        known to be small and the server supports it. Falls back to stream mode for
+        the rest of the connection if the server refuses MODE C.'''
+        if not self.compress or self.compressible is False:
+            return False
+        if total is not None and total < self.COMPRESS_MIN_SIZE:
+            return False
+        try:
+            self.ftp.voidcmd('MODE C')
+        except (error_perm, error_reply) as e:
+            print(f'Compressed mode unavailable, using stream mode: {e}', file=sys.stderr)
+            self.compressible = False
+            return False
+        self.compressible = True
+        return True
+
+    def _stream_mode(self):
+        '''Return to stream mode, which listings and other data commands expect'''
+        try:
+            self.ftp.voidcmd('MODE S')
+        except all_errors as e:
+            print(f'Error restoring stream mode: {e}', file=sys.stderr)
+
+    def _save(self, command: str, path: Path, total: float = None, prepare=None):
+        '''Stream a text retrieval to disk, normalizing line endings. `prepare` sets
+        the session up for the command (SITE parameters) and is called again on every
+        new connection. A retrieval interrupted by a dropped connection is resumed up
+        to TRANSFER_RETRIES times: from the last restart marker the server sent, with
+        REST, or otherwise by retrieving again and skipping the records already on disk.'''
+        checkpoint = Checkpoint()
+        carry = b''
+        skip = 0
+
+        def write(block):
+            nonlocal carry, skip
+            block = carry + block
+            carry = b'\r' if block.endswith(b'\r') else b''
+            data = block[:len(block) - len(carry)].replace(b'\r\n', b'\n')
+            if skip:
+                data, skip = skip_records(data, skip)
+            f.write(data)
+            checkpoint.add(data, f.tell())
+
+        def mark(marker: bytes):
+            if not carry:  # Can't resume between the CR and LF of a record end
+                checkpoint.mark(marker, f.tell())
+
+        attempt = 0
+        rest = None
+        with path.open('wb') as f:
+            while True:
+                try:
+                    if attempt:
+                        self._reconnect()
+                    if prepare:
+                        prepare()
+                    remaining = max(total - f.tell(), 0) if total and rest else total
+                    self.transfer(command, write, total=remaining, rest=rest, checkpoint=mark)
+                    break
+                except all_errors as e:
+                    attempt += 1
+                    if not interrupted(e) or attempt > constants.TRANSFER_RETRIES:
+                        raise
+                    carry = b''
+                    if checkpoint.marker:
+                        rest = checkpoint.marker
+                        size, checkpoint.records, checkpoint.offset = checkpoint.marked
+                        skip = 0
+                        how = f'resuming from restart marker {rest}'
+                    else:
+                        rest = None
+                        size = checkpoint.offset
+                        skip = checkpoint.records
+                        how = f'skipping the {skip} records already received'
+                    f.seek(size)
+                    f.truncate()
+                    self._interrupted(command, e, attempt, how)
+            f.write(carry)
+
+    def _interrupted(self, command: str, error: Exception, attempt: int, how: str):
+        print(f'{command} interrupted ({error}), {how}, attempt {attempt + 1} of '
+              f'{constants.TRANSFER_RETRIES + 1}', file=sys.stderr)
+        sleep(self.RETRY_DELAY * attempt)
+
+    def cancel(self):
+        '''Abort the transfer in progress, if any. Safe to call from any thread.'''
+        if self.progress:
+            self._cancel.set()
+
+    def _abort(self, conn: socket.socket):
+        '''Send ABOR and consume the replies so the control session stays usable'''
+        conn.close()
+        sock = self.ftp.sock
+        timeout = sock.gettimeout()
+        try:
+            sock.settimeout(10)
+            # Telnet IP + Synch (IAC DM, with the IAC sent as urgent data) ahead of ABOR, as per RFC 959
+            if isinstance(self.ftp, RecordingFTP):
+                self.ftp.session.record('c', 'ABOR')
+            sock.sendall(b'\xff\xf4\xff', socket.MSG_OOB)
+            sock.sendall(b'\xf2ABOR\r\n')
+            # The aborted transfer may be answered first (426/451/250), then ABOR itself (225/226)
+            for _ in range(2):
+                try:
+                    response = self.ftp.getresp()
+                except error_reply as e:
+                    response = str(e)
+                except all_errors as e:
+                    response = str(e)
+                    if not response[:1].isdigit():
+                        raise
+                if response[:3] in ('225', '226'):
+                    break
+            sock.settimeout(timeout)
+        except (OSError, EOFError):
+            print('Control connection lost while aborting, reconnecting', file=sys.stderr)
+            self.quit()
+            self.connect()
 
     # === Connection ===
     @waits
@@ -291,16 +787,35 @@ class zFTP:
         host = host or self.host
         user = user or self.user
         password = password or self.password
-        print(f'Connecting: {user}@{host}')
-        self.ftp = FTP(host or self.host)
-        self.ftp.login(user=user or self.user, passwd=password or self.password)
+        print(f'Connecting: {user}@{host}', file=sys.stderr)
+        name, _, port = host.partition(':')
+        self.ftp = RecordingFTP(self.recorder) if self.recorder else FTP()
+        self.ftp.connect(name, int(port or 0))
+        self.ftp.login(user=user, passwd=password)
+        self.compressible = None
         self.host = host
         self.user = user
         self.password = password
-        self.ftp.set_debuglevel(2)
+        self.ftp.set_debuglevel(self.debuglevel)
 
         return True
 
+    def clone(self) -> 'zFTP':
+        '''Open a new session to the same host with the same credentials'''
+        session = zFTP(self.host, self.user, self.password, self.debuglevel, self.cache, self.compress, self.recorder)
+        session.connect()
+        return session
+
+    @waits
+    def _reconnect(self):
+        '''Close the connection without QUIT, which a dead link would leave unanswered, and log in again'''
+        try:
+            if self.ftp:
+                self.ftp.close()
+        except Exception:
+            pass
+        self.connect()
+
     @waits
     def check_alive(self):
         try:
@@ -316,10 +831,73 @@ class zFTP:
             if self.ftp:
                 self.ftp.quit()
         except Exception:
-            print('Error quitting')
-            print(indent(format_exc(), '    '))
+            print('Error quitting', file=sys.stderr)
 
     def set_ftp_vars(self, mode=Literal['SEQ', 'JES', 'SQL'], **kwargs):
         self.check_alive()
         args = ' '.join(f"{key}={value}" for key, value in kwargs.items() if value is not None)
         self.ftp.sendcmd(f'SITE FILETYPE={mode} {args}')
+
+
+class SessionPool:
+    '''A bounded set of sessions cloned from one logged-in zFTP, used to run
+    independent operations concurrently. Sessions are opened lazily.'''
+
+    def __init__(self, zftp: zFTP, size: int = 4):
+        self.zftp = zftp
+        self.size = size
+        self.sessions: list[zFTP] = []
+        self.opened = 0
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(size, thread_name_prefix='zftp')
+
+    @contextmanager
+    def session(self) -> Iterator[zFTP]:
+        try:
+            session = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = self.opened < self.size
+                self.opened += create
+            if create:
+                try:
+                    session = self.zftp.clone()
+                except Exception:
+                    with self.lock:
+                        self.opened -= 1
+                    raise
+                self.sessions.append(session)
+            else:
+                session = self.idle.get()
+        try:
+            yield session
+        finally:
+            self.idle.put(session)
+
+    def submit(self, func, *args):
+        '''Run func(session, *args) on a pooled session, returns a Future'''
+        def run():
+            with self.session() as session:
+                return func(session, *args)
+        return self.executor.submit(run)
+
+    def map(self, func, items: Iterable) -> Iterator[tuple]:
+        '''Run func(session, item) for every item, yielding (item, result, error) as each finishes'''
+        futures = {self.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for session in self.sessions:
+            session.quit()
+        self.sessions = []
+        self.opened = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()